@@ -0,0 +1,70 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+# Commands that never touch the network or the browser, they must start fast
+OFFLINE_COMMANDS = ("stats", "search", "reindex", "export")
+
+# Modules that only the scrape and download commands may import
+HEAVY_MODULES = ("selenium", "aiohttp", "PIL", "requests", "multiprocessing", "pyarrow")
+
+IMPORT_SCRIPT = """
+import importlib, json, sys, time
+from src.__main__ import COMMANDS
+module_name = COMMANDS[sys.argv[1]][0]
+started = time.perf_counter()
+importlib.import_module(module_name)
+elapsed = time.perf_counter() - started
+print(json.dumps({"import_ms": elapsed * 1000, "heavy": sorted(m for m in json.loads(sys.argv[2]) if m in sys.modules)}))
+"""
+
+
+def measure_command(command, runs=5):
+    """
+    Measures how long it takes to start an offline command in a fresh interpreter.
+
+    :param command: Name of a `python -m src` command.
+    :param runs: Number of fresh interpreters to measure.
+    :return: A dictionary with the median startup and import time in milliseconds and the heavy modules imported.
+    """
+    startup = []
+    imports = []
+    heavy = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "src", command, "--help"], check=True, stdout=subprocess.DEVNULL)
+        startup.append((time.perf_counter() - started) * 1000)
+
+        output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT, command, json.dumps(HEAVY_MODULES)],
+                                check=True, capture_output=True, text=True).stdout
+        result = json.loads(output)
+        imports.append(result["import_ms"])
+        heavy = result["heavy"]
+
+    return {"startup_ms": statistics.median(startup), "import_ms": statistics.median(imports), "heavy_modules": heavy}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the startup time of the offline commands.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per command.")
+    parser.add_argument("--max-import-ms", type=float, default=None,
+                        help="Exit with an error if a command takes longer to import.")
+    args = parser.parse_args(argv)
+
+    results = {command: measure_command(command, args.runs) for command in OFFLINE_COMMANDS}
+    print(json.dumps(results, indent=4))
+
+    failed = [
+        command for command, result in results.items()
+        if result["heavy_modules"] or (args.max_import_ms and result["import_ms"] > args.max_import_ms)
+    ]
+    if failed:
+        print(f"Too slow to start: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+import argparse
+import asyncio
+import html
+import json
+import mimetypes
+import multiprocessing
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+from bench.run_benchmarks import _configure_output, bench_scrape, peak_rss_kb
+from bench.standin import PAGE_SCRIPT, _StandInServer
+from src.cassette import Cassette
+
+STAGES = ("scrape", "storage")
+
+# Absolute URLs in the recorded HTML, as they appear in attributes and text
+URL_PATTERN = re.compile(r"https?://[^\s\"'<>]+")
+
+
+class CassetteServer:
+    """
+    A local HTTP server that serves a recorded cassette like `PatreonStandIn` serves a generated feed.
+
+    Every recorded page is served as the fragment of one "Load more" click and the recorded media from
+    `/media/`, with all URLs in the pages and posts rewritten to the server. URLs without recorded media, like
+    the images of posts that were already stored when the session was recorded, point to `/missing/` and are
+    answered with a 404, so a replay never reaches the network.
+    """
+
+    def __init__(self, cassette: Cassette, host="127.0.0.1", port=0):
+        self.cassette = cassette
+        self.requests = {"feed": 0, "media": 0, "missing": 0}
+
+        server_state = self
+
+        class Handler(_CassetteHandler):
+            state = server_state
+
+        self.server = _StandInServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = None
+        self.media_files = {Path(entry["file"]).name: entry["file"] for entry in cassette.media.values()}
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def feed_url(self):
+        return f"{self.base_url}/c/{self.cassette.artist.get('url_name', 'artist')}/posts"
+
+    def media_url(self, url):
+        entry = self.cassette.media.get(url)
+        if entry:
+            return f"{self.base_url}/media/{Path(entry['file']).name}"
+        # The host and path are kept, the scraper takes the post IDs from the end of the post URLs
+        return f"{self.base_url}/missing/{url.split('://', 1)[1]}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def rewrite(self, page_html):
+        """
+        Points all URLs of a page to the server.
+
+        :param page_html: The recorded HTML.
+        :return: str The rewritten HTML.
+        """
+        return URL_PATTERN.sub(lambda match: html.escape(self.media_url(html.unescape(match.group()))), page_html)
+
+    def batches(self):
+        """
+        Returns the recorded batches of posts with their image and attachment URLs pointing to the server.
+
+        :return: A list of lists of post dictionaries.
+        """
+        return [[self._local_post(post) for post in batch] for batch in self.cassette.batches]
+
+    def _local_post(self, post):
+        post = dict(post, images=[self.media_url(url) for url in post.get("images", [])])
+        if post.get("attachments"):
+            post["attachments"] = [dict(attachment, url=self.media_url(attachment["url"]))
+                                   for attachment in post["attachments"]]
+        return post
+
+    def render_cards(self, page):
+        return self.rewrite(self.cassette.read(self.cassette.pages[page]["file"]).decode())
+
+    def is_last_page(self, page):
+        return page + 1 >= len(self.cassette.pages)
+
+    def render_page(self):
+        cards = self.render_cards(0) if self.cassette.pages else ""
+        load_more = "" if self.is_last_page(0) else (
+            '<button type="button" data-page="1" onclick="loadMore(this)"><div>Load more</div></button>'
+        )
+        return (f"<!DOCTYPE html><html><head><title>Feed</title>{PAGE_SCRIPT}</head><body>"
+                f"<div id='feed'>{cards}</div>{load_more}</body></html>")
+
+
+class _CassetteHandler(BaseHTTPRequestHandler):
+    state: CassetteServer = None
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        state = self.state
+        parsed = urlparse(self.path)
+
+        if parsed.path.startswith("/c/"):
+            self._send(200, "text/html; charset=utf-8", state.render_page().encode())
+        elif parsed.path == "/feed":
+            state.requests["feed"] += 1
+            page = int(parse_qs(parsed.query).get("page", ["0"])[0])
+            headers = {"X-Last-Page": "true" if state.is_last_page(page) else "false"}
+            self._send(200, "text/html; charset=utf-8", state.render_cards(page).encode(), headers)
+        elif parsed.path.startswith("/media/") and parsed.path[7:] in state.media_files:
+            state.requests["media"] += 1
+            name = state.media_files[parsed.path[7:]]
+            content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+            self._send(200, content_type, state.cassette.read(name))
+        elif parsed.path.startswith("/missing/"):
+            state.requests["missing"] += 1
+            self._send(404, "text/plain", b"Not recorded")
+        else:
+            self._send(404, "text/plain", b"Not found")
+
+    def _send(self, status, content_type, body, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def replay_scrape(feed_url, work_dir):
+    """
+    Replays the recorded pages through `scrape_artist_posts` with a real (headless) Firefox.
+
+    Like in the benchmark, the post details are not fetched, they were not recorded and must not come from Patreon.
+    """
+    return bench_scrape(feed_url, work_dir)
+
+
+def replay_storage(batches, work_dir):
+    """Replays the recorded batches of posts through `download_post_images` and `save_posts_to_file`."""
+    _configure_output(work_dir)
+    from src.utils import download_post_images, save_posts_to_file
+
+    artist_folder = Path(work_dir) / "benchartist"
+    posts_file = artist_folder / "posts.json"
+
+    download_seconds = 0
+    written = 0
+    start = time.perf_counter()
+    for batch in batches:
+        download_start = time.perf_counter()
+        batch = asyncio.run(download_post_images(batch, artist_folder))
+        download_seconds += time.perf_counter() - download_start
+        save_posts_to_file(batch, artist_folder)
+        written += posts_file.stat().st_size if posts_file.exists() else 0
+    elapsed = time.perf_counter() - start
+
+    posts = sum(len(batch) for batch in batches)
+    images = sum(len(post["images"]) for batch in batches for post in batch)
+    final_size = posts_file.stat().st_size if posts_file.exists() else 0
+    return {
+        "seconds": elapsed,
+        "posts": posts,
+        "posts_per_sec": posts / elapsed,
+        "images": images,
+        "images_per_sec": images / elapsed,
+        "download_seconds": download_seconds,
+        "bytes_written": written,
+        "write_amplification": written / final_size if final_size else None,
+        "peak_rss_kb": peak_rss_kb(),
+    }
+
+
+def summarize(cassette: Cassette):
+    """
+    Summarizes the recorded session, to compare the replay with.
+
+    :param cassette: The cassette.
+    :return: A dictionary with the recorded pages, posts and media and the time the live session spent on them.
+    """
+    seconds = sum(page["seconds"] for page in cassette.pages)
+    posts = sum(len(batch) for batch in cassette.batches)
+    return {
+        "artist": cassette.artist.get("url_name"),
+        "recorded_at": cassette.index["recorded_at"],
+        "pages": len(cassette.pages),
+        "cards": sum(page["cards"] for page in cassette.pages),
+        "posts": posts,
+        "media": len(cassette.media),
+        "media_bytes": sum(entry["bytes"] for entry in cassette.media.values()),
+        "seconds": seconds,
+        "posts_per_sec": posts / seconds if seconds else None,
+        "media_seconds": sum(entry["seconds"] for entry in cassette.media.values()),
+    }
+
+
+def replay_cassette(path: Path, stages=STAGES):
+    """
+    Replays a cassette through the selected stages at full speed.
+
+    Like the benchmarks, every stage runs in its own process and output folder.
+
+    :param path: Path of the cassette file.
+    :param stages: The stages to run.
+    :return: A JSON-serializable dictionary with the recorded session and the results per stage.
+    """
+    results = {}
+    context = multiprocessing.get_context("spawn")
+
+    with Cassette(path) as cassette, CassetteServer(cassette) as server:
+        for stage in stages:
+            with tempfile.TemporaryDirectory() as work_dir, \
+                    ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                if stage == "scrape":
+                    future = executor.submit(replay_scrape, server.feed_url(), work_dir)
+                else:
+                    future = executor.submit(replay_storage, server.batches(), work_dir)
+                results[stage] = future.result()
+        recorded = summarize(cassette)
+        requests = dict(server.requests)
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "cassette": str(path),
+        "recorded": recorded,
+        "results": results,
+        # `missing` counts the requests for media that was not recorded, which the replay did not download
+        "requests": requests,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recorded scraping session offline.")
+    parser.add_argument("cassette", type=Path, help="Cassette recorded with `python -m src scrape --record`.")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES), help="Stages to run.")
+    parser.add_argument("--output", type=Path, help="Write the JSON results to this file instead of stdout.")
+    args = parser.parse_args(argv)
+
+    report = json.dumps(replay_cassette(args.cassette, args.stages), indent=4)
+
+    if args.output:
+        args.output.write_text(report, encoding="utf-8")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+from bench.standin import FeedSettings, PatreonStandIn, generate_posts, image_url
+
+STAGES = ("scrape", "download", "save")
+
+
+def peak_rss_kb():
+    """
+    Returns the peak resident set size of the current process in KB, or None if it cannot be determined.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux reports kilobytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _configure_output(work_dir):
+    from src.config import Config
+
+    # The stages run in spawned processes, which have to read the .env file themselves
+    Config.load()
+    Config.OUTPUT_FOLDER = Path(work_dir)
+    Config.SEARCH_INDEX_PATH = Path(work_dir) / "search.db"
+    Config.DEBUG = False
+
+
+def _stage_posts(settings, base_url):
+    """Builds the posts as the scraper would hand them to the download stage."""
+    return [
+        {
+            "id": post["id"],
+            "title": post["title"],
+            "date": datetime.strptime(post["date"], "%b %d, %Y").strftime("%Y-%m-%d"),
+            "content": "\n".join(post["paragraphs"]),
+            "images": [image_url(base_url, post["id"], i) for i in range(post["images"])],
+            "tags": post["tags"],
+            "url": f"{base_url}/posts/{post['slug']}-{post['id']}",
+        }
+        for post in generate_posts(settings)
+    ]
+
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def bench_download(settings_dict, base_url, work_dir):
+    """Measures `download_post_images` against the stand-in image CDN."""
+    _configure_output(work_dir)
+    from src.utils import download_post_images
+
+    settings = FeedSettings(**settings_dict)
+    posts = _stage_posts(settings, base_url)
+    artist_folder = Path(work_dir) / "benchartist"
+
+    start = time.perf_counter()
+    for batch in _batches(posts, settings.page_size):
+        asyncio.run(download_post_images(batch, artist_folder))
+    elapsed = time.perf_counter() - start
+
+    images = sum(len(post["images"]) for post in posts)
+    downloaded = sum(file.stat().st_size for file in (artist_folder / "images").rglob("*") if file.is_file())
+    return {
+        "seconds": elapsed,
+        "images": images,
+        "images_per_sec": images / elapsed,
+        "bytes": downloaded,
+        "bytes_per_sec": downloaded / elapsed,
+        "peak_rss_kb": peak_rss_kb(),
+    }
+
+
+def bench_save(settings_dict, base_url, work_dir):
+    """Measures `save_posts_to_file` and its write amplification when saving page by page."""
+    _configure_output(work_dir)
+    from src.utils import save_posts_to_file
+
+    settings = FeedSettings(**settings_dict)
+    posts = _stage_posts(settings, base_url)
+    for post in posts:
+        post["images"] = [f"images/2024/01/p{post['id']}_{i}.png" for i in range(len(post["images"]))]
+
+    artist_folder = Path(work_dir) / "benchartist"
+    artist_folder.mkdir(parents=True, exist_ok=True)
+    posts_file = artist_folder / "posts.json"
+
+    written = 0
+    start = time.perf_counter()
+    for batch in _batches(posts, settings.page_size):
+        save_posts_to_file(batch, artist_folder)
+        written += posts_file.stat().st_size
+    elapsed = time.perf_counter() - start
+
+    final_size = posts_file.stat().st_size
+    return {
+        "seconds": elapsed,
+        "posts": len(posts),
+        "posts_per_sec": len(posts) / elapsed,
+        "bytes_written": written,
+        "final_bytes": final_size,
+        "write_amplification": written / final_size,
+        "peak_rss_kb": peak_rss_kb(),
+    }
+
+
+def bench_scrape(feed_url, work_dir, prune_dom=False):
+    """Measures `scrape_artist_posts` end to end with a real (headless) Firefox against the stand-in feed."""
+    _configure_output(work_dir)
+    from src.config import Config
+
+    Config.PRUNE_DOM = prune_dom
+    # Incomplete cards would otherwise be completed from the live Patreon API
+    Config.FETCH_POST_DETAILS = False
+
+    if not Config.FIREFOX_PATH.is_file() or not Config.GECKO_DRIVER_PATH.is_file():
+        return {"skipped": "FIREFOX_PATH and GECKO_PATH must point to a Firefox and GeckoDriver binary"}
+
+    os.environ.setdefault("MOZ_HEADLESS", "1")
+    from src.driver import browser_rss_kb, init_driver
+    from src.scraper import scrape_artist_posts
+
+    driver = init_driver()
+    round_trips = 0
+    execute = driver.execute
+
+    def counting_execute(*args, **kwargs):
+        nonlocal round_trips
+        round_trips += 1
+        return execute(*args, **kwargs)
+
+    try:
+        driver.get(feed_url)
+        driver.execute = counting_execute
+
+        start = time.perf_counter()
+        scrape_artist_posts(driver, {"display_name": "Bench", "url_name": "benchartist", "tag_mapping": []})
+        elapsed = time.perf_counter() - start
+        browser_rss = browser_rss_kb(driver)
+    finally:
+        driver.quit()
+
+    with open(Path(work_dir) / "benchartist" / "posts.json", "r") as file:
+        posts = json.load(file)
+    images = sum(len(post["images"]) for post in posts)
+
+    return {
+        "seconds": elapsed,
+        "posts": len(posts),
+        "posts_per_sec": len(posts) / elapsed,
+        "images": images,
+        "images_per_sec": images / elapsed,
+        "webdriver_round_trips": round_trips,
+        "round_trips_per_post": round_trips / max(len(posts), 1),
+        "browser_rss_kb": browser_rss,
+        "peak_rss_kb": peak_rss_kb(),
+    }
+
+
+def run_benchmarks(settings: FeedSettings, stages=STAGES, prune_dom=False):
+    """
+    Runs the selected benchmark stages against a fresh stand-in server.
+
+    Every stage runs in its own process and output folder, so peak RSS and written bytes are not
+    influenced by the other stages.
+
+    :param settings: The feed settings of the stand-in server.
+    :param stages: The stages to run.
+    :param prune_dom: Whether the scrape stage prunes processed post cards from the DOM.
+    :return: A JSON-serializable dictionary with the environment, the settings and the results per stage.
+    """
+    results = {}
+    context = multiprocessing.get_context("spawn")
+
+    with PatreonStandIn(settings) as standin:
+        for stage in stages:
+            with tempfile.TemporaryDirectory() as work_dir, \
+                    ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                if stage == "scrape":
+                    future = executor.submit(bench_scrape, standin.feed_url(), work_dir, prune_dom)
+                elif stage == "download":
+                    future = executor.submit(bench_download, settings.to_dict(), standin.base_url, work_dir)
+                else:
+                    future = executor.submit(bench_save, settings.to_dict(), standin.base_url, work_dir)
+                results[stage] = future.result()
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {**settings.to_dict(), "prune_dom": prune_dom},
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the scraper against a local Patreon stand-in.")
+    parser.add_argument("--posts", type=int, default=200, help="Number of posts in the generated feed.")
+    parser.add_argument("--page-size", type=int, default=20, help="Posts added per 'Load more' click.")
+    parser.add_argument("--images-per-post", type=int, default=3, help="Images per post.")
+    parser.add_argument("--image-bytes", type=int, default=50_000, help="Approximate size of every image.")
+    parser.add_argument("--image-latency", type=float, default=0.0, help="Seconds the CDN waits per image.")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES), help="Stages to run.")
+    parser.add_argument("--prune-dom", action="store_true", help="Prune processed post cards while scraping.")
+    parser.add_argument("--output", type=Path, help="Write the JSON results to this file instead of stdout.")
+    args = parser.parse_args(argv)
+
+    settings = FeedSettings(posts=args.posts, page_size=args.page_size, images_per_post=args.images_per_post,
+                            image_bytes=args.image_bytes, image_latency=args.image_latency)
+    report = json.dumps(run_benchmarks(settings, args.stages, args.prune_dom), indent=4)
+
+    if args.output:
+        args.output.write_text(report, encoding="utf-8")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+import html
+import io
+import json
+import math
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from PIL import Image
+
+PAGE_SCRIPT = """
+<script>
+function showMore(button) {
+    const card = button.closest("[data-tag='post-card']");
+    const body = card.querySelector(".collapsed-body");
+    body.className = "sc-b20d4e5f-0 jOibYJ";
+    body.innerHTML = card.querySelector("template.full-body").innerHTML;
+    button.remove();
+}
+
+async function loadMore(button) {
+    button.setAttribute("aria-disabled", "true");
+    const page = parseInt(button.dataset.page);
+    const response = await fetch("/feed?page=" + page);
+    const fragment = await response.text();
+    document.getElementById("feed").insertAdjacentHTML("beforeend", fragment);
+    if (response.headers.get("X-Last-Page") === "true") {
+        button.remove();
+    } else {
+        button.dataset.page = page + 1;
+        button.removeAttribute("aria-disabled");
+    }
+}
+</script>
+"""
+
+
+class FeedSettings:
+    """
+    Shape of the generated feed and behaviour of the image CDN served by `PatreonStandIn`.
+    """
+
+    def __init__(self, posts=200, page_size=20, images_per_post=3, image_bytes=50_000, image_latency=0.0,
+                 paragraphs=8, collapsed_ratio=0.5, grid_limit=0, seed=1):
+        self.posts = posts
+        self.page_size = page_size
+        self.images_per_post = images_per_post
+        self.image_bytes = image_bytes
+        self.image_latency = image_latency
+        self.paragraphs = paragraphs
+        self.collapsed_ratio = collapsed_ratio
+        # Cards show at most this many images and a "+N" overlay for the rest, 0 shows all of them
+        self.grid_limit = grid_limit
+        self.seed = seed
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+class PatreonStandIn:
+    """
+    A local HTTP server imitating a Patreon creator feed and its image CDN.
+
+    The feed page uses the same `post-card` markup the scraper looks for, including a working "Load more"
+    button, collapsed bodies behind a "Show more" button and image grids. Images are valid PNG files of
+    roughly the configured size, served with the configured latency. Full posts are served by a minimal
+    version of the Patreon posts API.
+    """
+
+    def __init__(self, settings: FeedSettings = None, host="127.0.0.1", port=0):
+        self.settings = settings or FeedSettings()
+        self.posts = generate_posts(self.settings)
+        self.image_payload = _generate_png(self.settings.image_bytes)
+        self.requests = {"feed": 0, "images": 0, "probe": 0, "details": 0}
+
+        standin = self
+
+        class Handler(_StandInHandler):
+            server_state = standin
+
+        self.server = _StandInServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def feed_url(self, artist="benchartist"):
+        return f"{self.base_url}/c/{artist}/posts"
+
+    def image_url(self, post_id, index):
+        return image_url(self.base_url, post_id, index)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def publish(self, post):
+        """
+        Adds a new post on top of the feed.
+
+        :param post: A post dictionary like the ones of `generate_posts`.
+        """
+        self.posts.insert(0, post)
+
+    def render_newest_post(self, rss=False):
+        """
+        Renders the newest post like the Patreon posts API or an RSS feed do.
+
+        :param rss: Render an RSS feed instead of JSON.
+        :return: A tuple (content type, body, ETag).
+        """
+        post = self.posts[0]
+        published = datetime.strptime(post["date"], "%b %d, %Y")
+        etag = f'"{post["id"]}"'
+        if rss:
+            body = (f"<?xml version='1.0' encoding='UTF-8'?><rss version='2.0'><channel><title>Feed</title>"
+                    f"<item><title>{html.escape(post['title'])}</title>"
+                    f"<guid>{self.base_url}/posts/{post['slug']}-{post['id']}</guid>"
+                    f"<pubDate>{published.strftime('%a, %d %b %Y %H:%M:%S GMT')}</pubDate></item>"
+                    f"</channel></rss>")
+            return "application/rss+xml", body.encode(), etag
+        body = {"data": [{"id": str(post["id"]), "type": "post",
+                          "attributes": {"published_at": published.strftime("%Y-%m-%dT%H:%M:%S.000+00:00")}}]}
+        return "application/vnd.api+json", json.dumps(body).encode(), etag
+
+    def render_post_details(self, post_id):
+        """
+        Renders a full post like the Patreon posts API does, with all of its images.
+
+        :param post_id: The ID of the post.
+        :return: bytes The JSON body, or None if there is no such post.
+        """
+        post = next((post for post in self.posts if post["id"] == post_id), None)
+        if post is None:
+            return None
+        media = [{"id": f"{post_id}{i}", "type": "media",
+                  "attributes": {"image_urls": {"original": self.image_url(post_id, i)}}}
+                 for i in range(post["images"])]
+        body = {
+            "data": {"id": str(post_id), "type": "post",
+                     "attributes": {"title": post["title"],
+                                    "content": "".join(f"<p>{html.escape(p)}</p>" for p in post["paragraphs"])},
+                     "relationships": {"images": {"data": [{"id": m["id"], "type": "media"} for m in media]}}},
+            "included": media,
+        }
+        return json.dumps(body).encode()
+
+    def render_cards(self, page):
+        size = self.settings.page_size
+        return "\n".join(self._render_card(post) for post in self.posts[page * size:(page + 1) * size])
+
+    def is_last_page(self, page):
+        return (page + 1) * self.settings.page_size >= len(self.posts)
+
+    def render_page(self):
+        load_more = "" if self.is_last_page(0) else (
+            '<button type="button" data-page="1" onclick="loadMore(this)"><div>Load more</div></button>'
+        )
+        return (f"<!DOCTYPE html><html><head><title>Feed</title>{PAGE_SCRIPT}</head><body>"
+                f"<div id='feed'>{self.render_cards(0)}</div>{load_more}</body></html>")
+
+    def _render_card(self, post):
+        paragraphs = "".join(f"<p>{html.escape(paragraph)}</p>" for paragraph in post["paragraphs"])
+        if post["collapsed"]:
+            body = (f"<div class='collapsed-body'><p>{html.escape(post['paragraphs'][0][:80])}</p></div>"
+                    f"<template class='full-body'>{paragraphs}</template>"
+                    "<button onclick='showMore(this)'>Show more</button>")
+        else:
+            body = f"<div class='sc-b20d4e5f-0 jOibYJ'>{paragraphs}</div>"
+
+        shown = min(post["images"], self.settings.grid_limit or post["images"])
+        images = "".join(f"<img src='{self.image_url(post['id'], i)}'>" for i in range(shown))
+        if shown < post["images"]:
+            images += f"<div><span>+{post['images'] - shown}</span></div>"
+        grid_class = "image-grid" if post["images"] > 1 else "image-carousel"
+        tags = "".join(f"<a data-tag='post-tag' href='#'>{html.escape(tag)}</a>" for tag in post["tags"])
+
+        return (f"<div data-tag='post-card'>"
+                f"<span data-tag='post-title'><a href='/posts/{post['slug']}-{post['id']}'>"
+                f"{html.escape(post['title'])}</a></span>"
+                f"<a data-tag='post-published-at' href='#'><span>{post['date']}</span></a>"
+                f"{body}<div class='{grid_class}'>{images}</div><div>{tags}</div></div>")
+
+
+class _StandInServer(ThreadingHTTPServer):
+    # The default backlog of 5 drops connections when a whole batch of images is requested at once
+    request_queue_size = 256
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    server_state: PatreonStandIn = None
+    # Headers and body are written separately, Nagle's algorithm would delay every response
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        state = self.server_state
+        parsed = urlparse(self.path)
+
+        if parsed.path.startswith("/c/"):
+            self._send(200, "text/html; charset=utf-8", state.render_page().encode())
+        elif parsed.path == "/feed":
+            state.requests["feed"] += 1
+            page = int(parse_qs(parsed.query).get("page", ["0"])[0])
+            headers = {"X-Last-Page": "true" if state.is_last_page(page) else "false"}
+            self._send(200, "text/html; charset=utf-8", state.render_cards(page).encode(), headers)
+        elif parsed.path == "/api/posts" or parsed.path.startswith("/rss/"):
+            state.requests["probe"] += 1
+            content_type, body, etag = state.render_newest_post(rss=parsed.path.startswith("/rss/"))
+            if self.headers.get("If-None-Match") == etag:
+                self._send(304, content_type, b"", {"ETag": etag})
+            else:
+                self._send(200, content_type, body, {"ETag": etag})
+        elif parsed.path.startswith("/api/posts/"):
+            state.requests["details"] += 1
+            body = state.render_post_details(int(parsed.path.rsplit("/", 1)[1]))
+            if body is None:
+                self._send(404, "application/vnd.api+json", b'{"errors": []}')
+            else:
+                self._send(200, "application/vnd.api+json", body)
+        elif parsed.path.startswith("/img/"):
+            state.requests["images"] += 1
+            if state.settings.image_latency:
+                time.sleep(state.settings.image_latency)
+            self._send(200, "image/png", state.image_payload)
+        else:
+            self._send(404, "text/plain", b"Not found")
+
+    def _send(self, status, content_type, body, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def image_url(base_url, post_id, index):
+    """
+    Returns the CDN URL of an image of a generated post.
+
+    :param base_url: Base URL of a running `PatreonStandIn`.
+    :param post_id: The ID of the post.
+    :param index: The position of the image within the post.
+    :return: str The image URL.
+    """
+    return f"{base_url}/img/{post_id}/p{post_id}_{index}.png"
+
+
+def generate_posts(settings: FeedSettings):
+    """
+    Generates the posts of the stand-in feed, newest first.
+
+    :param settings: The feed settings.
+    :return: A list of raw post dictionaries as rendered into the feed.
+    """
+    rng = random.Random(settings.seed)
+    words = ["sketch", "dragon", "study", "color", "lineart", "portrait", "landscape", "wip", "comic", "pinup"]
+    start = datetime(2024, 12, 31)
+    posts = []
+
+    for index in range(settings.posts):
+        post_id = 100_000 + settings.posts - index
+        title_words = rng.sample(words, 3)
+        posts.append({
+            "id": post_id,
+            "slug": "-".join(title_words),
+            "title": " ".join(title_words).title(),
+            # Reverse-chronological like the real feed, always with the year to keep parsing deterministic
+            "date": (start - timedelta(days=index)).strftime("%b %d, %Y"),
+            "paragraphs": [" ".join(rng.choices(words, k=30)) for _ in range(settings.paragraphs)],
+            "collapsed": rng.random() < settings.collapsed_ratio,
+            "images": settings.images_per_post,
+            "tags": rng.sample(words, 2),
+        })
+    return posts
+
+
+def _generate_png(size):
+    # Random noise barely compresses, so the PNG ends up close to the requested size
+    side = max(1, int(math.sqrt(size)))
+    image = Image.frombytes("L", (side, side), random.Random(0).randbytes(side * side))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
@@ -0,0 +1,41 @@
+import argparse
+import importlib
+
+from src.config import Config
+
+# Command name: (module, function, description). Modules are only imported when their command runs, so the
+# offline commands do not pay for Selenium, aiohttp or Pillow.
+COMMANDS = {
+    "scrape": ("src.main", "main", "Scrape the artists of the artists file with the browser."),
+    "download": ("src.scripts.download", "main", "Download the media of unfinished posts without the browser."),
+    "stats": ("src.scripts.counter", "main", "Show statistics about the scraped archive."),
+    "search": ("src.scripts.search", "main", "Search the scraped posts of all artists."),
+    "reindex": ("src.scripts.search", "reindex", "Rebuild the search index from all posts.json files."),
+    "media": ("src.scripts.media_backfill", "main", "Verify images, record their metadata and create thumbnails."),
+    "export": ("src.scripts.export", "main", "Export the posts of all artists as a Parquet dataset."),
+    "gallery": ("src.scripts.image_gallery_viewer", "main", "Browse the downloaded images."),
+}
+
+
+def main(argv=None):
+    """
+    Runs a subcommand, e.g. `python -m src stats --json`. The arguments after the command are passed on to it.
+
+    :param argv: Optional list of command line arguments.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m src", description="Patreon scraper",
+        epilog="commands:\n" + "\n".join(f"  {name:<10}{command[2]}" for name, command in COMMANDS.items()),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("command", choices=COMMANDS, metavar="command", help="One of the commands below.")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="Arguments of the command, see `<command> --help`.")
+    args = parser.parse_args(argv)
+
+    Config.load()
+    module_name, function_name, _ = COMMANDS[args.command]
+    getattr(importlib.import_module(module_name), function_name)(args.args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+import json
+import threading
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path
+
+CASSETTE_VERSION = 1
+INDEX_FILE_NAME = "index.json"
+CASSETTE_SUFFIX = ".cassette.zip"
+
+# Already compressed media is stored as is, deflating it again costs time and saves nothing
+STORED_SUFFIXES = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".mp4", ".zip"}
+
+
+class CassetteWriter:
+    """
+    Records the scraping session of an artist into a cassette, a zip file with an `index.json`.
+
+    The cassette contains the `outerHTML` of the new post cards of every page, the batches of posts handed to
+    the download stage, the downloaded images and how long the session spent on each page and image.
+    `bench.replay` serves it back to the scraper to reproduce the session offline.
+    """
+
+    def __init__(self, path: Path, artist):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.zip = zipfile.ZipFile(self.path, "w", compression=zipfile.ZIP_DEFLATED)
+        self.index = {
+            "version": CASSETTE_VERSION,
+            "artist": {key: artist[key] for key in ("display_name", "url_name") if key in artist},
+            "recorded_at": datetime.now().isoformat(timespec="seconds"),
+            "pages": [],
+            "batches": [],
+            "media": {},
+        }
+        self._lock = threading.Lock()
+        self._page_started = time.perf_counter()
+
+    def record_page(self, page, cards):
+        """
+        Stores the new post cards of a page.
+
+        :param page: The number of the page, 0 for the initial one.
+        :param cards: The `outerHTML` of the cards that were not on the previous page.
+        """
+        now = time.perf_counter()
+        with self._lock:
+            name = f"pages/{len(self.index['pages']):05d}.html"
+            self.zip.writestr(name, "\n".join(cards))
+            self.index["pages"].append({"page": page, "file": name, "cards": len(cards),
+                                        "seconds": round(now - self._page_started, 6)})
+        self._page_started = now
+
+    def record_posts(self, posts):
+        """
+        Stores a batch of posts as it is handed to the download stage.
+
+        :param posts: List of post dictionaries with their original image URLs.
+        """
+        with self._lock:
+            self.index["batches"].append(json.loads(json.dumps(posts)))
+
+    def record_media(self, url, file_path: Path, seconds):
+        """
+        Stores a downloaded file under the URL it was downloaded from.
+
+        :param url: The URL of the file.
+        :param file_path: Path of the downloaded file.
+        :param seconds: How long the download took.
+        """
+        file_path = Path(file_path)
+        with self._lock:
+            if url in self.index["media"]:
+                return
+            suffix = file_path.suffix.lower()
+            name = f"media/{len(self.index['media']):06d}{suffix}"
+            compression = zipfile.ZIP_STORED if suffix in STORED_SUFFIXES else zipfile.ZIP_DEFLATED
+            self.zip.write(file_path, name, compress_type=compression)
+            self.index["media"][url] = {"file": name, "bytes": file_path.stat().st_size,
+                                        "seconds": round(seconds, 6)}
+
+    def close(self):
+        """Writes the index and closes the cassette."""
+        with self._lock:
+            self.zip.writestr(INDEX_FILE_NAME, json.dumps(self.index))
+            self.zip.close()
+
+
+class Cassette:
+    """
+    Reads a cassette written by `CassetteWriter`.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.zip = zipfile.ZipFile(self.path)
+        self.index = json.loads(self.zip.read(INDEX_FILE_NAME))
+        if self.index.get("version") != CASSETTE_VERSION:
+            raise ValueError(f"Unsupported cassette version {self.index.get('version')} in {self.path}")
+        self._lock = threading.Lock()
+
+    @property
+    def artist(self):
+        return self.index["artist"]
+
+    @property
+    def pages(self):
+        return self.index["pages"]
+
+    @property
+    def batches(self):
+        return self.index["batches"]
+
+    @property
+    def media(self):
+        return self.index["media"]
+
+    def read(self, name):
+        """
+        Reads a file of the cassette.
+
+        :param name: The name of the file within the cassette, as given in the index.
+        :return: bytes
+        """
+        # ZipFile objects are not safe for concurrent reads
+        with self._lock:
+            return self.zip.read(name)
+
+    def close(self):
+        self.zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# The active writer, the hooks in the scraper and the download path do nothing while it is None
+_writer = None
+
+
+def start_recording(path: Path, artist):
+    """
+    Starts recording the session of an artist into a new cassette.
+
+    :param path: Path of the cassette file.
+    :param artist: The artist dictionary.
+    """
+    global _writer
+    stop_recording()
+    _writer = CassetteWriter(path, artist)
+
+
+def stop_recording():
+    """Finishes the active cassette, if any."""
+    global _writer
+    if _writer is not None:
+        _writer.close()
+        print(f"Recorded {len(_writer.index['pages'])} pages and {len(_writer.index['media'])} files to "
+              f"{_writer.path}")
+        _writer = None
+
+
+def recording():
+    return _writer is not None
+
+
+def record_page(page, cards):
+    if _writer is not None:
+        _writer.record_page(page, cards)
+
+
+def record_posts(posts):
+    if _writer is not None:
+        _writer.record_posts(posts)
+
+
+def record_media(url, file_path: Path, seconds):
+    if _writer is not None:
+        _writer.record_media(url, file_path, seconds)
@@ -0,0 +1,140 @@
+import json
+import os
+from pathlib import Path
+
+JOURNAL_FILE_NAME = ".journal.jsonl"
+
+
+class ScrapeJournal:
+    """
+    An append-only journal of the progress of scraping a single artist.
+
+    Every record is written as soon as the corresponding work is done: the number of pages loaded, the
+    posts extracted from the feed, the posts skipped without extracting them further, every finished image
+    download and the posts saved to `posts.json`.
+    If a run dies halfway through, the next run reads the journal back to skip the pages it already went
+    through and to finish the posts whose images were queued but never downloaded or saved.
+
+    The journal is deleted once the end of the feed has been reached.
+    """
+
+    def __init__(self, artist_folder: Path):
+        self.path = artist_folder / JOURNAL_FILE_NAME
+        self.pages = 0
+        self.extracted = {}
+        self.saved_ids = set()
+        self.skipped_ids = set()
+        self.downloads = {}
+        self.resumed = self.path.exists()
+
+        if self.resumed:
+            self._load()
+
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as file:
+            content = file.read()
+
+        # Terminate a torn last line, so the next record starts on a line of its own
+        if content and not content.endswith("\n"):
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write("\n")
+
+        for line in content.splitlines():
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # The last line may be torn if the process died while writing it
+                continue
+
+            if record["type"] == "page":
+                self.pages = max(self.pages, record["page"])
+            elif record["type"] == "post":
+                self.extracted[record["post"]["id"]] = record["post"]
+            elif record["type"] == "download":
+                self.downloads[record["url"]] = record["path"]
+            elif record["type"] == "saved":
+                self.saved_ids.update(record["ids"])
+            elif record["type"] == "seen":
+                self.skipped_ids.update(record["ids"])
+
+    def _write(self, record):
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+    @property
+    def seen_post_ids(self):
+        """The IDs of all posts that were already extracted, saved or not, or skipped."""
+        return set(self.extracted) | self.saved_ids | self.skipped_ids
+
+    def pending_posts(self):
+        """
+        Returns the posts that were extracted but not saved yet.
+
+        :return: A list of post dictionaries with their original image URLs.
+        """
+        return [post for post_id, post in self.extracted.items() if post_id not in self.saved_ids]
+
+    def record_page(self, page):
+        """
+        Records that the given number of pages has been loaded with "Load more".
+
+        :param page: The number of successful "Load more" clicks so far.
+        """
+        self.pages = max(self.pages, page)
+        self._write({"type": "page", "page": page})
+
+    def record_posts(self, posts):
+        """
+        Records freshly extracted posts before their images are downloaded.
+
+        :param posts: List of post dictionaries with their original image URLs.
+        """
+        for post in posts:
+            self.extracted[post["id"]] = dict(post)
+            self._file.write(json.dumps({"type": "post", "post": post}) + "\n")
+        self._file.flush()
+
+    def record_seen(self, post_ids):
+        """
+        Records posts that were skipped without being saved, e.g. because they did not change.
+
+        Their cards are skipped and pruned on resume like those of extracted posts, but there is nothing to save.
+
+        :param post_ids: The IDs of the skipped posts.
+        """
+        post_ids = list(post_ids)
+        if not post_ids:
+            return
+        self.skipped_ids.update(post_ids)
+        self._write({"type": "seen", "ids": post_ids})
+
+    def record_download(self, url, path):
+        """
+        Records a finished image download.
+
+        :param url: The URL of the image.
+        :param path: The path of the image relative to the artist folder.
+        """
+        self.downloads[url] = path
+        self._write({"type": "download", "url": url, "path": path})
+
+    def record_saved(self, post_ids):
+        """
+        Records that the given posts have been written to `posts.json`.
+
+        :param post_ids: The IDs of the saved posts.
+        """
+        post_ids = list(post_ids)
+        self.saved_ids.update(post_ids)
+        self._write({"type": "saved", "ids": post_ids})
+
+    def close(self):
+        """Closes the journal, keeping it on disk for the next run."""
+        self._file.close()
+
+    def complete(self):
+        """Closes and deletes the journal after the artist has been scraped completely."""
+        self._file.close()
+        os.remove(self.path)
@@ -1,8 +1,7 @@
 import os
 from pathlib import Path
-from dotenv import load_dotenv
 
-load_dotenv()
+from src.size_utils import parse_size
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 
@@ -11,21 +10,101 @@ class Config:
     """
     A configuration class for managing environment variables and validating file paths.
 
-    This class loads essential configurations from a `.env` file and provides a method
+    This class loads essential configurations from a `.env` file (see `Config.load`) and provides a method
     to validate critical settings such as email, password, and paths for Firefox and
     GeckoDriver binaries. It ensures that all required variables are set and the specified
     paths exist in the file system.
     """
-    EMAIL: str = os.getenv("EMAIL")
-    PASSWORD: str = os.getenv("PASSWORD")
-    FIREFOX_PATH: Path = Path(os.getenv("FIREFOX_PATH", ""))
-    GECKO_DRIVER_PATH: Path = Path(os.getenv("GECKO_PATH", ""))
-    ARTIST_FILE_PATH: Path = Path(
-        os.getenv("ARTIST_FILE_PATH", PROJECT_ROOT / "artists.json")
-    )
-    EXAMPLE_FILE_PATH: Path = PROJECT_ROOT / "artists.example.json"
-    OUTPUT_FOLDER: Path = Path(os.getenv("OUTPUT_FOLDER", PROJECT_ROOT / "output"))
-    DEBUG: bool = os.getenv("DEBUG", "false").lower() == "true"
+    EMAIL: str
+    PASSWORD: str
+    FIREFOX_PATH: Path
+    GECKO_DRIVER_PATH: Path
+    ARTIST_FILE_PATH: Path
+    EXAMPLE_FILE_PATH: Path
+    OUTPUT_FOLDER: Path
+    DEBUG: bool
+    KEEP_REVISIONS: bool
+    FRESHNESS_PROBE: bool
+    FRESHNESS_SLA_DAYS: float
+    SCHEDULER_MIN_PROBABILITY: float
+    RUN_BUDGET_MINUTES: float
+    RUN_MAX_ARTISTS: int
+    PRUNE_DOM: bool
+    FETCH_POST_DETAILS: bool
+    POST_DETAIL_WORKERS: int
+    DOWNLOAD_ATTACHMENTS: bool
+    MAX_ATTACHMENT_BYTES: int
+    SEGMENT_THRESHOLD_BYTES: int
+    DOWNLOAD_SEGMENTS: int
+    DOWNLOAD_BUDGET_BYTES: int
+    ARTIST_DOWNLOAD_BUDGET_BYTES: int
+    DOWNLOAD_BANDWIDTH_BYTES: int
+    MEDIA_PROCESSING: bool
+    MEDIA_WORKERS: int
+    SEARCH_INDEX: bool
+    SEARCH_INDEX_PATH: Path
+    EXPORT_FOLDER: Path
+    METRICS_TRACE_PATH: Path
+    METRICS_PROMETHEUS_PATH: Path
+
+    _loaded = False
+
+    @classmethod
+    def load(cls, env_file=None):
+        """
+        Loads the `.env` file into the environment and resolves the settings again. Only the first call has an
+        effect, so every entry point can call it.
+
+        :param env_file: Optional path of the `.env` file, by default it is searched from the working directory.
+        """
+        if cls._loaded:
+            return
+        from dotenv import load_dotenv
+
+        load_dotenv(env_file)
+        cls._resolve()
+        cls._loaded = True
+
+    @classmethod
+    def _resolve(cls):
+        """
+        Reads the settings from the environment.
+        """
+        cls.EMAIL = os.getenv("EMAIL")
+        cls.PASSWORD = os.getenv("PASSWORD")
+        cls.FIREFOX_PATH = Path(os.getenv("FIREFOX_PATH", ""))
+        cls.GECKO_DRIVER_PATH = Path(os.getenv("GECKO_PATH", ""))
+        cls.ARTIST_FILE_PATH = Path(
+            os.getenv("ARTIST_FILE_PATH", PROJECT_ROOT / "artists.json")
+        )
+        cls.EXAMPLE_FILE_PATH = PROJECT_ROOT / "artists.example.json"
+        cls.OUTPUT_FOLDER = Path(os.getenv("OUTPUT_FOLDER", PROJECT_ROOT / "output"))
+        cls.DEBUG = os.getenv("DEBUG", "false").lower() == "true"
+        cls.KEEP_REVISIONS = os.getenv("KEEP_REVISIONS", "false").lower() == "true"
+        cls.FRESHNESS_PROBE = os.getenv("FRESHNESS_PROBE", "true").lower() == "true"
+        cls.FRESHNESS_SLA_DAYS = float(os.getenv("FRESHNESS_SLA_DAYS", "7"))
+        cls.SCHEDULER_MIN_PROBABILITY = float(os.getenv("SCHEDULER_MIN_PROBABILITY", "0.2"))
+        cls.RUN_BUDGET_MINUTES = float(os.getenv("RUN_BUDGET_MINUTES", "0"))
+        cls.RUN_MAX_ARTISTS = int(os.getenv("RUN_MAX_ARTISTS", "0"))
+        cls.PRUNE_DOM = os.getenv("PRUNE_DOM", "false").lower() == "true"
+        cls.FETCH_POST_DETAILS = os.getenv("FETCH_POST_DETAILS", "true").lower() == "true"
+        cls.POST_DETAIL_WORKERS = int(os.getenv("POST_DETAIL_WORKERS", "4"))
+        cls.DOWNLOAD_ATTACHMENTS = os.getenv("DOWNLOAD_ATTACHMENTS", "true").lower() == "true"
+        cls.MAX_ATTACHMENT_BYTES = int(os.getenv("MAX_ATTACHMENT_BYTES", "0")) or None
+        cls.SEGMENT_THRESHOLD_BYTES = int(os.getenv("SEGMENT_THRESHOLD_BYTES", str(32 * 1024 * 1024)))
+        cls.DOWNLOAD_SEGMENTS = int(os.getenv("DOWNLOAD_SEGMENTS", "4"))
+        cls.DOWNLOAD_BUDGET_BYTES = parse_size(os.getenv("DOWNLOAD_BUDGET"))
+        cls.ARTIST_DOWNLOAD_BUDGET_BYTES = parse_size(os.getenv("ARTIST_DOWNLOAD_BUDGET"))
+        cls.DOWNLOAD_BANDWIDTH_BYTES = parse_size(os.getenv("DOWNLOAD_BANDWIDTH"))
+        cls.MEDIA_PROCESSING = os.getenv("MEDIA_PROCESSING", "true").lower() == "true"
+        cls.MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", "0")) or None
+        cls.SEARCH_INDEX = os.getenv("SEARCH_INDEX", "true").lower() == "true"
+        cls.SEARCH_INDEX_PATH = Path(os.getenv("SEARCH_INDEX_PATH", cls.OUTPUT_FOLDER / "search.db"))
+        cls.EXPORT_FOLDER = Path(os.getenv("EXPORT_FOLDER", cls.OUTPUT_FOLDER / "parquet"))
+        cls.METRICS_TRACE_PATH = Path(os.getenv("METRICS_TRACE_PATH")) if os.getenv("METRICS_TRACE_PATH") else None
+        cls.METRICS_PROMETHEUS_PATH = (
+            Path(os.getenv("METRICS_PROMETHEUS_PATH")) if os.getenv("METRICS_PROMETHEUS_PATH") else None
+        )
 
     @staticmethod
     def validate():
@@ -79,3 +158,7 @@ class Config:
         Ensure the output folder exists.
         """
         Config.OUTPUT_FOLDER.mkdir(parents=True, exist_ok=True)
+
+
+# Settings from the environment are available right away, the `.env` file is only read by `Config.load`
+Config._resolve()
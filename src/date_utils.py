@@ -117,3 +117,31 @@ def parse_date(raw_date):
         print(f"Unexpected error parsing date '{raw_date}': {e}")
 
     return None
+
+
+def parse_date_bound(raw_bound, end=False, today=None):
+    """
+    Parses the bound of a date range given on the command line or in the artists file.
+    Handles full dates ('2024-03-01'), years ('2023') and relative days ('90d').
+    :param raw_bound: str Raw bound.
+    :param end: bool Whether the bound is the end of a range, i.e. a year means its last day instead of its first.
+    :param today: datetime Current date, defaults to now.
+    :return: str Parsed date in 'YYYY-MM-DD' format or None if the bound is empty.
+    """
+    if not raw_bound:
+        return None
+
+    raw_bound = str(raw_bound).strip().lower()
+    today = today or datetime.now()
+
+    if raw_bound.endswith("d") and raw_bound[:-1].isdigit():
+        return (today - timedelta(days=int(raw_bound[:-1]))).strftime("%Y-%m-%d")
+    if raw_bound.isdigit() and len(raw_bound) == 4:
+        return f"{raw_bound}-12-31" if end else f"{raw_bound}-01-01"
+
+    try:
+        return datetime.strptime(raw_bound, "%Y-%m-%d").strftime("%Y-%m-%d")
+    except ValueError as e:
+        raise ValueError(
+            f"Invalid date bound: {raw_bound} (expected YYYY-MM-DD, YYYY or a number of days like 90d)"
+        ) from e
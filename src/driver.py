@@ -1,7 +1,10 @@
+import os
+
 from selenium import webdriver
 from selenium.webdriver.firefox.options import Options
 from selenium.webdriver.firefox.service import Service
 
+from src import metrics
 from src.config import Config
 
 
@@ -21,4 +24,43 @@ def init_driver():
     service = Service(str(Config.GECKO_DRIVER_PATH))
     driver = webdriver.Firefox(service=service, options=options)
     driver.maximize_window()
-    return driver
+    return metrics.instrument_driver(driver)
+
+
+def browser_rss_kb(driver):
+    """
+    Returns the resident memory of the browser, including all of its content processes.
+
+    Reads the process tree from `/proc`, so it is only available on Linux.
+
+    :param driver: Selenium WebDriver instance.
+    :returns: The combined RSS in KB, or None if it cannot be determined.
+    """
+    root_pid = driver.capabilities.get("moz:processID")
+    if not root_pid or not os.path.isdir("/proc"):
+        return None
+
+    children = {}
+    rss = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/status", "r") as file:
+                status = dict(line.split(":", 1) for line in file if ":" in line)
+        except OSError:
+            continue
+        pid = int(entry)
+        children.setdefault(int(status["PPid"]), []).append(pid)
+        rss[pid] = int(status["VmRSS"].split()[0]) if "VmRSS" in status else 0
+
+    if root_pid not in rss:
+        return None
+
+    total = 0
+    pending = [root_pid]
+    while pending:
+        pid = pending.pop()
+        total += rss.get(pid, 0)
+        pending.extend(children.get(pid, []))
+    return total
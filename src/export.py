@@ -0,0 +1,194 @@
+import os
+import shutil
+from datetime import date
+from pathlib import Path
+
+from src.post_store import POSTS_FILE_NAME, iter_posts, load_json_state, posts_file_signature, save_json_state
+
+EXPORT_MANIFEST_FILE_NAME = "_manifest.json"
+# Name pyarrow uses for a null partition value
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+
+def post_schema():
+    """
+    Returns the Arrow schema of the exported posts, without the `artist` and `year` partition columns.
+
+    :return: pyarrow.Schema
+    """
+    import pyarrow as pa
+
+    image_meta = pa.struct([
+        ("path", pa.string()),
+        ("valid", pa.bool_()),
+        ("bytes", pa.int64()),
+        ("width", pa.int32()),
+        ("height", pa.int32()),
+        ("format", pa.string()),
+        ("dhash", pa.string()),
+    ])
+    return pa.schema([
+        ("id", pa.int64()),
+        ("title", pa.string()),
+        ("date", pa.date32()),
+        ("content", pa.string()),
+        ("tags", pa.list_(pa.string())),
+        ("url", pa.string()),
+        ("images", pa.list_(pa.string())),
+        ("image_meta", pa.list_(image_meta)),
+        ("attachments", pa.list_(pa.string())),
+        ("deferred_media", pa.int32()),
+        ("content_hash", pa.string()),
+    ])
+
+
+def to_row(post):
+    """
+    Converts a stored post into a row of the export schema.
+
+    :param post: The post dictionary.
+    :return: A dictionary with the columns of `post_schema`.
+    """
+    image_meta = post.get("image_meta", {})
+    return {
+        "id": int(post["id"]),
+        "title": post.get("title"),
+        "date": date.fromisoformat(post["date"]) if post.get("date") else None,
+        "content": post.get("content"),
+        "tags": post.get("tags", []),
+        "url": post.get("url"),
+        "images": post.get("images", []),
+        "image_meta": [
+            {"path": image, "valid": meta.get("valid"), "bytes": meta.get("bytes"), "width": meta.get("width"),
+             "height": meta.get("height"), "format": meta.get("format"), "dhash": meta.get("dhash")}
+            for image, meta in image_meta.items()
+        ],
+        "attachments": post.get("attachments", []),
+        "deferred_media": len(post.get("deferred_media", [])),
+        "content_hash": post.get("content_hash"),
+    }
+
+
+def export_artist(posts_file: Path, artist_folder: Path):
+    """
+    Writes the posts of an artist as one Parquet file per year, replacing its previous export.
+
+    The files are written to a temporary folder first and swapped in by renaming the previous export aside, so
+    readers never see a half-written artist and an interrupted export keeps the previous one.
+
+    :param posts_file: Path to the `posts.json` file of the artist.
+    :param artist_folder: The `artist=<name>` folder of the dataset.
+    :return: The number of exported posts.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    old_folder = artist_folder.with_name("_old_" + artist_folder.name)
+    if old_folder.exists() and not artist_folder.exists():
+        # An export that died between the two renames left the previous data aside
+        os.replace(old_folder, artist_folder)
+
+    years = {}
+    for post in iter_posts(posts_file):
+        year = post["date"][:4] if post.get("date") else NULL_PARTITION
+        years.setdefault(year, []).append(to_row(post))
+
+    schema = post_schema()
+    # Folders starting with "_" are ignored by `open_dataset`
+    tmp_folder = artist_folder.with_name("_" + artist_folder.name)
+    shutil.rmtree(tmp_folder, ignore_errors=True)
+    for year, rows in years.items():
+        rows.sort(key=lambda row: (row["date"] is None, row["date"], row["id"]))
+        (tmp_folder / f"year={year}").mkdir(parents=True)
+        pq.write_table(pa.Table.from_pylist(rows, schema=schema), tmp_folder / f"year={year}" / "part-0.parquet",
+                       compression="zstd")
+
+    # The previous export is moved aside before the new one takes its place and only deleted afterwards
+    shutil.rmtree(old_folder, ignore_errors=True)
+    if artist_folder.exists():
+        os.replace(artist_folder, old_folder)
+    if years:
+        os.replace(tmp_folder, artist_folder)
+    shutil.rmtree(old_folder, ignore_errors=True)
+    return sum(len(rows) for rows in years.values())
+
+
+def export_archive(artists, output_folder: Path, export_folder: Path, force=False, prune=False):
+    """
+    Exports the posts of the given artists into a Parquet dataset partitioned by artist and year.
+
+    Only artists whose `posts.json` changed since the last export are rewritten, which is tracked by the
+    signatures in the manifest of the dataset.
+
+    :param artists: List of artist dictionaries with a 'url_name' key.
+    :param output_folder: The root output folder containing one folder per artist.
+    :param export_folder: The folder of the dataset.
+    :param force: Rewrite all artists.
+    :param prune: Remove the partitions of all other artists, e.g. ones that were removed from the artist file.
+    :return: A dictionary with the 'exported', 'unchanged' and 'removed' artists and the number of exported
+        'posts'.
+    """
+    manifest_file = export_folder / EXPORT_MANIFEST_FILE_NAME
+    manifest = {} if force else load_json_state(manifest_file)
+    result = {"exported": [], "unchanged": [], "removed": [], "posts": 0}
+
+    export_folder.mkdir(parents=True, exist_ok=True)
+    for artist in artists:
+        url_name = artist["url_name"]
+        posts_file = output_folder / url_name / POSTS_FILE_NAME
+        signature = posts_file_signature(posts_file)
+        if signature is None:
+            continue
+        if manifest.get(url_name, {}).get("signature") == signature:
+            result["unchanged"].append(url_name)
+            continue
+
+        count = export_artist(posts_file, export_folder / f"artist={url_name}")
+        manifest[url_name] = {"signature": signature, "posts": count}
+        result["exported"].append(url_name)
+        result["posts"] += count
+        # Saved after every artist, so an interrupted export does not redo the finished ones
+        save_json_state(manifest_file, manifest)
+
+    if prune:
+        result["removed"] = prune_export(export_folder, set(result["exported"] + result["unchanged"]))
+    return result
+
+
+def prune_export(export_folder: Path, keep):
+    """
+    Removes the partitions and manifest entries of all artists but the given ones.
+
+    :param export_folder: The folder of the dataset.
+    :param keep: URL names of the artists to keep.
+    :return: The sorted URL names of the removed artists.
+    """
+    manifest_file = export_folder / EXPORT_MANIFEST_FILE_NAME
+    manifest = load_json_state(manifest_file)
+    removed = {url_name for url_name in manifest if url_name not in keep}
+    for artist_folder in export_folder.glob("artist=*"):
+        url_name = artist_folder.name.split("=", 1)[1]
+        if url_name not in keep:
+            shutil.rmtree(artist_folder, ignore_errors=True)
+            removed.add(url_name)
+
+    if removed:
+        save_json_state(manifest_file, {url_name: entry for url_name, entry in manifest.items() if url_name in keep})
+    return sorted(removed)
+
+
+def open_dataset(export_folder: Path):
+    """
+    Opens an exported dataset with its `artist` and `year` partition columns.
+
+    Filters on the partition columns skip whole files and only the selected columns are read, e.g.
+    `open_dataset(folder).to_table(columns=["date", "tags"], filter=pc.field("year") >= 2023)`.
+
+    :param export_folder: The folder of the dataset.
+    :return: pyarrow.dataset.Dataset
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    partitioning = ds.partitioning(pa.schema([("artist", pa.string()), ("year", pa.int16())]), flavor="hive")
+    return ds.dataset(export_folder, format="parquet", partitioning=partitioning, ignore_prefixes=["_", "."])
@@ -1,14 +1,70 @@
+import argparse
 import time
+from datetime import datetime
+from pathlib import Path
 
+from src import cassette, metrics
 from src.config import Config
+from src.date_utils import parse_date_bound
 from src.driver import init_driver
 from src.login import login
+from src.probe import COOKIES_FILE_NAME, FreshnessProbe, save_session_cookies
+from src.quota import DownloadQuota
+from src.scheduler import RefreshScheduler
 from src.scraper import scrape_artist_posts
 from src.utils import load_artists
 
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape the posts of the artists in the artists file.")
+    parser.add_argument("--since", help="Only scrape posts published on or after this date "
+                                        "(YYYY-MM-DD, YYYY or a number of days like 90d). Overrides the artists file.")
+    parser.add_argument("--until", help="Only scrape posts published on or before this date "
+                                        "(YYYY-MM-DD or YYYY). Overrides the artists file.")
+    parser.add_argument("--schedule", action="store_true",
+                        help="Only scrape the artists that are likely to have new posts, most likely first.")
+    parser.add_argument("--budget-minutes", type=float, default=argparse.SUPPRESS,
+                        help="With --schedule, stop starting new artists after this many minutes. "
+                             "Defaults to RUN_BUDGET_MINUTES.")
+    parser.add_argument("--max-artists", type=int, default=argparse.SUPPRESS,
+                        help="With --schedule, scrape at most this many artists. Defaults to RUN_MAX_ARTISTS.")
+    parser.add_argument("--no-probe", action="store_true",
+                        help="Open every artist in the browser, even if the probe found no new posts.")
+    parser.add_argument("--record", type=Path, metavar="FOLDER",
+                        help="Record every artist run into a cassette in this folder, see bench.replay.")
+    args = parser.parse_args(argv)
+
+    Config.load()
+    budget_minutes = getattr(args, "budget_minutes", Config.RUN_BUDGET_MINUTES)
+    max_artists = getattr(args, "max_artists", Config.RUN_MAX_ARTISTS)
+
+    # Fail on invalid bounds before starting the browser
+    parse_date_bound(args.since)
+    parse_date_bound(args.until, end=True)
+
     Config.validate()
+    metrics.configure(Config.METRICS_TRACE_PATH, Config.METRICS_PROMETHEUS_PATH)
+
+    artists = load_artists(Config.ARTIST_FILE_PATH)
+    scheduler = None
+    if args.schedule:
+        scheduler = RefreshScheduler(
+            Config.OUTPUT_FOLDER, freshness_sla_days=Config.FRESHNESS_SLA_DAYS,
+            min_probability=Config.SCHEDULER_MIN_PROBABILITY,
+            budget_seconds=budget_minutes * 60 if budget_minutes else None, max_artists=max_artists,
+        )
+        artists = scheduler.plan(artists)
+        print(f"Scheduled {len(artists)} artists: {', '.join(artist['url_name'] for artist in artists)}")
+
+    if Config.FRESHNESS_PROBE and not args.no_probe:
+        artists = probe_artists(artists, scheduler)
+
+    if not artists:
+        print("No artist has new posts, nothing to scrape.")
+        return
+
+    quota = DownloadQuota(Config.DOWNLOAD_BUDGET_BYTES, Config.ARTIST_DOWNLOAD_BUDGET_BYTES,
+                          Config.DOWNLOAD_BANDWIDTH_BYTES)
 
     driver = init_driver()
 
@@ -17,17 +73,41 @@ def main():
 
         # Wait for session to stabilize
         time.sleep(5)
+        save_session_cookies(driver.get_cookies(), Config.OUTPUT_FOLDER / COOKIES_FILE_NAME)
 
-        artists = load_artists(Config.ARTIST_FILE_PATH)
         for artist in artists:
+            if scheduler and scheduler.budget_exhausted():
+                print("The budget of this run is used up, the remaining artists are scraped in the next run.")
+                break
+
             print(f"Scraping posts for artist: {artist['display_name']} ({artist['url_name']})")
             url = f"https://www.patreon.com/c/{artist["url_name"]}/posts"
             driver.get(url)
 
             wait_for_user_to_dismiss_consent()
 
+            since = parse_date_bound(args.since or artist.get("since"))
+            until = parse_date_bound(args.until or artist.get("until"), end=True)
+            if since or until:
+                print(f"Only scraping posts from {since or 'the beginning'} to {until or 'today'}.")
+
             while True:
-                scrape_artist_posts(driver, artist)
+                started = time.monotonic()
+                if args.record:
+                    cassette.start_recording(
+                        args.record / f"{artist['url_name']}-{datetime.now():%Y%m%d-%H%M%S}{cassette.CASSETTE_SUFFIX}",
+                        artist,
+                    )
+                try:
+                    completed = scrape_artist_posts(driver, artist, since, until, quota)
+                finally:
+                    cassette.stop_recording()
+
+                if scheduler:
+                    # A failed scrape is not a check, the artist stays due for the next run
+                    if completed:
+                        scheduler.record_run(artist, time.monotonic() - started)
+                    break
 
                 # Prompt the user for action
                 user_input = input(
@@ -37,9 +117,34 @@ def main():
 
                 if user_input.strip():
                     break
+        if quota.total and any(quota.exhausted(artist["url_name"]) for artist in artists):
+            print("The download budget was used up, run `python -m src download` to download the deferred media.")
     finally:
         print("Scraping complete.")
         driver.close()
+        metrics.close()
+
+
+def probe_artists(artists, scheduler=None):
+    """
+    Filters out the artists whose newest post is already stored locally, without starting the browser.
+
+    :param artists: List of artist dictionaries.
+    :param scheduler: Optional RefreshScheduler, a successful probe counts as a check of the artist.
+    :return: The artists that need to be scraped.
+    """
+    probe = FreshnessProbe(Config.OUTPUT_FOLDER)
+    changed = []
+    for artist in artists:
+        started = time.monotonic()
+        if probe.has_changes(artist):
+            changed.append(artist)
+            continue
+
+        print(f"No new posts from {artist['display_name']} ({artist['url_name']}), skipping.")
+        if scheduler:
+            scheduler.record_run(artist, time.monotonic() - started)
+    return changed
 
 
 def wait_for_user_to_dismiss_consent():
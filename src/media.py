@@ -0,0 +1,178 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from PIL import Image
+
+THUMBNAILS_FOLDER_NAME = "thumbnails"
+
+
+def inspect_image(image_path, thumbnail_path=None, thumbnail_size=256):
+    """
+    Verifies that an image can be fully decoded and collects its metadata.
+
+    Runs in a worker process of `MediaProcessor`, so it only takes and returns plain values.
+
+    :param image_path: str Path to the image file.
+    :param thumbnail_path: str Optional path to write a JPEG thumbnail to.
+    :param thumbnail_size: The maximum width and height of the thumbnail.
+    :return: A dictionary with 'valid' and 'bytes', plus 'width', 'height', 'format' and 'dhash' for valid
+        images or 'error' for broken ones.
+    """
+    meta = {"valid": False, "bytes": 0}
+
+    try:
+        meta["bytes"] = os.path.getsize(image_path)
+
+        # verify() catches structural problems, load() catches truncated pixel data
+        with Image.open(image_path) as image:
+            image.verify()
+        with Image.open(image_path) as image:
+            image.load()
+            meta.update(valid=True, width=image.width, height=image.height, format=image.format,
+                        dhash=difference_hash(image))
+
+            if thumbnail_path:
+                Path(thumbnail_path).parent.mkdir(parents=True, exist_ok=True)
+                thumbnail = image.convert("RGB")
+                thumbnail.thumbnail((thumbnail_size, thumbnail_size))
+                thumbnail.save(thumbnail_path, "JPEG", quality=85)
+    except Exception as e:
+        meta["error"] = f"{type(e).__name__}: {e}"
+
+    return meta
+
+
+def difference_hash(image, hash_size=8):
+    """
+    Computes a perceptual difference hash of an image.
+
+    Near-duplicate images (re-encoded, resized or slightly edited) have hashes with a small Hamming distance.
+
+    :param image: A PIL image.
+    :param hash_size: The hash has hash_size * hash_size bits.
+    :return: str The hash as a hexadecimal string.
+    """
+    pixels = list(image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS).getdata())
+
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return f"{value:0{hash_size * hash_size // 4}x}"
+
+
+def hash_distance(first, second):
+    """
+    Returns the Hamming distance of two difference hashes.
+
+    :param first: str A hash returned by `difference_hash`.
+    :param second: str Another hash of the same size.
+    :return: The number of differing bits.
+    """
+    return (int(first, 16) ^ int(second, 16)).bit_count()
+
+
+def thumbnail_path_for(image_path: Path):
+    """
+    Returns the path of the pre-generated thumbnail of an image in an artist's `images` folder.
+
+    :param image_path: Path to an image below `{ARTIST}/images/`.
+    :return: The thumbnail path below `{ARTIST}/thumbnails/`, or None if the image is not inside an images folder.
+    """
+    parts = Path(image_path).parts
+    if "images" not in parts:
+        return None
+    index = len(parts) - 1 - parts[::-1].index("images")
+    # Keep the original extension, so 'a.png' and 'a.gif' get different thumbnails
+    return Path(*parts[:index], THUMBNAILS_FOLDER_NAME, *parts[index + 1:-1], parts[-1] + ".jpg")
+
+
+class MediaProcessor:
+    """
+    Verifies downloaded images, records their metadata and pre-generates gallery thumbnails in a process pool.
+
+    Work is submitted per batch of posts and collected later, so decoding runs in parallel with the scraper
+    waiting on the browser. The results are stored in each post's 'image_meta', keyed by the image path.
+    """
+
+    def __init__(self, workers=None, thumbnail_size=256):
+        self.thumbnail_size = thumbnail_size
+        # The scraper already runs threads (post details, downloads) when the pool starts, forking them may deadlock
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    def shutdown(self):
+        self.executor.shutdown()
+
+    def submit(self, posts, artist_folder: Path, force=False):
+        """
+        Starts processing the images of the given posts.
+
+        :param posts: List of post dictionaries whose 'images' are paths relative to the artist folder.
+        :param artist_folder: Path to the output folder of the artist.
+        :param force: Whether to also process images that already have metadata.
+        :return: A pending batch to pass to `collect`.
+        """
+        jobs = []
+        for post in posts:
+            known = post.get("image_meta", {})
+            for image in post["images"]:
+                if image in known and not force:
+                    continue
+                thumbnail = thumbnail_path_for(Path(image))
+                future = self.executor.submit(
+                    inspect_image, str(artist_folder / image),
+                    str(artist_folder / thumbnail) if thumbnail else None, self.thumbnail_size
+                )
+                jobs.append((post, image, thumbnail, future))
+        return posts, jobs
+
+    def collect(self, batch):
+        """
+        Waits for a pending batch and stores the results in the posts.
+
+        :param batch: A pending batch returned by `submit`.
+        :return: The list of posts with updated 'image_meta' attributes.
+        """
+        posts, jobs = batch
+        for post, image, thumbnail, future in jobs:
+            meta = future.result()
+            if meta["valid"] and thumbnail:
+                meta["thumbnail"] = str(thumbnail)
+            elif not meta["valid"]:
+                print(f"Warning: {image} of post {post['id']} is not a valid image ({meta['error']})")
+            post.setdefault("image_meta", {})[image] = meta
+        return posts
+
+
+def find_near_duplicates(posts, max_distance=4):
+    """
+    Finds pairs of images with similar difference hashes.
+
+    :param posts: List of post dictionaries with 'image_meta'.
+    :param max_distance: The maximum Hamming distance to consider two images near-duplicates.
+    :return: A list of (image, other_image, distance) tuples.
+    """
+    hashes = [
+        (image, meta["dhash"])
+        for post in posts
+        for image, meta in post.get("image_meta", {}).items()
+        if meta.get("dhash")
+    ]
+
+    duplicates = []
+    for index, (image, image_hash) in enumerate(hashes):
+        for other, other_hash in hashes[index + 1:]:
+            distance = hash_distance(image_hash, other_hash)
+            if distance <= max_distance:
+                duplicates.append((image, other, distance))
+    return duplicates
@@ -0,0 +1,230 @@
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from pathlib import Path
+
+PREFIX = "patreon_scraper"
+
+# Returned by `span` while metrics are disabled, so instrumented code only pays for one attribute check
+_NOOP_SPAN = nullcontext()
+
+
+class MetricsRecorder:
+    """
+    Collects timing spans and counters of the scraper's hot paths.
+
+    Spans are appended to a JSON-lines trace file as they finish, while the aggregated counters and timings
+    are written to a Prometheus text-format file on `flush`. A disabled recorder does no work at all.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.trace_path = None
+        self.prometheus_path = None
+        self.counters = {}
+        self.timings = {}
+        self._trace_file = None
+        self._lock = threading.Lock()
+
+    def configure(self, trace_path: Path = None, prometheus_path: Path = None):
+        """
+        Enables the recorder if at least one output path is given.
+
+        :param trace_path: Path of the JSON-lines trace file to append spans to.
+        :param prometheus_path: Path of the Prometheus text-format file to write on `flush`.
+        """
+        self.close()
+        self.trace_path = Path(trace_path) if trace_path else None
+        self.prometheus_path = Path(prometheus_path) if prometheus_path else None
+        self.enabled = bool(self.trace_path or self.prometheus_path)
+
+        if self.trace_path:
+            self.trace_path.parent.mkdir(parents=True, exist_ok=True)
+            self._trace_file = open(self.trace_path, "a", encoding="utf-8", buffering=1 << 16)
+
+    def increment(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            timing = self.timings.get(key)
+            if timing is None:
+                self.timings[key] = [1, seconds, seconds]
+            else:
+                timing[0] += 1
+                timing[1] += seconds
+                timing[2] = max(timing[2], seconds)
+
+    def trace(self, record):
+        if self._trace_file:
+            with self._lock:
+                self._trace_file.write(json.dumps(record) + "\n")
+
+    def flush(self):
+        """Flushes the trace file and rewrites the Prometheus file."""
+        if self._trace_file:
+            with self._lock:
+                self._trace_file.flush()
+        if self.prometheus_path:
+            self.prometheus_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.prometheus_path.with_suffix(".tmp")
+            tmp_path.write_text(self.to_prometheus(), encoding="utf-8")
+            os.replace(tmp_path, self.prometheus_path)
+
+    def close(self):
+        """Flushes all outputs and closes the trace file."""
+        if not self.enabled:
+            return
+        self.flush()
+        if self._trace_file:
+            self._trace_file.close()
+            self._trace_file = None
+
+    def to_prometheus(self):
+        """
+        Renders all counters and timings in the Prometheus text exposition format.
+
+        :return: str The metrics text.
+        """
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            timings = sorted(self.timings.items())
+
+        for name in sorted({name for (name, _), _ in counters}):
+            lines.append(f"# TYPE {PREFIX}_{name} counter")
+            for (counter_name, labels), value in counters:
+                if counter_name == name:
+                    lines.append(f"{PREFIX}_{name}{_format_labels(labels)} {value}")
+
+        for name in sorted({name for (name, _), _ in timings}):
+            lines.append(f"# TYPE {PREFIX}_{name}_seconds summary")
+            for (timing_name, labels), (count, total, maximum) in timings:
+                if timing_name == name:
+                    label_text = _format_labels(labels)
+                    lines.append(f"{PREFIX}_{name}_seconds_count{label_text} {count}")
+                    lines.append(f"{PREFIX}_{name}_seconds_sum{label_text} {total:.6f}")
+                    lines.append(f"{PREFIX}_{name}_seconds_max{label_text} {maximum:.6f}")
+
+        return "\n".join(lines) + "\n"
+
+
+class _Span:
+    __slots__ = ("name", "labels", "start")
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        _recorder.observe(self.name, duration, **self.labels)
+        _recorder.trace({"ts": time.time(), "span": self.name, "duration": round(duration, 6),
+                         "error": exc_type.__name__ if exc_type else None, **self.labels})
+        return False
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+
+_recorder = MetricsRecorder()
+
+
+def configure(trace_path: Path = None, prometheus_path: Path = None):
+    """
+    Enables metrics collection if at least one output path is given.
+
+    :param trace_path: Path of the JSON-lines trace file.
+    :param prometheus_path: Path of the Prometheus text-format file.
+    """
+    _recorder.configure(trace_path, prometheus_path)
+
+
+def enabled():
+    return _recorder.enabled
+
+
+def span(name, **labels):
+    """
+    Returns a context manager timing the enclosed block.
+
+    :param name: Name of the span, e.g. 'click_load_more'.
+    :param labels: Additional labels, e.g. artist='name'.
+    :return: A context manager, a shared no-op one when metrics are disabled.
+    """
+    if not _recorder.enabled:
+        return _NOOP_SPAN
+    return _Span(name, labels)
+
+
+def increment(name, value=1, **labels):
+    """
+    Increments a counter.
+
+    :param name: Name of the counter, e.g. 'downloaded_bytes_total'.
+    :param value: The amount to add.
+    :param labels: Additional labels, e.g. status=200.
+    """
+    if _recorder.enabled:
+        _recorder.increment(name, value, **labels)
+
+
+def event(name, **fields):
+    """
+    Appends a single event with arbitrary fields to the trace file.
+
+    :param name: Name of the event, e.g. 'browser_memory'.
+    :param fields: The fields of the event.
+    """
+    if _recorder.enabled:
+        _recorder.trace({"ts": time.time(), "event": name, **fields})
+
+
+def flush():
+    if _recorder.enabled:
+        _recorder.flush()
+
+
+def close():
+    _recorder.close()
+
+
+def recorder():
+    return _recorder
+
+
+def instrument_driver(driver):
+    """
+    Counts and times every WebDriver command of the given driver, including calls made through its elements.
+
+    :param driver: Selenium WebDriver instance.
+    :return: The same driver instance.
+    """
+    if not _recorder.enabled:
+        return driver
+
+    execute = driver.execute
+
+    def timed_execute(driver_command, params=None):
+        start = time.perf_counter()
+        try:
+            return execute(driver_command, params)
+        finally:
+            _recorder.observe("webdriver_call", time.perf_counter() - start, command=driver_command)
+
+    driver.execute = timed_execute
+    return driver
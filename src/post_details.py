@@ -0,0 +1,166 @@
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+
+import requests
+
+from src import metrics
+
+# Full post with its gallery and attachments from the Patreon API
+POST_DETAILS_URL = ("https://www.patreon.com/api/posts/{post_id}?include=images,attachments_media,audio,video"
+                    "&fields[post]=title,content&fields[media]=download_url,image_urls,file_name,mimetype"
+                    "&json-api-use-default-includes=false")
+
+
+class _TextExtractor(HTMLParser):
+    BLOCK_TAGS = {"p", "div", "li", "h1", "h2", "h3", "h4", "blockquote"}
+
+    def __init__(self):
+        super().__init__()
+        self.blocks = [[]]
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "br":
+            self.blocks[-1].append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.BLOCK_TAGS:
+            self.blocks.append([])
+
+    def handle_data(self, data):
+        self.blocks[-1].append(data)
+
+
+def html_to_text(content):
+    """
+    Converts the HTML body of a post into text with one line per paragraph, like the text taken from a card.
+
+    :param content: The HTML content.
+    :return: str The text.
+    """
+    parser = _TextExtractor()
+    parser.feed(content or "")
+    parser.close()
+    lines = ("".join(block).strip() for block in parser.blocks)
+    return "\n".join(line for line in lines if line)
+
+
+def parse_post_details(payload):
+    """
+    Reads the content, images and attachments from a Patreon API post response.
+
+    :param payload: The decoded JSON:API response.
+    :return: A dictionary with the 'content', the 'images' URLs in gallery order and the 'attachments'.
+    """
+    data = payload["data"]
+    included = {(item["type"], item["id"]): item.get("attributes", {}) for item in payload.get("included", [])}
+    relationships = data.get("relationships", {})
+
+    def related(name):
+        items = (relationships.get(name) or {}).get("data") or []
+        if isinstance(items, dict):
+            items = [items]
+        return [included[item["type"], item["id"]] for item in items if (item["type"], item["id"]) in included]
+
+    images = []
+    for media in related("images"):
+        url = (media.get("image_urls") or {}).get("original") or media.get("download_url")
+        if url:
+            images.append(url)
+
+    attachments = []
+    for name, kind in (("attachments_media", "attachment"), ("audio", "audio"), ("video", "video")):
+        for media in related(name):
+            if media.get("download_url"):
+                attachments.append({"url": media["download_url"], "kind": kind, "name": media.get("file_name") or ""})
+
+    return {"content": html_to_text(data.get("attributes", {}).get("content")), "images": images,
+            "attachments": attachments}
+
+
+def merge_post_details(post, details, attachments=True):
+    """
+    Completes a post extracted from a feed card with the details of the full post.
+
+    The 'content_hash' is left as it is, since it describes what the feed card shows.
+
+    :param post: The post dictionary.
+    :param details: The details as returned by `parse_post_details`.
+    :param attachments: Whether to add the attachments of the details.
+    :return: The post dictionary.
+    """
+    if len(details["images"]) > len(post["images"]):
+        post["images"] = details["images"]
+    if len(details["content"]) > len(post.get("content") or ""):
+        post["content"] = details["content"]
+    if attachments:
+        known = {attachment["url"] for attachment in post.get("attachments", [])}
+        post["attachments"] = post.get("attachments", []) + [
+            attachment for attachment in details["attachments"] if attachment["url"] not in known
+        ]
+    return post
+
+
+class PostDetailFetcher:
+    """
+    Fetches the full data of posts whose feed card is incomplete, e.g. a gallery showing "+N more" or a body
+    that could not be expanded.
+
+    The posts are requested from the Patreon API with the cookies of the browser session in a thread pool,
+    so the requests run while the browser keeps paginating the feed.
+    """
+
+    def __init__(self, session: requests.Session, workers=4, url_template=POST_DETAILS_URL, attachments=True,
+                 timeout=20):
+        self.session = session
+        self.url_template = url_template
+        self.attachments = attachments
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="post-details")
+        self.futures = {}
+
+    def submit(self, post):
+        """
+        Starts fetching the details of a post.
+
+        :param post: The post dictionary.
+        """
+        self.futures[post["id"]] = self.executor.submit(self._fetch, post["id"])
+
+    def _fetch(self, post_id):
+        with metrics.span("fetch_post_details"):
+            response = self.session.get(self.url_template.format(post_id=post_id), timeout=self.timeout)
+            metrics.increment("http_responses_total", status=response.status_code)
+            response.raise_for_status()
+            return parse_post_details(response.json())
+
+    def merge(self, posts):
+        """
+        Waits for the details of the given posts and merges them into the posts.
+
+        The 'incomplete' marker of a post is removed once its details are merged. Posts whose details could not
+        be fetched keep the data of their feed card and the marker.
+
+        :param posts: The post dictionaries that were submitted.
+        :return: The posts.
+        """
+        for post in posts:
+            future = self.futures.pop(post["id"], None)
+            if future is None:
+                continue
+            try:
+                merge_post_details(post, future.result(), self.attachments)
+                post.pop("incomplete", None)
+            except Exception as e:
+                # A single malformed response must not abort the scrape of the whole artist
+                print(f"Could not fetch the details of post {post['id']}: {e}")
+                metrics.increment("post_detail_errors_total", error=type(e).__name__)
+        return posts
+
+    def shutdown(self):
+        self.executor.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
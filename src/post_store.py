@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from urllib.parse import urlsplit
+
+POSTS_FILE_NAME = "posts.json"
+
+
+def iter_posts(posts_file: Path, chunk_size=1 << 16):
+    """
+    Lazily iterates over the posts stored in a `posts.json` file.
+
+    The file is read in chunks and decoded one post at a time, so memory usage stays bounded by the size of
+    the largest single post rather than the size of the whole archive.
+
+    :param posts_file: Path to the `posts.json` file of an artist.
+    :param chunk_size: Number of characters to read from the file at once.
+    :return: A generator yielding post dictionaries in file order.
+    """
+    decoder = json.JSONDecoder()
+
+    with open(posts_file, "r", encoding="utf-8") as file:
+        buffer = file.read(chunk_size)
+        position = 0
+        started = False
+        eof = not buffer
+
+        while True:
+            # Skip whitespace and separators between posts
+            while position < len(buffer) and (buffer[position].isspace() or (started and buffer[position] == ",")):
+                position += 1
+
+            if position >= len(buffer):
+                if eof:
+                    if started:
+                        raise ValueError(f"Unexpected end of file in {posts_file}")
+                    return
+                buffer = file.read(chunk_size)
+                position = 0
+                eof = not buffer
+                continue
+
+            if not started:
+                if buffer[position] != "[":
+                    raise ValueError(f"Expected a JSON array in {posts_file}")
+                started = True
+                position += 1
+                continue
+
+            if buffer[position] == "]":
+                return
+
+            try:
+                post, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as e:
+                if eof:
+                    raise ValueError(f"Error parsing JSON in {posts_file}: {e}")
+                # The post is split across chunks, read more and retry
+                more = file.read(chunk_size)
+                eof = not more
+                buffer = buffer[position:] + more
+                position = 0
+                continue
+
+            yield post
+
+            # Drop the consumed part of the buffer from time to time
+            if position > chunk_size:
+                buffer = buffer[position:]
+                position = 0
+
+
+def posts_file_signature(posts_file: Path):
+    """
+    Returns a cheap signature of a `posts.json` file that changes whenever the file is rewritten.
+
+    :param posts_file: Path to the `posts.json` file of an artist.
+    :return: A list of the modification time in nanoseconds and the size in bytes, or None if the file is missing.
+    """
+    try:
+        stat = posts_file.stat()
+    except FileNotFoundError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def write_posts(posts_file: Path, posts):
+    """
+    Atomically replaces the contents of a `posts.json` file.
+
+    :param posts_file: Path to the `posts.json` file of an artist.
+    :param posts: The complete list of post dictionaries.
+    """
+    tmp_file = posts_file.with_suffix(".tmp")
+    with open(tmp_file, "w") as file:
+        json.dump(posts, file, indent=4)
+    os.replace(tmp_file, posts_file)
+
+
+def load_json_state(state_file: Path):
+    """
+    Loads a JSON state or cache file, returning an empty state if it is missing or corrupt.
+
+    :param state_file: Path to the state file.
+    :return: The state dictionary.
+    """
+    if not state_file.exists():
+        return {}
+    try:
+        with open(state_file, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (json.JSONDecodeError, OSError):
+        return {}
+
+
+def save_json_state(state_file: Path, state, indent=4):
+    """
+    Atomically writes a JSON state or cache file, creating its folder if needed.
+
+    :param state_file: Path to the state file.
+    :param state: The state dictionary to write.
+    :param indent: Indentation of the JSON, None for the most compact file.
+    """
+    state_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = state_file.with_suffix(".tmp")
+    with open(tmp_file, "w", encoding="utf-8") as file:
+        json.dump(state, file, indent=indent)
+    os.replace(tmp_file, state_file)
+
+
+def source_image_key(url):
+    """
+    Returns the part of an image URL that identifies the image.
+
+    The query of Patreon's image URLs contains a signature that changes on every page load, so only the
+    path is used.
+
+    :param url: The image URL.
+    :return: str The path of the URL.
+    """
+    return urlsplit(url).path
+
+
+def content_hash(post):
+    """
+    Computes a hash over the content of a freshly extracted post, used to detect edits on a rescrape.
+
+    :param post: A post dictionary with the original image URLs in 'images'.
+    :return: str The hexadecimal SHA-256 hash of the title, date, content, tags and image URLs.
+    """
+    content = [post.get("title"), post.get("date"), post.get("content"), post.get("tags"),
+               [source_image_key(url) for url in post.get("images", [])]]
+    return hashlib.sha256(json.dumps(content, ensure_ascii=False).encode()).hexdigest()
+
+
+def matches_legacy_post(stored, post):
+    """
+    Checks whether a post stored before content hashes were introduced has the same content as a scraped one.
+
+    The stored images are local paths whose names contain the signature of the URL they were downloaded from,
+    so only their number is compared.
+
+    :param stored: The stored post without a 'content_hash'.
+    :param post: The scraped post.
+    :return: bool
+    """
+    return (all(stored.get(key) == post.get(key) for key in ("title", "content", "tags"))
+            and len(stored.get("images", [])) == len(post.get("images", [])))
+
+
+def load_post_index(posts_file: Path):
+    """
+    Loads what is needed to detect and apply edits of the stored posts.
+
+    :param posts_file: Path to the `posts.json` file of an artist.
+    :return: A dictionary mapping post IDs to their 'content_hash', 'source_images', 'image_meta',
+        'deferred_media' and 'incomplete' marker. Posts without a 'content_hash' also carry what
+        `matches_legacy_post` compares.
+    """
+    if not posts_file.exists():
+        return {}
+    keys = ("content_hash", "source_images", "image_meta", "deferred_media", "incomplete")
+    legacy_keys = keys + ("title", "content", "tags", "images")
+    return {
+        post["id"]: {key: post[key] for key in (keys if "content_hash" in post else legacy_keys) if key in post}
+        for post in iter_posts(posts_file)
+    }
+
+
+def add_content_hashes(posts_file: Path, hashes):
+    """
+    Adds the content hashes of unchanged legacy posts to the store, without touching anything else.
+
+    :param posts_file: Path to the `posts.json` file of an artist.
+    :param hashes: A dictionary mapping post IDs to their content hash.
+    """
+    with open(posts_file, "r") as file:
+        posts = json.load(file)
+    for post in posts:
+        if post["id"] in hashes and "content_hash" not in post:
+            post["content_hash"] = hashes[post["id"]]
+    write_posts(posts_file, posts)
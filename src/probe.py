@@ -0,0 +1,200 @@
+import json
+import os
+import re
+import xml.etree.ElementTree as ElementTree
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+
+import requests
+
+from src.checkpoint import JOURNAL_FILE_NAME
+from src.post_store import POSTS_FILE_NAME, iter_posts, load_json_state, save_json_state
+
+COOKIES_FILE_NAME = ".cookies.json"
+PROBE_STATE_FILE_NAME = ".probe_state.json"
+
+# Newest post of a campaign, only its ID and publication time
+CAMPAIGN_POSTS_URL = ("https://www.patreon.com/api/posts?filter[campaign_id]={campaign_id}"
+                      "&sort=-published_at&page[count]=1&fields[post]=published_at&json-api-use-default-includes=false")
+
+
+def save_session_cookies(cookies, cookies_file: Path):
+    """
+    Persists the cookies of a logged in browser session for plain HTTP requests in later runs.
+
+    The cookies grant access to the Patreon account, so the file is only readable by its owner.
+
+    :param cookies: List of cookie dictionaries as returned by `driver.get_cookies()`.
+    :param cookies_file: Path of the cookies file.
+    """
+    cookies_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = cookies_file.with_suffix(".tmp")
+    if tmp_file.exists():
+        tmp_file.unlink()
+    with os.fdopen(os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "w", encoding="utf-8") as file:
+        json.dump(cookies, file)
+    os.replace(tmp_file, cookies_file)
+
+
+def load_session_cookies(cookies_file: Path):
+    """
+    Loads the browser cookies persisted by `save_session_cookies`.
+
+    :param cookies_file: Path of the cookies file.
+    :return: A list of cookie dictionaries, or None if the file is missing or corrupt.
+    """
+    if not cookies_file.exists():
+        return None
+    try:
+        with open(cookies_file, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (json.JSONDecodeError, OSError):
+        return None
+
+
+def create_http_session(cookies_file: Path = None, cookies=None):
+    """
+    Creates a requests session, carrying the persisted browser cookies if there are any.
+
+    :param cookies_file: Path of the cookies file.
+    :param cookies: Optional list of cookie dictionaries of a running browser, used instead of the file.
+    :return: requests.Session
+    """
+    session = requests.Session()
+    session.headers["User-Agent"] = "Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Gecko/20100101 Firefox/128.0"
+    if cookies is None and cookies_file:
+        cookies = load_session_cookies(cookies_file)
+    for cookie in cookies or []:
+        session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain"), path=cookie.get("path", "/"))
+    return session
+
+
+def parse_newest_post(body: bytes, content_type: str):
+    """
+    Reads the newest post from a Patreon API response or an RSS feed.
+
+    :param body: The response body.
+    :param content_type: The Content-Type header of the response.
+    :return: A tuple (post ID, publication date as 'YYYY-MM-DD'). Both are None if the feed is empty.
+    """
+    if "json" in content_type:
+        posts = json.loads(body).get("data") or []
+        if not posts:
+            return None, None
+        published_at = (posts[0].get("attributes") or {}).get("published_at")
+        return int(posts[0]["id"]), published_at[:10] if published_at else None
+
+    item = ElementTree.fromstring(body).find("./channel/item")
+    if item is None:
+        return None, None
+    # Patreon feeds use the post URL as GUID, the ID is its last number
+    match = re.search(r"(\d+)\D*$", item.findtext("guid") or item.findtext("link") or "")
+    pub_date = item.findtext("pubDate")
+    return (int(match.group(1)) if match else None,
+            parsedate_to_datetime(pub_date).strftime("%Y-%m-%d") if pub_date else None)
+
+
+class FreshnessProbe:
+    """
+    Checks with a single HTTP request whether an artist posted something that is not in the local store yet.
+
+    The newest post is read from the artist's `probe_url` (an RSS feed or Patreon API URL) or, given the
+    artist's `campaign_id`, from the Patreon posts API, using the cookies of the last browser session.
+    Conditional requests are sent with the ETag and Last-Modified of the previous probe, so an unchanged feed
+    costs a single 304 response. Any failure counts as a change, so no artist is skipped by mistake. Artists with
+    an interrupted scrape or deferred media always count as changed, so their unfinished work is picked up.
+    """
+
+    def __init__(self, output_folder: Path, session=None, timeout=10):
+        self.output_folder = output_folder
+        self.state_file = output_folder / PROBE_STATE_FILE_NAME
+        self.session = session or create_http_session(output_folder / COOKIES_FILE_NAME)
+        self.timeout = timeout
+        self.state = load_json_state(self.state_file)
+
+    def save_state(self):
+        """Atomically writes the probe state."""
+        save_json_state(self.state_file, self.state)
+
+    @staticmethod
+    def probe_url(artist):
+        """
+        Returns the URL to probe for an artist.
+
+        :param artist: The artist dictionary.
+        :return: str The URL, or None if the artist has neither a `probe_url` nor a `campaign_id`.
+        """
+        if artist.get("probe_url"):
+            return artist["probe_url"]
+        if artist.get("campaign_id"):
+            return CAMPAIGN_POSTS_URL.format(campaign_id=artist["campaign_id"])
+        return None
+
+    def has_changes(self, artist):
+        """
+        Checks whether the artist has posts that are not in its `posts.json` yet.
+
+        :param artist: The artist dictionary.
+        :return: False only if the newest post of the artist is known to be stored locally and there is no
+            unfinished work.
+        """
+        url = self.probe_url(artist)
+        if not url or (self.output_folder / artist["url_name"] / JOURNAL_FILE_NAME).exists():
+            return True
+
+        entry = self.state.get(artist["url_name"], {})
+        headers = {}
+        if entry.get("url") == url:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+            if response.status_code == 304:
+                newest_id, newest_date = entry.get("newest_id"), entry.get("newest_date")
+            else:
+                response.raise_for_status()
+                newest_id, newest_date = parse_newest_post(response.content,
+                                                           response.headers.get("Content-Type", ""))
+                self.state[artist["url_name"]] = {
+                    "url": url,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "newest_id": newest_id,
+                    "newest_date": newest_date,
+                }
+                self.save_state()
+        except (requests.RequestException, ValueError, ElementTree.ParseError) as e:
+            print(f"Could not probe {artist['url_name']}: {e}")
+            return True
+
+        # The 304 only says the feed did not change, the local store may still lack its newest post
+        return not self._is_up_to_date(artist["url_name"], newest_id, newest_date)
+
+    def _is_up_to_date(self, url_name, newest_id, newest_date):
+        posts_file = self.output_folder / url_name / POSTS_FILE_NAME
+        if not posts_file.exists():
+            return newest_id is None and newest_date is None
+
+        newest_local_date = None
+        newest_stored = False
+        try:
+            for post in iter_posts(posts_file):
+                # Media left for a later run is only downloaded if the artist is scraped
+                if post.get("deferred_media") or post.get("incomplete"):
+                    return False
+                if newest_id is not None and post.get("id") == newest_id:
+                    newest_stored = True
+                if post.get("date") and (newest_local_date is None or post["date"] > newest_local_date):
+                    newest_local_date = post["date"]
+        except (ValueError, OSError) as e:
+            # A broken store is left to the regular scrape instead of stopping the whole run
+            print(f"Could not read the posts of {url_name}: {e}")
+            return False
+
+        if newest_id is not None:
+            return newest_stored
+        # Without an ID only the date can be compared
+        return newest_date is None or (newest_local_date is not None and newest_date <= newest_local_date)
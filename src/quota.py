@@ -0,0 +1,216 @@
+import time
+from collections import Counter
+
+from src.size_utils import format_bytes
+
+# Budget reserved for a download that does not announce its size, corrected once it finished
+UNKNOWN_SIZE_BYTES = 10 << 20
+
+
+class TokenBucket:
+    """
+    Limits the throughput of all downloads of a process to a number of bytes per second.
+
+    Consumers take their bytes up front and sleep off the debt, so concurrent downloads are served in the
+    order they asked and the long-term rate never exceeds the limit.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or rate
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    async def consume(self, amount):
+        """
+        Waits until `amount` bytes may be transferred.
+
+        :param amount: Number of bytes.
+        """
+        import asyncio
+
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= amount
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
+
+
+class DownloadQuota:
+    """
+    Byte budgets for the downloads of a run, per artist and in total, and an optional bandwidth cap.
+
+    A download is only started if its announced size fits into the remaining budget. Downloads without a size
+    reserve `UNKNOWN_SIZE_BYTES`, or the rest of the budget if less is left, so a run only exceeds the budget by
+    the amount such files are larger than their reservation. Media that did not fit is deferred, i.e. stored in
+    the 'deferred_media' list of its post, to be downloaded by a later run.
+    """
+
+    def __init__(self, budget_bytes=None, artist_budget_bytes=None, bandwidth_bytes=None):
+        self.budget_bytes = budget_bytes
+        self.artist_budget_bytes = artist_budget_bytes
+        self.bucket = TokenBucket(bandwidth_bytes) if bandwidth_bytes else None
+        self.used = Counter()
+        self.total = 0
+
+    def for_artist(self, artist):
+        """
+        Returns the view of the quota that the downloads of an artist are charged to.
+
+        :param artist: The URL name of the artist.
+        :return: ArtistQuota
+        """
+        return ArtistQuota(self, artist)
+
+    def remaining(self, artist):
+        """
+        Returns how many bytes the artist may still download in this run.
+
+        :param artist: The URL name of the artist.
+        :return: The number of bytes, or None if there is no limit.
+        """
+        limits = []
+        if self.budget_bytes:
+            limits.append(self.budget_bytes - self.total)
+        if self.artist_budget_bytes:
+            limits.append(self.artist_budget_bytes - self.used[artist])
+        return max(min(limits), 0) if limits else None
+
+    def exhausted(self, artist=None):
+        """
+        Checks whether the budget of an artist, or the total budget if no artist is given, is used up.
+
+        :param artist: Optional URL name of the artist.
+        :return: bool
+        """
+        if artist is None:
+            return bool(self.budget_bytes) and self.total >= self.budget_bytes
+        return self.remaining(artist) == 0
+
+    def charge(self, artist, amount):
+        self.used[artist] += amount
+        self.total += amount
+
+
+class ArtistQuota:
+    """
+    The part of a `DownloadQuota` used by the downloads of a single artist, passed to the download functions.
+
+    The downloads of a batch run concurrently, so their responses arrive in any order. With `prioritize`, the
+    budget is still granted in priority order: a download waits in `reserve` until every download before it
+    reserved its share or gave up.
+    """
+
+    def __init__(self, quota: DownloadQuota, artist):
+        self.quota = quota
+        self.artist = artist
+        self.deferred = set()
+        self.prioritize(None)
+
+    def exhausted(self):
+        return self.quota.exhausted(self.artist)
+
+    def prioritize(self, urls):
+        """
+        Sets the order in which the downloads of the next batch are granted the budget.
+
+        Every URL must either be reserved or released, otherwise the downloads after it wait forever.
+
+        :param urls: The URLs of the batch, most important first, or None to grant the budget in any order.
+        """
+        self._positions = {}
+        for url in urls or []:
+            self._positions.setdefault(url, len(self._positions))
+        self._next = 0
+        self._released = set()
+        self._waiters = {}
+
+    def release(self, url):
+        """
+        Lets the downloads after a URL reserve their share. Does nothing if the URL was already released.
+
+        :param url: The URL of the download.
+        """
+        position = self._positions.get(url)
+        if position is None or position in self._released:
+            return
+        self._released.add(position)
+        while self._next in self._released:
+            self._next += 1
+        waiter = self._waiters.pop(self._next, None)
+        if waiter is not None:
+            waiter.set()
+
+    def defer(self, url):
+        """
+        Marks a URL as deferred because the budget is used up.
+
+        :param url: The URL of the media.
+        """
+        self.deferred.add(url)
+        self.release(url)
+
+    async def reserve(self, url, size):
+        """
+        Reserves the budget for a download of the given size, deferring it if it does not fit.
+
+        :param url: The URL of the download.
+        :param size: The announced size in bytes, or None if unknown.
+        :return: The number of reserved bytes, or None if the download is deferred.
+        """
+        import asyncio
+
+        position = self._positions.get(url)
+        while position is not None and self._next < position:
+            await self._waiters.setdefault(position, asyncio.Event()).wait()
+
+        try:
+            remaining = self.quota.remaining(self.artist)
+            if size is None:
+                # Held until the download is settled, so concurrent downloads cannot all pass the check before
+                # any of them was charged
+                size = UNKNOWN_SIZE_BYTES if remaining is None else min(remaining, UNKNOWN_SIZE_BYTES)
+            if remaining is not None and (remaining == 0 or size > remaining):
+                self.defer(url)
+                return None
+            self.quota.charge(self.artist, size)
+            return size
+        finally:
+            self.release(url)
+
+    def settle(self, reserved, written):
+        """
+        Corrects a reservation by the number of bytes that were actually written.
+
+        :param reserved: The number of reserved bytes.
+        :param written: The number of written bytes, 0 if the download failed.
+        """
+        self.quota.charge(self.artist, written - reserved)
+
+    async def throttle(self, amount):
+        """
+        Waits until the bandwidth cap allows transferring `amount` bytes.
+
+        :param amount: Number of bytes.
+        """
+        if self.quota.bucket is not None:
+            await self.quota.bucket.consume(amount)
+
+
+def format_usage_report(report, artist_budget_bytes=None):
+    """
+    Renders the disk usage of the archive per artist, based on the statistics of the files on disk.
+
+    :param report: A report as returned by `stats.collect_stats`.
+    :param artist_budget_bytes: Optional per-run budget of an artist, shown for comparison.
+    :return: str The formatted report.
+    """
+    lines = []
+    sections = list(report["artists"].items()) + [("TOTAL", report["total"])]
+    for name, stats in sections:
+        line = f"{name}: {format_bytes(stats['bytes'])} on disk, {stats.get('deferred', 0)} deferred media files"
+        if artist_budget_bytes and name != "TOTAL":
+            line += f" (budget per run: {format_bytes(artist_budget_bytes)})"
+        lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,156 @@
+import math
+import time
+from datetime import datetime
+from pathlib import Path
+
+from src.post_store import POSTS_FILE_NAME, iter_posts, load_json_state, save_json_state
+
+SCHEDULER_STATE_FILE_NAME = ".scheduler_state.json"
+
+# Assumed posting interval of artists without enough posts to learn from
+DEFAULT_INTERVAL_DAYS = 7.0
+
+
+def estimate_interval_days(post_dates, sample_size=20):
+    """
+    Estimates the average number of days between two posts of an artist.
+
+    :param post_dates: Iterable of post dates in 'YYYY-MM-DD' format, in any order.
+    :param sample_size: Only the most recent posts are used, so the estimate follows changes in cadence.
+    :return: The estimated interval in days, or None if there are less than two posts.
+    """
+    dates = sorted({date for date in post_dates if date}, reverse=True)[:sample_size]
+    if len(dates) < 2:
+        return None
+
+    newest = datetime.strptime(dates[0], "%Y-%m-%d")
+    oldest = datetime.strptime(dates[-1], "%Y-%m-%d")
+    # Several posts on the same day count as one, the span is divided by the number of gaps
+    return max((newest - oldest).days / (len(dates) - 1), 0.5)
+
+
+class RefreshScheduler:
+    """
+    Decides which artists to scrape in a run based on how often they post.
+
+    For every artist the average posting interval is learned from the dates in its `posts.json`. Assuming
+    posts arrive randomly at that rate, the probability that something new was posted since the last check is
+    `1 - exp(-elapsed / interval)`. Artists are scraped in order of that probability, artists not checked for
+    longer than the freshness SLA always come first, and the run stops once its time budget is used up.
+    The learned cadence and the time of the last check are persisted between runs.
+    """
+
+    def __init__(self, output_folder: Path, freshness_sla_days=7.0, min_probability=0.2, budget_seconds=None,
+                 max_artists=None):
+        self.output_folder = output_folder
+        self.state_file = output_folder / SCHEDULER_STATE_FILE_NAME
+        self.freshness_sla_days = freshness_sla_days
+        self.min_probability = min_probability
+        self.budget_seconds = budget_seconds
+        self.max_artists = max_artists
+        self.state = load_json_state(self.state_file)
+        self.started_at = time.monotonic()
+        self.runs = 0
+
+    def save_state(self):
+        """Atomically writes the scheduler state."""
+        save_json_state(self.state_file, self.state)
+
+    def _learn(self, url_name):
+        posts_file = self.output_folder / url_name / POSTS_FILE_NAME
+        if not posts_file.exists():
+            return None, None
+        dates = [post.get("date") for post in iter_posts(posts_file)]
+        newest = max((date for date in dates if date), default=None)
+        return estimate_interval_days(dates), newest
+
+    def new_content_probability(self, url_name, now=None):
+        """
+        Returns the probability that the artist posted something since it was last checked.
+
+        :param url_name: The URL name of the artist.
+        :param now: datetime Current time, defaults to now.
+        :return: A probability between 0 and 1. Artists that were never checked have a probability of 1.
+        """
+        entry = self.state.get(url_name)
+        if not entry or not entry.get("last_checked"):
+            return 1.0
+
+        now = now or datetime.now()
+        elapsed_days = (now - datetime.fromisoformat(entry["last_checked"])).total_seconds() / 86400
+        interval = entry.get("interval_days") or DEFAULT_INTERVAL_DAYS
+        return 1 - math.exp(-max(elapsed_days, 0) / interval)
+
+    def days_since_check(self, url_name, now=None):
+        entry = self.state.get(url_name)
+        if not entry or not entry.get("last_checked"):
+            return math.inf
+        now = now or datetime.now()
+        return (now - datetime.fromisoformat(entry["last_checked"])).total_seconds() / 86400
+
+    def plan(self, artists, now=None):
+        """
+        Selects and orders the artists to scrape in this run.
+
+        :param artists: List of artist dictionaries with a 'url_name' key.
+        :param now: datetime Current time, defaults to now.
+        :return: The artists to scrape, most urgent first.
+        """
+        now = now or datetime.now()
+        for artist in artists:
+            entry = self.state.setdefault(artist["url_name"], {})
+            if "interval_days" not in entry:
+                entry["interval_days"], entry["newest_post"] = self._learn(artist["url_name"])
+
+        overdue = []
+        likely = []
+        for artist in artists:
+            url_name = artist["url_name"]
+            days = self.days_since_check(url_name, now)
+            probability = self.new_content_probability(url_name, now)
+            if days >= self.freshness_sla_days:
+                overdue.append((-days, artist))
+            elif probability >= self.min_probability:
+                likely.append((-probability, artist))
+
+        overdue.sort(key=lambda item: item[0])
+        likely.sort(key=lambda item: item[0])
+        planned = [artist for _, artist in overdue] + [artist for _, artist in likely]
+        return planned[:self.max_artists] if self.max_artists else planned
+
+    def budget_exhausted(self):
+        """
+        Checks whether the run has used up its time or artist budget.
+
+        :return: True if no further artist should be scraped.
+        """
+        if self.max_artists and self.runs >= self.max_artists:
+            return True
+        return bool(self.budget_seconds) and time.monotonic() - self.started_at >= self.budget_seconds
+
+    def record_run(self, artist, duration, now=None):
+        """
+        Records that an artist was scraped and re-learns its posting cadence.
+
+        :param artist: The artist dictionary.
+        :param duration: How long scraping the artist took in seconds.
+        :param now: datetime Current time, defaults to now.
+        """
+        now = now or datetime.now()
+        url_name = artist["url_name"]
+        interval, newest = self._learn(url_name)
+        entry = self.state.setdefault(url_name, {})
+
+        # The silence since the newest post is evidence of a longer interval than the history suggests
+        if interval and newest:
+            silence = (now - datetime.strptime(newest, "%Y-%m-%d")).days
+            interval = max(interval, silence / 2)
+
+        entry.update(
+            last_checked=now.isoformat(timespec="seconds"),
+            interval_days=interval,
+            newest_post=newest,
+            last_duration=round(duration, 1),
+        )
+        self.runs += 1
+        self.save_state()
@@ -9,65 +9,368 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as ec
 
+from src import cassette, metrics
+from src.checkpoint import ScrapeJournal
 from src.config import Config
 from src.date_utils import parse_date
-from src.utils import download_post_images, save_posts_to_file
-
-
-def scrape_artist_posts(driver, artist):
+from src.driver import browser_rss_kb
+from src.media import MediaProcessor
+from src.post_details import PostDetailFetcher
+from src.post_store import (
+    POSTS_FILE_NAME, add_content_hashes, content_hash, load_post_index, matches_legacy_post
+)
+from src.probe import create_http_session
+from src.utils import download_post_attachments, download_post_images, save_posts_to_file
+
+# Replaces the content of already extracted post cards with nothing and renames their data-tag, so they drop
+# out of every post-card lookup and the browser can free their DOM nodes and images. Returns the DOM size.
+PRUNE_POST_CARDS_SCRIPT = """
+for (const card of arguments[0]) {
+    card.replaceChildren();
+    card.setAttribute("data-tag", "post-card-pruned");
+}
+return document.getElementsByTagName("*").length;
+"""
+
+# Same as above, but decides in the browser which cards to prune based on the post IDs in arguments[0]
+PRUNE_SEEN_POST_CARDS_SCRIPT = """
+const seen = new Set(arguments[0]);
+for (const card of document.querySelectorAll("div[data-tag='post-card']")) {
+    const link = card.querySelector("span[data-tag='post-title'] a");
+    if (link && seen.has(parseInt(link.href.split("-").pop()))) {
+        card.replaceChildren();
+        card.setAttribute("data-tag", "post-card-pruned");
+    }
+}
+"""
+
+# Checks whether a post card hides content after it was expanded: a gallery overlay like "+3" or a body that
+# still has a "Show more" / "Continue reading" button.
+DETECT_INCOMPLETE_CARD_SCRIPT = """
+const card = arguments[0];
+for (const gallery of card.querySelectorAll("div[class*='image-grid'], div[class*='image-carousel']")) {
+    for (const element of gallery.querySelectorAll("*")) {
+        if (element.children.length === 0 && /^\\+\\s*\\d+/.test(element.textContent.trim())) {
+            return true;
+        }
+    }
+}
+for (const button of card.querySelectorAll("button, a")) {
+    if (/^(show more|continue reading)$/i.test(button.textContent.trim()) && button.offsetParent !== null) {
+        return true;
+    }
+}
+return false;
+"""
+
+
+def scrape_artist_posts(driver, artist, since=None, until=None, quota=None):
     """
     Scrape posts from an artist's Patreon page, including loading more posts until the end.
     Handles consent modals or other obstructing elements.
 
+    If a date range is given, posts outside of it are neither extracted nor downloaded. Since the feed is
+    sorted from newest to oldest, pagination stops at the first page whose new posts are all older than `since`.
+    Already stored posts are only downloaded and saved again if their content hash changed or some of their
+    media was deferred by the download quota, and then only their missing images are downloaded.
+
+    Posts whose card hides images or text are completed from the Patreon API in the background. They are
+    downloaded with the next page, so the requests overlap with loading it.
+
     :param driver: Selenium WebDriver instance.
     :param artist: dict containing artist information with 'display_name' and 'url_name' keys.
-    :returns: A list of dictionaries, each representing a post's data.
+    :param since: Optional earliest post date to scrape in 'YYYY-MM-DD' format (inclusive).
+    :param until: Optional latest post date to scrape in 'YYYY-MM-DD' format (inclusive).
+    :param quota: Optional `DownloadQuota` of the run, media beyond its budget is deferred.
+    :return: bool True if the end of the feed was reached, False if scraping was stopped by an error.
     """
     url_name = artist["url_name"]
+    artist_quota = quota.for_artist(url_name) if quota else None
 
     artist_folder = Config.OUTPUT_FOLDER / url_name
     artist_folder.mkdir(parents=True, exist_ok=True)
 
-    seen_post_ids = set()
+    journal = ScrapeJournal(artist_folder)
+    processor = MediaProcessor(Config.MEDIA_WORKERS) if Config.MEDIA_PROCESSING else None
+    cookies = driver.get_cookies()
+    fetcher = PostDetailFetcher(
+        create_http_session(cookies=cookies), Config.POST_DETAIL_WORKERS,
+        attachments=Config.DOWNLOAD_ATTACHMENTS,
+    ) if Config.FETCH_POST_DETAILS else None
+    # Incomplete posts of the previous page, their details are fetched while the current page loads
+    awaiting_details = []
+    seen_post_ids = journal.seen_post_ids
+    stored_posts = load_post_index(artist_folder / POSTS_FILE_NAME)
+    unchanged = 0
+    # Hashes of posts stored before content hashes existed whose content did not change
+    legacy_hashes = {}
+    page = 0
+    initial_rss = None
 
     try:
+        if journal.resumed:
+            # Finish the posts of the interrupted run whose images were never downloaded or saved
+            pending_posts = journal.pending_posts()
+            if pending_posts:
+                print(f"Resuming {len(pending_posts)} unfinished posts.")
+                incomplete = [post for post in pending_posts if post.get("incomplete")]
+                if incomplete and fetcher is not None:
+                    for post in incomplete:
+                        fetcher.submit(post)
+                    fetcher.merge(incomplete)
+                batch = download_batch(pending_posts, artist_folder, journal, url_name, processor, artist_quota,
+                                       cookies)
+                save_batch(batch, artist_folder, journal, url_name, processor)
+
+            page = skip_loaded_pages(driver, journal.pages, seen_post_ids)
+
         while True:
             new_posts = []
+            incomplete_posts = []
+            skipped_dates = []
+            # Posts that are not extracted further, journaled so a resumed run skips their cards as well
+            skipped_ids = []
 
             # Wait for posts to load
-            WebDriverWait(driver, 10).until(
-                ec.presence_of_all_elements_located((By.XPATH, "//div[@data-tag='post-card']"))
-            )
+            with metrics.span("wait_for_posts", artist=url_name):
+                WebDriverWait(driver, 10).until(
+                    ec.presence_of_all_elements_located((By.XPATH, "//div[@data-tag='post-card']"))
+                )
 
-            # Extract all visible post elements
-            post_elements = driver.find_elements(By.XPATH, "//div[@data-tag='post-card']")
+                # Extract all visible post elements
+                post_elements = driver.find_elements(By.XPATH, "//div[@data-tag='post-card']")
 
             # Filter out elements with IDs that have already been seen
-            new_elements = [
-                post for post in post_elements
-                if extract_post_id(post) not in seen_post_ids
-            ]
+            element_ids = [(post, extract_post_id(post)) for post in post_elements]
+            new_elements = [post for post, post_id in element_ids if post_id not in seen_post_ids]
+            if cassette.recording():
+                cassette.record_page(page, driver.execute_script(
+                    "return arguments[0].map(card => card.outerHTML);", new_elements
+                ))
 
             # Process new elements
             for post in new_elements:
-                post_data = extract_post_data(post, artist)
-                if post_data and post_data["id"] not in seen_post_ids:
-                    print(f"Processed post {post_data["id"]} - {post_data["title"]}")
+                with metrics.span("extract_post", artist=url_name):
+                    post_data = extract_post_data(post, artist, since, until)
+                if post_data and post_data.get("out_of_range"):
+                    seen_post_ids.add(post_data["id"])
+                    skipped_dates.append(post_data["date"])
+                    if post_data["id"] is not None:
+                        skipped_ids.append(post_data["id"])
+                elif post_data and post_data["id"] not in seen_post_ids:
+                    seen_post_ids.add(post_data["id"])
+                    stored = stored_posts.get(post_data["id"])
+                    if stored and "content_hash" not in stored and matches_legacy_post(stored, post_data):
+                        stored["content_hash"] = legacy_hashes[post_data["id"]] = post_data["content_hash"]
+                    if (stored and stored.get("content_hash") == post_data["content_hash"]
+                            and not stored.get("deferred_media") and not stored.get("incomplete")):
+                        unchanged += 1
+                        skipped_ids.append(post_data["id"])
+                        continue
+
+                    print(f"{"Updated" if stored else "Processed"} post {post_data["id"]} - {post_data["title"]}")
                     if Config.DEBUG:
                         print(f"Found {len(post_data["images"])} images.")
 
-                    seen_post_ids.add(post_data["id"])
-                    new_posts.append(post_data)
+                    if stored:
+                        # Reuse the images and their metadata of the stored version
+                        post_data["source_images"] = stored.get("source_images", {})
+                        post_data["image_meta"] = stored.get("image_meta", {})
+                    # Incomplete posts keep their marker until the details are merged, so a post saved with
+                    # only its card data, e.g. after a failed request or a resume, is fetched again next run
+                    if post_data.get("incomplete") and fetcher is not None:
+                        fetcher.submit(post_data)
+                        incomplete_posts.append(post_data)
+                    else:
+                        post_data.pop("incomplete", None)
+                        new_posts.append(post_data)
+
+            metrics.increment("posts_extracted_total", len(new_posts) + len(incomplete_posts), artist=url_name)
+            journal.record_posts(new_posts + incomplete_posts)
+            journal.record_seen(skipped_ids)
+
+            # Cards that failed to extract stay in the DOM and are retried on the next page
+            if Config.PRUNE_DOM:
+                with metrics.span("prune_post_cards", artist=url_name):
+                    dom_nodes = prune_post_cards(
+                        driver, [post for post, post_id in element_ids if post_id in seen_post_ids]
+                    )
+            else:
+                dom_nodes = None
 
-            new_posts = asyncio.run(download_post_images(new_posts, artist_folder))
-            save_posts_to_file(new_posts, artist_folder)
+            initial_rss = report_memory(driver, url_name, page + 1, dom_nodes, initial_rss)
 
-            if not click_load_more(driver):
+            if awaiting_details:
+                with metrics.span("merge_post_details", artist=url_name):
+                    new_posts += fetcher.merge(awaiting_details)
+            awaiting_details = incomplete_posts
+
+            batch = download_batch(new_posts, artist_folder, journal, url_name, processor, artist_quota, cookies)
+
+            # All new posts of this page are older than the range, so every following page will be as well
+            reached_since = since and skipped_dates and not new_posts and not incomplete_posts and all(
+                date < since for date in skipped_dates
+            )
+            if reached_since:
+                print(f"Reached posts older than {since}, stopping.")
+
+            # The images are processed in the background while the browser loads the next page
+            with metrics.span("click_load_more", artist=url_name):
+                loaded_more = not reached_since and click_load_more(driver)
+
+            save_batch(batch, artist_folder, journal, url_name, processor)
+
+            if not loaded_more:
                 break
+
+            page += 1
+            journal.record_page(page)
+
+        if awaiting_details:
+            with metrics.span("merge_post_details", artist=url_name):
+                posts = fetcher.merge(awaiting_details)
+            save_batch(download_batch(posts, artist_folder, journal, url_name, processor, artist_quota, cookies),
+                       artist_folder, journal, url_name, processor)
+
+        if unchanged:
+            print(f"Skipped {unchanged} unchanged posts.")
+            metrics.increment("posts_unchanged_total", unchanged, artist=url_name)
+
+        # The end of the feed was reached, the next run starts from the top again
+        journal.complete()
+        journal = None
+        return True
     except TimeoutException:
         print("Timed out waiting for posts to load.")
+        metrics.increment("scrape_errors_total", artist=url_name, error="TimeoutException")
+        return False
     except Exception as e:
         print(f"An error occurred: {e}")
+        metrics.increment("scrape_errors_total", artist=url_name, error=type(e).__name__)
+        return False
+    finally:
+        if legacy_hashes:
+            add_content_hashes(artist_folder / POSTS_FILE_NAME, legacy_hashes)
+        if journal is not None:
+            journal.close()
+        if processor is not None:
+            processor.shutdown()
+        if fetcher is not None:
+            fetcher.shutdown()
+        metrics.flush()
+
+
+def download_batch(posts, artist_folder, journal, url_name, processor=None, quota=None, cookies=None):
+    """
+    Downloads the images of the given posts and starts processing them.
+
+    :param posts: List of post dictionaries with their original image URLs.
+    :param artist_folder: Path to the output folder of the artist.
+    :param journal: The `ScrapeJournal` of the artist.
+    :param url_name: The URL name of the artist.
+    :param processor: Optional `MediaProcessor` to verify the downloaded images with.
+    :param quota: Optional `ArtistQuota` the downloads are charged to.
+    :param cookies: Optional list of browser cookie dictionaries to download the attachments with.
+    :return: A batch to pass to `save_batch`.
+    """
+    cassette.record_posts(posts)
+    with metrics.span("download_post_images", artist=url_name):
+        posts = asyncio.run(download_post_images(posts, artist_folder, journal, quota))
+    if any(post.get("attachments") for post in posts):
+        with metrics.span("download_post_attachments", artist=url_name):
+            posts = asyncio.run(download_post_attachments(posts, artist_folder, journal, quota, cookies))
+    if processor is None:
+        return posts, []
+    return processor.submit(posts, artist_folder)
+
+
+def save_batch(batch, artist_folder, journal, url_name, processor=None):
+    """
+    Waits for the image processing of a batch and saves its posts, recording them in the journal.
+
+    :param batch: A batch returned by `download_batch`.
+    :param artist_folder: Path to the output folder of the artist.
+    :param journal: The `ScrapeJournal` of the artist.
+    :param url_name: The URL name of the artist.
+    :param processor: The `MediaProcessor` the batch was submitted to, if any.
+    """
+    if processor is not None:
+        with metrics.span("process_media", artist=url_name):
+            posts = processor.collect(batch)
+    else:
+        posts = batch[0]
+
+    with metrics.span("save_posts_to_file", artist=url_name):
+        save_posts_to_file(posts, artist_folder)
+    journal.record_saved(post["id"] for post in posts)
+
+
+def skip_loaded_pages(driver, pages, seen_post_ids):
+    """
+    Clicks "Load more" until the feed is as long as in the interrupted run, without extracting any posts.
+
+    :param driver: Selenium WebDriver instance.
+    :param pages: The number of pages that were loaded in the interrupted run.
+    :param seen_post_ids: The IDs of the posts that were already extracted.
+    :return: The number of pages that could be loaded.
+    """
+    if pages:
+        print(f"Skipping {pages} already scraped pages.")
+
+    for page in range(pages):
+        if Config.PRUNE_DOM:
+            driver.execute_script(PRUNE_SEEN_POST_CARDS_SCRIPT, list(seen_post_ids))
+        with metrics.span("click_load_more"):
+            if not click_load_more(driver):
+                return page
+    return pages
+
+
+def prune_post_cards(driver, post_elements):
+    """
+    Removes the content of already extracted post cards from the live DOM.
+
+    The emptied cards stay in place, so the feed's pagination state and the "Load more" button keep working,
+    but they no longer match the post-card XPath and their images can be released by the browser.
+
+    :param driver: Selenium WebDriver instance.
+    :param post_elements: List of WebElements of the post cards to prune.
+    :return: The number of elements left in the DOM.
+    """
+    return driver.execute_script(PRUNE_POST_CARDS_SCRIPT, post_elements)
+
+
+def report_memory(driver, url_name, page, dom_nodes=None, initial_rss=None):
+    """
+    Reports the browser memory usage after a page of posts has been processed.
+
+    Only measures if debugging, metrics or DOM pruning are enabled, since it costs a WebDriver round trip.
+
+    :param driver: Selenium WebDriver instance.
+    :param url_name: The URL name of the artist.
+    :param page: The number of the page that was just processed, starting at 1.
+    :param dom_nodes: The DOM size if already known, e.g. from pruning.
+    :param initial_rss: The first browser RSS in KB that could be measured, None if there was none yet.
+    :return: The first browser RSS in KB that could be measured, used as a baseline for the growth.
+    """
+    if not (Config.DEBUG or Config.PRUNE_DOM or metrics.enabled()):
+        return initial_rss
+
+    if dom_nodes is None:
+        dom_nodes = driver.execute_script("return document.getElementsByTagName('*').length;")
+    rss = browser_rss_kb(driver)
+    # Pages without a reading are skipped, the growth is measured from the first one that has one
+    if initial_rss is None and isinstance(rss, int):
+        initial_rss = rss
+
+    if isinstance(rss, int) and isinstance(initial_rss, int):
+        growth = (rss - initial_rss) / 1024
+        print(f"Page {page}: {dom_nodes} DOM nodes, browser RSS {rss / 1024:.1f} MB ({growth:+.1f} MB)")
+    else:
+        print(f"Page {page}: {dom_nodes} DOM nodes")
+
+    metrics.event("browser_memory", artist=url_name, page=page, dom_nodes=dom_nodes, rss_kb=rss)
+    return initial_rss
 
 
 def click_load_more(driver):
@@ -96,29 +399,44 @@ def click_load_more(driver):
     return False
 
 
-def extract_post_data(post_element, artist):
+def extract_post_data(post_element, artist, since=None, until=None):
     """
     Extracts data from a single post element.
 
     :param post_element: WebElement representing a post.
     :param artist: The artist of the post.
+    :param since: Optional earliest post date in 'YYYY-MM-DD' format (inclusive).
+    :param until: Optional latest post date in 'YYYY-MM-DD' format (inclusive).
     :returns: A dictionary containing the post's title, date, text, and tags, or None if extraction fails.
+        Posts outside the date range only contain their 'id', 'date' and 'out_of_range'. Posts whose card is
+        incomplete are marked with 'incomplete'.
     """
     try:
-        expand_post_content(post_element)
+        date = extract_post_date(post_element)
+
+        # Skip the rest of the extraction, especially expanding the post, if the post is out of range
+        if date and ((since and date < since) or (until and date > until)):
+            return {"id": extract_post_id(post_element), "date": date, "out_of_range": True}
+
+        with metrics.span("expand_post_content"):
+            expand_post_content(post_element)
 
         title = get_element_text(post_element, ".//span[@data-tag='post-title']/a")
-        date = extract_post_date(post_element)
         content = extract_post_text(post_element)
         tags = extract_post_tags(post_element, artist["tag_mapping"])
 
         images = extract_image_urls(post_element)
+        attachments = extract_attachments(post_element) if Config.DOWNLOAD_ATTACHMENTS else []
 
         url = get_element_attribute(post_element, ".//span[@data-tag='post-title']/a", "href")
         post_id = int(url.split("-")[-1])
 
-        return {"id": post_id, "title": title, "date": date, "content": content, "images": images, "tags": tags,
-                "url": url}
+        post_data = {"id": post_id, "title": title, "date": date, "content": content, "images": images,
+                     "tags": tags, "url": url, "attachments": attachments}
+        post_data["content_hash"] = content_hash(post_data)
+        if Config.FETCH_POST_DETAILS and is_card_incomplete(post_element):
+            post_data["incomplete"] = True
+        return post_data
 
     except StaleElementReferenceException:
         pass
@@ -128,6 +446,16 @@ def extract_post_data(post_element, artist):
     return None
 
 
+def is_card_incomplete(post_element):
+    """
+    Checks whether a post card hides images behind a "+N" overlay or text behind a button it could not expand.
+
+    :param post_element: WebElement representing a post.
+    :return: bool
+    """
+    return bool(post_element.parent.execute_script(DETECT_INCOMPLETE_CARD_SCRIPT, post_element))
+
+
 def expand_post_content(post_element):
     """
     Expands the post content if a "Show more" button is present.
@@ -257,6 +585,31 @@ def extract_image_urls(post_element):
         return []
 
 
+def extract_attachments(post_element):
+    """
+    Extracts the attachments as well as embedded audio and video files from a post.
+
+    :param post_element: WebElement representing a post.
+    :returns: list A list of dictionaries with the 'url', 'kind' ('attachment', 'audio' or 'video') and 'name'.
+    """
+    attachments = []
+    seen_urls = set()
+
+    def add(url, kind, name=""):
+        if url and url not in seen_urls and not url.startswith("blob:"):
+            seen_urls.add(url)
+            attachments.append({"url": url, "kind": kind, "name": name})
+
+    for link in post_element.find_elements(By.XPATH, ".//a[@data-tag='post-attachment-link']"):
+        add(link.get_attribute("href"), "attachment", link.text.strip())
+
+    for kind in ("audio", "video"):
+        for source in post_element.find_elements(By.XPATH, f".//{kind}[@src] | .//{kind}/source[@src]"):
+            add(source.get_attribute("src"), kind)
+
+    return attachments
+
+
 def extract_post_id(post_element):
     """
     Extract the unique ID of a post from its element.
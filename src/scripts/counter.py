@@ -1,42 +1,33 @@
+import argparse
 import json
-from collections import defaultdict
-from datetime import datetime
 
 from src.config import Config
+from src.stats import collect_stats, format_stats_table
 from src.utils import load_artists
 
 
-def count_posts_per_year(artist):
-    file_path = Config.OUTPUT_FOLDER / artist["url_name"] / "posts.json"
+def main(argv=None):
+    """
+    Prints the archive statistics of all configured artists.
 
-    if not file_path.exists():
-        print(f"File not found: {file_path}")
-        return
+    :param argv: Optional list of command line arguments.
+    """
+    parser = argparse.ArgumentParser(description="Show statistics about the scraped archive.")
+    parser.add_argument("--json", action="store_true", help="Print the statistics as JSON.")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes.")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore and do not update the statistics cache.")
+    args = parser.parse_args(argv)
 
-    try:
-        # Read JSON file
-        with open(file_path, "r", encoding="utf-8") as f:
-            posts = json.load(f)
+    Config.load()
 
-        year_count = defaultdict(int)
+    artists = load_artists(Config.ARTIST_FILE_PATH)
+    report = collect_stats(artists, Config.OUTPUT_FOLDER, workers=args.workers, use_cache=not args.no_cache)
 
-        for post in posts:
-            date_str = post.get("date")
-            if date_str:
-                try:
-                    post_date = datetime.strptime(date_str, "%Y-%m-%d")
-                    year_count[post_date.year] += 1
-                except ValueError:
-                    print(f"Invalid date format for post: {date_str}")
+    if args.json:
+        print(json.dumps(report, indent=4))
+    else:
+        print(format_stats_table(report))
 
-        print(f"Artist: {artist["display_name"]} ({artist["url_name"]})")
-        for year, count in sorted(year_count.items()):
-            print(f"   {year}: {count} posts")
 
-    except Exception as e:
-        print(f"Error processing file {file_path}: {e}")
-
-
-artists = load_artists(Config.ARTIST_FILE_PATH)
-for a in artists:
-    count_posts_per_year(a)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import argparse
+import asyncio
+import json
+from collections import defaultdict
+
+from src.checkpoint import JOURNAL_FILE_NAME, ScrapeJournal
+from src.config import Config
+from src.post_store import POSTS_FILE_NAME, iter_posts, write_posts
+from src.probe import COOKIES_FILE_NAME, load_session_cookies
+from src.quota import DownloadQuota, format_usage_report
+from src.search_index import open_search_index
+from src.size_utils import parse_size
+from src.stats import collect_stats
+from src.utils import download_post_attachments, download_post_images, load_artists, save_posts_to_file
+
+
+def main(argv=None):
+    """
+    Finishes the downloads of interrupted scrapes and the media deferred by the download quota, without
+    starting the browser.
+
+    The posts that were extracted but never saved are taken from the journal of each artist, their media is
+    downloaded and they are saved. The journal is kept, so the next scrape still skips the loaded pages.
+    Deferred media is downloaded newest post first until the budget of this run is used up.
+
+    :param argv: Optional list of command line arguments.
+    """
+    parser = argparse.ArgumentParser(description="Download the media of unfinished posts without the browser.")
+    parser.add_argument("--artist", action="append", dest="artists", help="Only this artist. Can be repeated.")
+    parser.add_argument("--budget", type=parse_size, default=argparse.SUPPRESS,
+                        help="Maximum number of bytes to download in this run, e.g. 5G. Defaults to DOWNLOAD_BUDGET.")
+    parser.add_argument("--artist-budget", type=parse_size, default=argparse.SUPPRESS,
+                        help="Maximum number of bytes to download per artist in this run, e.g. 500M. "
+                             "Defaults to ARTIST_DOWNLOAD_BUDGET.")
+    parser.add_argument("--bandwidth", type=parse_size, default=argparse.SUPPRESS,
+                        help="Maximum download speed in bytes per second, e.g. 2M. Defaults to DOWNLOAD_BANDWIDTH.")
+    parser.add_argument("--batch-size", type=int, default=20, help="Number of posts downloaded at once.")
+    parser.add_argument("--report", action="store_true", help="Only show the disk usage and deferred media.")
+    args = parser.parse_args(argv)
+
+    Config.load()
+    # An explicit 0 means no limit, so the settings are only used if the option is missing
+    budget = getattr(args, "budget", Config.DOWNLOAD_BUDGET_BYTES)
+    artist_budget = getattr(args, "artist_budget", Config.ARTIST_DOWNLOAD_BUDGET_BYTES)
+    bandwidth = getattr(args, "bandwidth", Config.DOWNLOAD_BANDWIDTH_BYTES)
+
+    artists = load_artists(Config.ARTIST_FILE_PATH)
+    if args.artists:
+        artists = [artist for artist in artists if artist["url_name"] in args.artists]
+
+    if args.report:
+        print(format_usage_report(collect_stats(artists, Config.OUTPUT_FOLDER), artist_budget))
+        return
+
+    quota = DownloadQuota(budget, artist_budget, bandwidth)
+    # The attachments are downloaded with the session of the last scrape
+    cookies = load_session_cookies(Config.OUTPUT_FOLDER / COOKIES_FILE_NAME)
+    for artist in artists:
+        download_pending_posts(artist, quota, cookies)
+    download_deferred_media(artists, quota, args.batch_size, cookies)
+
+    if quota.exhausted():
+        print("The download budget was used up, the remaining media is downloaded in the next run.")
+
+
+def download_pending_posts(artist, quota=None, cookies=None):
+    """
+    Downloads and saves the posts of an interrupted scrape that were extracted but never saved.
+
+    :param artist: The artist dictionary.
+    :param quota: Optional `DownloadQuota` of the run.
+    :param cookies: Optional list of browser cookie dictionaries to download the attachments with.
+    """
+    artist_folder = Config.OUTPUT_FOLDER / artist["url_name"]
+    if not (artist_folder / JOURNAL_FILE_NAME).exists():
+        return
+
+    artist_quota = quota.for_artist(artist["url_name"]) if quota else None
+    journal = ScrapeJournal(artist_folder)
+    try:
+        posts = journal.pending_posts()
+        if not posts:
+            return
+
+        print(f"Downloading {len(posts)} unfinished posts of {artist['display_name']} ({artist['url_name']})")
+        posts = asyncio.run(download_post_images(posts, artist_folder, journal, artist_quota))
+        if any(post.get("attachments") for post in posts):
+            posts = asyncio.run(download_post_attachments(posts, artist_folder, journal, artist_quota, cookies))
+        save_posts_to_file(posts, artist_folder)
+        journal.record_saved(post["id"] for post in posts)
+    finally:
+        journal.close()
+
+
+def download_deferred_media(artists, quota: DownloadQuota, batch_size=20, cookies=None):
+    """
+    Downloads the deferred media of all artists, newest post first, and adds it to the stored posts.
+
+    :param artists: List of artist dictionaries.
+    :param quota: The `DownloadQuota` of the run.
+    :param batch_size: Number of posts downloaded at once.
+    :param cookies: Optional list of browser cookie dictionaries to download the attachments with.
+    :return: The number of posts that were updated.
+    """
+    queue = []
+    for artist in artists:
+        posts_file = Config.OUTPUT_FOLDER / artist["url_name"] / POSTS_FILE_NAME
+        if posts_file.exists():
+            queue.extend(
+                (post["date"], artist["url_name"], post["id"], post["deferred_media"])
+                for post in iter_posts(posts_file) if post.get("deferred_media")
+            )
+    if not queue:
+        return 0
+
+    queue.sort(key=lambda item: item[0], reverse=True)
+    print(f"Downloading the deferred media of {len(queue)} posts.")
+
+    artist_quotas = {}
+    downloaded = defaultdict(list)
+    for start in range(0, len(queue), batch_size):
+        if quota.exhausted():
+            break
+
+        batches = defaultdict(list)
+        for date, url_name, post_id, deferred_media in queue[start:start + batch_size]:
+            batches[url_name].append({
+                "id": post_id,
+                "date": date,
+                "images": [item["url"] for item in deferred_media if item["kind"] == "image"],
+                "attachments": [item for item in deferred_media if item["kind"] != "image"],
+                "deferred_media": deferred_media,
+            })
+
+        for url_name, posts in batches.items():
+            artist_folder = Config.OUTPUT_FOLDER / url_name
+            artist_quota = artist_quotas.setdefault(url_name, quota.for_artist(url_name))
+            posts = asyncio.run(download_post_images(posts, artist_folder, quota=artist_quota))
+            if any(post["attachments"] for post in posts):
+                posts = asyncio.run(download_post_attachments(posts, artist_folder, quota=artist_quota,
+                                                              cookies=cookies))
+            downloaded[url_name].extend(posts)
+
+    for url_name, posts in downloaded.items():
+        add_downloaded_media(Config.OUTPUT_FOLDER / url_name, posts)
+    return sum(len(posts) for posts in downloaded.values())
+
+
+def add_downloaded_media(artist_folder, downloads):
+    """
+    Adds the media downloaded for deferred items to the stored posts of an artist.
+
+    :param artist_folder: Path to the output folder of the artist.
+    :param downloads: Post dictionaries with the downloaded 'images', 'attachments' and the still 'deferred_media'.
+    """
+    posts_file = artist_folder / POSTS_FILE_NAME
+    with open(posts_file, "r") as file:
+        posts = json.load(file)
+
+    by_id = {post["id"]: post for post in downloads}
+    updated = []
+    for post in posts:
+        download = by_id.get(post["id"])
+        if download is None:
+            continue
+
+        post["images"] = post.get("images", []) + download["images"]
+        post.setdefault("source_images", {}).update(download["source_images"])
+        if download.get("attachments"):
+            post["attachments"] = post.get("attachments", []) + download["attachments"]
+            post.setdefault("attachment_meta", {}).update(download.get("attachment_meta", {}))
+        if download.get("deferred_media"):
+            post["deferred_media"] = download["deferred_media"]
+        else:
+            post.pop("deferred_media", None)
+        updated.append(post)
+
+    write_posts(posts_file, posts)
+    print(f"Added the deferred media of {len(updated)} posts to {posts_file}")
+
+    if Config.SEARCH_INDEX:
+        open_search_index(Config.SEARCH_INDEX_PATH, Config.OUTPUT_FOLDER).index_posts(artist_folder.name, updated)
+
+
+if __name__ == "__main__":
+    main()
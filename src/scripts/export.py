@@ -0,0 +1,45 @@
+import argparse
+from pathlib import Path
+
+from src.config import Config
+from src.utils import load_artists
+
+
+def main(argv=None):
+    """
+    Exports the posts of all configured artists into a Parquet dataset partitioned by artist and year.
+
+    Only the artists whose `posts.json` changed since the last export are rewritten. Without `--artist`, the
+    artists that are no longer in the artist file are removed from the dataset.
+
+    :param argv: Optional list of command line arguments.
+    """
+    parser = argparse.ArgumentParser(description="Export the posts of all artists as a Parquet dataset.")
+    parser.add_argument("--output", type=Path, help="Folder of the dataset. Defaults to EXPORT_FOLDER.")
+    parser.add_argument("--artist", action="append", dest="artists", help="Only this artist. Can be repeated.")
+    parser.add_argument("--force", action="store_true", help="Rewrite all artists, even unchanged ones.")
+    args = parser.parse_args(argv)
+
+    Config.load()
+    output = args.output or Config.EXPORT_FOLDER
+
+    try:
+        from src.export import export_archive
+        import pyarrow  # noqa: F401
+    except ImportError:
+        print("The export needs pyarrow, install it with `pip install pyarrow`.")
+        return
+
+    artists = load_artists(Config.ARTIST_FILE_PATH)
+    if args.artists:
+        artists = [artist for artist in artists if artist["url_name"] in args.artists]
+
+    result = export_archive(artists, Config.OUTPUT_FOLDER, output, force=args.force, prune=not args.artists)
+    print(f"Exported {result['posts']} posts of {len(result['exported'])} artists to {output}, "
+          f"{len(result['unchanged'])} artists were unchanged.")
+    if result["removed"]:
+        print(f"Removed the artists that are no longer configured: {', '.join(result['removed'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,12 @@
+import argparse
 import os
-from tkinter import Frame, Button, Label, Toplevel
+from tkinter import Frame, Button, Label, Tk, Toplevel
 
 from PIL import Image, ImageTk
 
+from src.config import Config
+from src.media import THUMBNAILS_FOLDER_NAME, thumbnail_path_for
+
 
 class ImageGallery:
     SUPPORTED_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tiff')
@@ -29,12 +33,14 @@ class ImageGallery:
         self._setup_ui()
 
     def _get_image_files(self, directory):
-        """Recursively collect all image files from the directory."""
-        return [
-            os.path.join(root, file)
-            for root, _, files in os.walk(directory)
-            for file in files if file.lower().endswith(self.SUPPORTED_EXTENSIONS)
-        ]
+        """Recursively collect all image files from the directory, skipping pre-generated thumbnails."""
+        image_files = []
+        for root, dirs, files in os.walk(directory):
+            dirs[:] = [d for d in dirs if d != THUMBNAILS_FOLDER_NAME]
+            image_files.extend(
+                os.path.join(root, file) for file in files if file.lower().endswith(self.SUPPORTED_EXTENSIONS)
+            )
+        return image_files
 
     def _setup_ui(self):
         """Set up the main UI components."""
@@ -109,7 +115,12 @@ class ImageGallery:
         """Create or retrieve a cached thumbnail for the given image path."""
         if image_path not in self.loaded_thumbnails:
             try:
-                image = Image.open(image_path)
+                # Prefer the thumbnail generated after the download, it is much cheaper to decode
+                pre_generated = thumbnail_path_for(image_path)
+                if pre_generated and pre_generated.exists():
+                    image = Image.open(pre_generated)
+                else:
+                    image = Image.open(image_path)
                 image.thumbnail((size, size))
                 self.loaded_thumbnails[image_path] = ImageTk.PhotoImage(image)
             except Exception as e:
@@ -190,3 +201,30 @@ class ImageGallery:
         """Handle the closing of an image window."""
         del self.open_windows[image_path]
         window.destroy()
+
+
+def main(argv=None):
+    """
+    Opens the gallery with the downloaded images of one artist or the whole archive.
+
+    :param argv: Optional list of command line arguments.
+    """
+    parser = argparse.ArgumentParser(description="Browse the downloaded images.")
+    parser.add_argument("--artist", help="Only the images of the artist with this URL name.")
+    parser.add_argument("--rows", type=int, default=5, help="Number of thumbnail rows per page.")
+    parser.add_argument("--cols", type=int, default=6, help="Number of thumbnail columns per page.")
+    args = parser.parse_args(argv)
+
+    Config.load()
+    image_dir = Config.OUTPUT_FOLDER / args.artist if args.artist else Config.OUTPUT_FOLDER
+    if not image_dir.exists():
+        print(f"Folder not found: {image_dir}")
+        return
+
+    root = Tk()
+    ImageGallery(root, str(image_dir), rows=args.rows, cols=args.cols)
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import argparse
+import json
+
+from src.config import Config
+from src.media import MediaProcessor, find_near_duplicates
+from src.post_store import POSTS_FILE_NAME, write_posts
+from src.utils import load_artists
+
+
+def main(argv=None):
+    """
+    Verifies the images of already scraped posts, records their metadata and generates missing thumbnails.
+
+    :param argv: Optional list of command line arguments.
+    """
+    parser = argparse.ArgumentParser(description="Process the images of an existing archive.")
+    parser.add_argument("--artist", action="append", dest="artists", help="Only this artist. Can be repeated.")
+    parser.add_argument("--force", action="store_true", help="Also reprocess images that already have metadata.")
+    parser.add_argument("--workers", type=int, default=argparse.SUPPRESS,
+                        help="Number of worker processes. Defaults to MEDIA_WORKERS.")
+    parser.add_argument("--duplicates", action="store_true", help="List near-duplicate images per artist.")
+    args = parser.parse_args(argv)
+
+    Config.load()
+    workers = getattr(args, "workers", Config.MEDIA_WORKERS)
+
+    artists = load_artists(Config.ARTIST_FILE_PATH)
+    if args.artists:
+        artists = [artist for artist in artists if artist["url_name"] in args.artists]
+
+    with MediaProcessor(workers) as processor:
+        for artist in artists:
+            artist_folder = Config.OUTPUT_FOLDER / artist["url_name"]
+            posts_file = artist_folder / POSTS_FILE_NAME
+            if not posts_file.exists():
+                print(f"File not found: {posts_file}")
+                continue
+
+            with open(posts_file, "r") as file:
+                posts = json.load(file)
+
+            batch = processor.submit(posts, artist_folder, force=args.force)
+            processed = len(batch[1])
+            processor.collect(batch)
+            if processed:
+                write_posts(posts_file, posts)
+
+            invalid = [
+                image for post in posts for image, meta in post.get("image_meta", {}).items() if not meta["valid"]
+            ]
+            print(f"{artist['display_name']} ({artist['url_name']}): processed {processed} images, "
+                  f"{len(invalid)} invalid")
+
+            if args.duplicates:
+                for image, other, distance in find_near_duplicates(posts):
+                    print(f"   {image} ~ {other} (distance {distance})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import json
+
+from src.config import Config
+from src.search_index import SearchIndex
+from src.utils import load_artists
+
+
+def main(argv=None):
+    """
+    Searches the full-text index of the scraped archive.
+
+    :param argv: Optional list of command line arguments.
+    """
+    parser = argparse.ArgumentParser(description="Search the scraped posts of all artists.")
+    parser.add_argument("query", nargs="?", help="Full-text query over title, content and tags.")
+    parser.add_argument("--tag", action="append", dest="tags", help="Only posts with this tag. Can be repeated.")
+    parser.add_argument("--since", help="Only posts published on or after this date (YYYY-MM-DD).")
+    parser.add_argument("--until", help="Only posts published on or before this date (YYYY-MM-DD).")
+    parser.add_argument("--artist", help="Only posts of the artist with this URL name.")
+    parser.add_argument("--limit", type=int, default=50, help="Maximum number of results.")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+    parser.add_argument("--reindex", action="store_true", help="Rebuild the index from all posts.json files first.")
+    args = parser.parse_args(argv)
+
+    Config.load()
+
+    index = SearchIndex(Config.SEARCH_INDEX_PATH, Config.OUTPUT_FOLDER)
+    try:
+        if args.reindex:
+            count = index.rebuild(load_artists(Config.ARTIST_FILE_PATH))
+            print(f"Indexed {count} posts.")
+
+        results = index.search(args.query, tags=args.tags, since=args.since, until=args.until, artist=args.artist,
+                               limit=args.limit)
+    finally:
+        index.close()
+
+    if args.json:
+        print(json.dumps(results, indent=4))
+        return
+
+    for result in results:
+        print(f"{result['date']}  {result['artist']}  {result['title']}")
+        print(f"   {result['url']}")
+        for image in result["images"]:
+            print(f"   {image}")
+
+
+def reindex(argv=None):
+    """
+    Rebuilds the full-text index from the `posts.json` files of all artists.
+
+    :param argv: Optional list of command line arguments.
+    """
+    parser = argparse.ArgumentParser(description="Rebuild the search index of the scraped posts.")
+    parser.parse_args(argv)
+
+    Config.load()
+    index = SearchIndex(Config.SEARCH_INDEX_PATH, Config.OUTPUT_FOLDER)
+    try:
+        count = index.rebuild(load_artists(Config.ARTIST_FILE_PATH))
+    finally:
+        index.close()
+    print(f"Indexed {count} posts.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+import json
+import re
+import sqlite3
+from functools import lru_cache
+from pathlib import Path
+
+from src.post_store import POSTS_FILE_NAME, iter_posts
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    rowid INTEGER PRIMARY KEY,
+    artist TEXT NOT NULL,
+    post_id INTEGER NOT NULL,
+    title TEXT,
+    content TEXT,
+    tags TEXT,
+    date TEXT,
+    url TEXT,
+    images TEXT,
+    UNIQUE (artist, post_id)
+);
+CREATE INDEX IF NOT EXISTS posts_date ON posts (date);
+
+CREATE TABLE IF NOT EXISTS post_tags (
+    post_rowid INTEGER NOT NULL REFERENCES posts (rowid) ON DELETE CASCADE,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (tag, post_rowid)
+) WITHOUT ROWID;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+    title, content, tags, content='posts', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS posts_ai AFTER INSERT ON posts BEGIN
+    INSERT INTO posts_fts (rowid, title, content, tags) VALUES (new.rowid, new.title, new.content, new.tags);
+END;
+CREATE TRIGGER IF NOT EXISTS posts_ad AFTER DELETE ON posts BEGIN
+    INSERT INTO posts_fts (posts_fts, rowid, title, content, tags)
+    VALUES ('delete', old.rowid, old.title, old.content, old.tags);
+END;
+CREATE TRIGGER IF NOT EXISTS posts_au AFTER UPDATE ON posts BEGIN
+    INSERT INTO posts_fts (posts_fts, rowid, title, content, tags)
+    VALUES ('delete', old.rowid, old.title, old.content, old.tags);
+    INSERT INTO posts_fts (rowid, title, content, tags) VALUES (new.rowid, new.title, new.content, new.tags);
+END;
+"""
+
+FTS_OPERATORS = {"AND", "OR", "NOT"}
+
+
+def build_fts_query(query):
+    """
+    Turns a search query into an FTS5 query that matches every term literally.
+
+    Terms are quoted, so characters like `-`, `+` or `:` are searched for instead of being read as FTS5 syntax.
+    `AND`, `OR` and `NOT` between two terms stay operators, a `"quoted phrase"` is matched as a phrase and a
+    trailing `*` matches all words starting with the term.
+
+    :param query: The search query, e.g. 'dragon OR wyvern'.
+    :return: str The FTS5 query, empty if the query has no terms.
+    """
+    tokens = [token for token in re.findall(r'"[^"]*"?|\S+', query) if token.strip('"*')]
+    parts = []
+    for position, token in enumerate(tokens):
+        if (token in FTS_OPERATORS and parts and parts[-1] not in FTS_OPERATORS
+                and position < len(tokens) - 1):
+            parts.append(token)
+            continue
+        prefix = "*" if token.endswith("*") else ""
+        term = token.rstrip("*").strip('"')
+        parts.append('"' + term.replace('"', '""') + '"' + prefix)
+    return " ".join(parts)
+
+
+class SearchIndex:
+    """
+    A full-text index over the title, content and tags of all scraped posts, backed by SQLite FTS5.
+
+    The index is maintained incrementally: every batch of posts written to an artist's `posts.json` is
+    upserted in a single transaction. Local image paths are stored relative to the artist folder, like in
+    `posts.json`, and resolved against the output folder when returning results.
+    """
+
+    def __init__(self, db_path: Path, output_folder: Path = None):
+        self.db_path = Path(db_path)
+        self.output_folder = Path(output_folder) if output_folder else self.db_path.parent
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.db_path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("PRAGMA foreign_keys=ON")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        """Closes the underlying database connection."""
+        self.connection.close()
+
+    def index_posts(self, artist, posts):
+        """
+        Adds or updates the given posts of an artist in the index.
+
+        :param artist: The URL name of the artist.
+        :param posts: An iterable of post dictionaries.
+        :return: The number of indexed posts.
+        """
+        count = 0
+        with self.connection:
+            for post in posts:
+                tags = post.get("tags", [])
+                row = self.connection.execute(
+                    """
+                    INSERT INTO posts (artist, post_id, title, content, tags, date, url, images)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (artist, post_id) DO UPDATE SET
+                        title = excluded.title, content = excluded.content, tags = excluded.tags,
+                        date = excluded.date, url = excluded.url, images = excluded.images
+                    RETURNING rowid
+                    """,
+                    (artist, post["id"], post.get("title"), post.get("content"), json.dumps(tags), post.get("date"),
+                     post.get("url"), json.dumps(post.get("images", []))),
+                ).fetchone()
+
+                self.connection.execute("DELETE FROM post_tags WHERE post_rowid = ?", (row[0],))
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO post_tags (post_rowid, tag) VALUES (?, ?)",
+                    [(row[0], tag) for tag in tags],
+                )
+                count += 1
+        return count
+
+    def rebuild(self, artists, output_folder: Path = None, batch_size=1000):
+        """
+        Re-indexes all posts of the given artists from their `posts.json` files.
+
+        :param artists: List of artist dictionaries with a 'url_name' key.
+        :param output_folder: The root output folder. Defaults to the output folder of the index.
+        :param batch_size: Number of posts to index per transaction.
+        :return: The total number of indexed posts.
+        """
+        output_folder = Path(output_folder) if output_folder else self.output_folder
+        total = 0
+
+        for artist in artists:
+            url_name = artist["url_name"]
+            posts_file = output_folder / url_name / POSTS_FILE_NAME
+            if not posts_file.exists():
+                continue
+
+            with self.connection:
+                self.connection.execute("DELETE FROM posts WHERE artist = ?", (url_name,))
+
+            batch = []
+            for post in iter_posts(posts_file):
+                batch.append(post)
+                if len(batch) >= batch_size:
+                    total += self.index_posts(url_name, batch)
+                    batch = []
+            total += self.index_posts(url_name, batch)
+
+        with self.connection:
+            self.connection.execute("INSERT INTO posts_fts (posts_fts) VALUES ('optimize')")
+        return total
+
+    def search(self, query=None, tags=None, since=None, until=None, artist=None, limit=50):
+        """
+        Searches the index.
+
+        :param query: Query over title, content and tags, e.g. 'dragon OR wyvern', see `build_fts_query`.
+            None matches all posts.
+        :param tags: Optional list of tags that all must be present on a post.
+        :param since: Optional earliest post date in 'YYYY-MM-DD' format (inclusive).
+        :param until: Optional latest post date in 'YYYY-MM-DD' format (inclusive).
+        :param artist: Optional URL name of the artist to restrict the search to.
+        :param limit: Maximum number of results.
+        :return: A list of result dictionaries with the post URL and absolute local image paths.
+        """
+        conditions = []
+        params = []
+
+        if query:
+            fts_query = build_fts_query(query)
+            if not fts_query:
+                return []
+            sql = "SELECT p.* FROM posts_fts JOIN posts p ON p.rowid = posts_fts.rowid"
+            conditions.append("posts_fts MATCH ?")
+            params.append(fts_query)
+            order = "ORDER BY bm25(posts_fts)"
+        else:
+            sql = "SELECT p.* FROM posts p"
+            order = "ORDER BY p.date DESC, p.post_id DESC"
+
+        for tag in tags or []:
+            conditions.append("p.rowid IN (SELECT post_rowid FROM post_tags WHERE tag = ?)")
+            params.append(tag)
+        if since:
+            conditions.append("p.date >= ?")
+            params.append(since)
+        if until:
+            conditions.append("p.date <= ?")
+            params.append(until)
+        if artist:
+            conditions.append("p.artist = ?")
+            params.append(artist)
+
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += f" {order} LIMIT ?"
+        params.append(limit)
+
+        return [self._to_result(row) for row in self.connection.execute(sql, params)]
+
+    def _to_result(self, row):
+        artist_folder = self.output_folder / row["artist"]
+        return {
+            "artist": row["artist"],
+            "id": row["post_id"],
+            "title": row["title"],
+            "date": row["date"],
+            "tags": json.loads(row["tags"]),
+            "url": row["url"],
+            "images": [str(artist_folder / image) for image in json.loads(row["images"])],
+        }
+
+
+@lru_cache(maxsize=None)
+def open_search_index(db_path: Path, output_folder: Path = None):
+    """
+    Returns a shared `SearchIndex` for the given database path, opening it on first use.
+
+    :param db_path: Path to the SQLite database file.
+    :param output_folder: The root output folder the image paths are relative to.
+    :return: The `SearchIndex` instance.
+    """
+    return SearchIndex(db_path, output_folder)
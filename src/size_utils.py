@@ -0,0 +1,32 @@
+import re
+
+SIZE_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+
+def parse_size(raw):
+    """
+    Parses a size like '500M', '2G' or '1048576' into bytes.
+
+    :param raw: The size, optionally with a K, M, G or T suffix (powers of 1024). Empty or 0 means no limit.
+    :return: int The size in bytes, or None for no limit.
+    """
+    if raw is None or str(raw).strip() in ("", "0"):
+        return None
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)i?B?\s*", str(raw), re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Invalid size: {raw}")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).upper()])
+
+
+def format_bytes(size):
+    """
+    Formats a byte count in a human-readable way.
+
+    :param size: The size in bytes.
+    :return: str The formatted size, e.g. '12.3 MB'.
+    """
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}" if unit != "B" else f"{size} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
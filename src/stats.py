@@ -0,0 +1,229 @@
+import os
+from collections import Counter
+from pathlib import Path
+
+from src.post_store import POSTS_FILE_NAME, iter_posts, load_json_state, posts_file_signature, save_json_state
+from src.size_utils import format_bytes
+
+STATS_CACHE_FILE_NAME = ".stats_cache.json"
+
+
+def aggregate_artist(artist_folder: Path):
+    """
+    Computes the statistics of a single artist by streaming through its `posts.json` file.
+
+    :param artist_folder: Path to the output folder of the artist.
+    :return: A dictionary with post, image, deferred media and byte totals as well as per-year, per-month and
+        per-tag counts.
+    """
+    years = Counter()
+    months = Counter()
+    tags = Counter()
+    post_count = 0
+    image_count = 0
+    deferred_count = 0
+
+    for post in iter_posts(artist_folder / POSTS_FILE_NAME):
+        post_count += 1
+        image_count += len(post.get("images", []))
+        deferred_count += len(post.get("deferred_media", []))
+        tags.update(post.get("tags", []))
+
+        # Dates are always stored as 'YYYY-MM-DD', slicing avoids parsing them
+        date_str = post.get("date")
+        if date_str and len(date_str) >= 7:
+            years[date_str[:4]] += 1
+            months[date_str[:7]] += 1
+
+    return {
+        "posts": post_count,
+        "images": image_count,
+        "deferred": deferred_count,
+        "bytes": folder_size(artist_folder),
+        "years": dict(sorted(years.items())),
+        "months": dict(sorted(months.items())),
+        "tags": dict(tags.most_common()),
+    }
+
+
+def folder_size(folder: Path):
+    """
+    Sums up the size of all files below a folder.
+
+    :param folder: The folder to measure.
+    :return: The total size in bytes.
+    """
+    total = 0
+    for root, _, files in os.walk(folder):
+        for file in files:
+            try:
+                total += os.stat(os.path.join(root, file)).st_size
+            except FileNotFoundError:
+                pass
+    return total
+
+
+def try_aggregate_artist(artist_folder: Path):
+    """
+    Computes the statistics of a single artist like `aggregate_artist`, without raising for a corrupt `posts.json`.
+
+    :param artist_folder: Path to the output folder of the artist.
+    :return: A tuple of the statistics and None, or of None and the error message.
+    """
+    try:
+        return aggregate_artist(artist_folder), None
+    except (ValueError, OSError) as e:
+        return None, str(e)
+
+
+def media_signature(artist_folder: Path, depth=3):
+    """
+    Returns a cheap signature of the media folders of an artist, without looking at the files themselves.
+
+    Media is stored in `{KIND}/{YEAR}/{MONTH}/` folders below the artist folder. The modification time of a folder
+    changes whenever a file is created, deleted or renamed in it, and downloads are renamed into place, so the
+    newest modification time of these folders changes with every downloaded or removed file.
+
+    :param artist_folder: Path to the output folder of the artist.
+    :param depth: How many levels of folders to look at.
+    :return: A list of the number of folders and their newest modification time in nanoseconds.
+    """
+    count = 0
+    newest = 0
+    folders = [artist_folder]
+    for _ in range(depth):
+        subfolders = []
+        for folder in folders:
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            subfolders.append(entry.path)
+                            count += 1
+                            newest = max(newest, entry.stat(follow_symlinks=False).st_mtime_ns)
+            except OSError:
+                pass
+        folders = subfolders
+    return [count, newest]
+
+
+def merge_stats(stats_list):
+    """
+    Merges several artist statistics into a single total.
+
+    :param stats_list: An iterable of statistics as returned by `aggregate_artist`.
+    :return: The combined statistics.
+    """
+    total = {"posts": 0, "images": 0, "deferred": 0, "bytes": 0, "years": Counter(), "months": Counter(),
+             "tags": Counter()}
+    for stats in stats_list:
+        for key in ("posts", "images", "deferred", "bytes"):
+            # Cached statistics from before deferred media was counted lack the key
+            total[key] += stats.get(key, 0)
+        for key in ("years", "months", "tags"):
+            total[key].update(stats[key])
+
+    total["years"] = dict(sorted(total["years"].items()))
+    total["months"] = dict(sorted(total["months"].items()))
+    total["tags"] = dict(total["tags"].most_common())
+    return total
+
+
+def collect_stats(artists, output_folder: Path, workers=None, use_cache=True):
+    """
+    Collects the archive statistics of the given artists.
+
+    Artists whose `posts.json` and media folders did not change since the last call are served from a cache
+    stored in the output folder, the remaining ones are aggregated in parallel in a process pool. The media
+    folders are part of the signature, since media can be downloaded or deleted without touching `posts.json`.
+
+    :param artists: List of artist dictionaries with a 'url_name' key.
+    :param output_folder: The root output folder containing one folder per artist.
+    :param workers: Maximum number of worker processes. Defaults to the number of CPUs.
+    :param use_cache: Whether to read and update the statistics cache.
+    :return: A dictionary with the statistics per artist, the combined total, the artists without posts and the
+        errors of the artists whose `posts.json` could not be read.
+    """
+    cache_file = output_folder / STATS_CACHE_FILE_NAME
+    cache = load_json_state(cache_file) if use_cache else {}
+
+    results = {}
+    missing = []
+    errors = {}
+    stale = {}
+
+    for artist in artists:
+        url_name = artist["url_name"]
+        signature = posts_file_signature(output_folder / url_name / POSTS_FILE_NAME)
+
+        if signature is None:
+            missing.append(url_name)
+            continue
+        signature += media_signature(output_folder / url_name)
+
+        cached = cache.get(url_name)
+        if cached and cached["signature"] == signature:
+            results[url_name] = cached["stats"]
+        else:
+            stale[url_name] = signature
+
+    if stale:
+        folders = [output_folder / url_name for url_name in stale]
+
+        # Spawning processes only pays off when there is more than one artist to aggregate
+        if len(folders) == 1 or workers == 1:
+            aggregated = [try_aggregate_artist(folder) for folder in folders]
+        else:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            # Like the media workers, the pool must not fork a process that may already run threads
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+                aggregated = list(executor.map(try_aggregate_artist, folders))
+
+        for (url_name, signature), (stats, error) in zip(stale.items(), aggregated):
+            # A broken artist is left out and not cached, so it is read again once it was repaired
+            if error is not None:
+                print(f"Could not read the posts of {url_name}: {error}")
+                errors[url_name] = error
+                cache.pop(url_name, None)
+                continue
+            results[url_name] = stats
+            cache[url_name] = {"signature": signature, "stats": stats}
+
+        if use_cache:
+            save_json_state(cache_file, cache, indent=None)
+
+    ordered = {artist["url_name"]: results[artist["url_name"]] for artist in artists if artist["url_name"] in results}
+    return {"artists": ordered, "total": merge_stats(ordered.values()), "missing": missing, "errors": errors}
+
+
+def format_stats_table(report, top_tags=10):
+    """
+    Renders the statistics report as a plain text table.
+
+    :param report: The report as returned by `collect_stats`.
+    :param top_tags: How many of the most used tags to show per artist.
+    :return: str The formatted table.
+    """
+    lines = []
+    sections = list(report["artists"].items()) + [("TOTAL", report["total"])]
+
+    for name, stats in sections:
+        lines.append(f"{name}: {stats['posts']} posts, {stats['images']} images, {format_bytes(stats['bytes'])}")
+        for year, count in stats["years"].items():
+            lines.append(f"   {year}: {count} posts")
+            for month, month_count in stats["months"].items():
+                if month.startswith(year):
+                    lines.append(f"      {month}: {month_count}")
+        if stats["tags"]:
+            tags = list(stats["tags"].items())[:top_tags]
+            lines.append("   Tags: " + ", ".join(f"{tag} ({count})" for tag, count in tags))
+
+    for name in report["missing"]:
+        lines.append(f"{name}: no posts.json found")
+    for name, error in report.get("errors", {}).items():
+        lines.append(f"{name}: posts.json could not be read ({error})")
+
+    return "\n".join(lines)
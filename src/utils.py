@@ -1,12 +1,14 @@
+import hashlib
 import json
 import re
-
-import aiohttp
-import asyncio
+import time
 from pathlib import Path
 from datetime import datetime
 
+from src import cassette, metrics
 from src.config import Config
+from src.post_store import POSTS_FILE_NAME, matches_legacy_post, source_image_key, write_posts
+from src.search_index import open_search_index
 
 
 def load_artists(file_path="artists.json"):
@@ -35,98 +37,424 @@ def sanitize_filename(filename: str) -> str:
     return filename
 
 
-async def download_image(session, url, folder_path: Path):
+async def download_image(session, url, folder_path: Path, quota=None):
     """
     Downloads an image from a URL and saves it to a specified folder with the given file name.
 
     :param session: An aiohttp ClientSession instance.
     :param url: The URL of the image to download.
     :param folder_path: The folder path where the image will be saved.
+    :param quota: Optional `ArtistQuota` the download is charged to.
     :return: The absolute path to the downloaded image.
     """
+    started = time.perf_counter()
+    file_path = await download_file(session, url, folder_path, quota=quota)
+    if file_path is not None:
+        metrics.increment("downloaded_images_total")
+        if cassette.recording():
+            import asyncio
+
+            await asyncio.to_thread(cassette.record_media, url, file_path, time.perf_counter() - started)
+    return file_path
+
+
+async def download_file(session, url, folder_path: Path, max_bytes=None, quota=None):
+    """
+    Downloads a file from a URL into a folder, streaming it to disk instead of holding it in memory.
+
+    Files of at least `Config.SEGMENT_THRESHOLD_BYTES` are fetched with several parallel Range requests if the
+    server supports them. The data is written to a `.part` file that only replaces the target once complete.
+
+    :param session: An aiohttp ClientSession instance.
+    :param url: The URL of the file to download.
+    :param folder_path: The folder path where the file will be saved.
+    :param max_bytes: Optional size limit. Larger files are skipped.
+    :param quota: Optional `ArtistQuota`. Files that do not fit into its budget are deferred.
+    :return: The absolute path to the downloaded file, or None if the download failed, was skipped or deferred.
+    """
     folder_path.mkdir(parents=True, exist_ok=True)
+    reserved = None
+    part_path = None
 
     try:
         async with session.get(url) as response:
-            if response.status == 200:
-                content_disposition = response.headers.get("Content-Disposition")
-                if content_disposition:
-                    match = re.search(r'filename="([^"]+)"', content_disposition)
-                    file_name = match.group(1) if match else None
-                else:
-                    file_name = None
-
-                # Fallback to using the basename of URL
-                if not file_name:
-                    file_name = url.split("/")[-1]
+            metrics.increment("http_responses_total", status=response.status)
+            if response.status != 200:
+                print(f"Failed to download {url}: {response.status}")
+                return None
 
-                file_name = sanitize_filename(file_name)
-                file_path = folder_path / file_name
+            # Expired sessions and missing permissions are answered with a login or error page
+            if response.content_type == "text/html":
+                print(f"Failed to download {url}: received an HTML page instead of a file")
+                metrics.increment("download_errors_total", error="HTMLResponse")
+                return None
 
-                # Skip download if the file already exists
-                if file_path.exists():
-                    return file_path
+            file_path = folder_path / get_file_name(response, url)
 
-                with open(file_path, "wb") as f:
-                    f.write(await response.read())
+            # Skip download if the file already exists
+            if file_path.exists():
                 return file_path
-            else:
-                print(f"Failed to download {url}: {response.status}")
+
+            size = response.content_length
+            if max_bytes and size and size > max_bytes:
+                print(f"Skipping {url}: {size} bytes exceeds the limit of {max_bytes} bytes")
+                metrics.increment("downloads_skipped_total", reason="size")
+                return None
+
+            if quota is not None:
+                reserved = await quota.reserve(url, size)
+                if reserved is None:
+                    metrics.increment("downloads_skipped_total", reason="quota")
+                    return None
+
+            part_path = file_path.with_name(file_path.name + ".part")
+            segmented = (
+                size and size >= Config.SEGMENT_THRESHOLD_BYTES and Config.DOWNLOAD_SEGMENTS > 1
+                and response.headers.get("Accept-Ranges") == "bytes"
+            )
+
+            if not segmented:
+                with metrics.span("download_file"):
+                    written = await _write_stream(response, part_path, quota=quota)
+                if max_bytes and written > max_bytes:
+                    part_path.unlink()
+                    if quota is not None:
+                        quota.settle(reserved, 0)
+                    print(f"Skipping {url}: exceeds the limit of {max_bytes} bytes")
+                    return None
+
+        # The initial response is closed at this point, the segments use their own requests
+        if segmented:
+            with metrics.span("download_file_segmented"):
+                await _download_segments(session, url, part_path, size, Config.DOWNLOAD_SEGMENTS, quota=quota)
+            written = size
+
+        part_path.replace(file_path)
+        metrics.increment("downloaded_bytes_total", written)
+        if quota is not None:
+            quota.settle(reserved, written)
+        return file_path
     except Exception as e:
         print(f"Error downloading {url}: {e}")
+        metrics.increment("download_errors_total", error=type(e).__name__)
+        if part_path is not None:
+            part_path.unlink(missing_ok=True)
+        if reserved is not None:
+            quota.settle(reserved, 0)
+    finally:
+        # Downloads that ended before reserving must not hold up the ones after them
+        if quota is not None:
+            quota.release(url)
     return None
 
 
-async def download_post_images(posts, output_folder: Path):
+def get_file_name(response, url):
+    """
+    Determines the file name of a download from its Content-Disposition header or its URL.
+
+    :param response: The aiohttp response of the download.
+    :param url: The URL of the download.
+    :return: str The sanitized file name.
+    """
+    content_disposition = response.headers.get("Content-Disposition")
+    if content_disposition:
+        match = re.search(r'filename="([^"]+)"', content_disposition)
+        file_name = match.group(1) if match else None
+    else:
+        file_name = None
+
+    # Fallback to using the basename of URL
+    if not file_name:
+        file_name = url.split("/")[-1]
+
+    return sanitize_filename(file_name)
+
+
+async def _write_stream(response, file_path: Path, offset=0, chunk_size=1 << 16, quota=None):
+    written = 0
+    with open(file_path, "r+b" if offset else "wb") as f:
+        f.seek(offset)
+        async for chunk in response.content.iter_chunked(chunk_size):
+            if quota is not None:
+                await quota.throttle(len(chunk))
+            f.write(chunk)
+            written += len(chunk)
+    return written
+
+
+async def _download_segments(session, url, part_path: Path, size, segments, retries=3, quota=None):
+    import asyncio
+    import aiohttp
+
+    # Pre-allocate the file, so every segment can write to its own offset
+    with open(part_path, "wb") as f:
+        f.truncate(size)
+
+    segment_size = -(-size // segments)
+
+    async def fetch(start):
+        end = min(start + segment_size, size) - 1
+        for attempt in range(retries):
+            try:
+                async with session.get(url, headers={"Range": f"bytes={start}-{end}"}) as response:
+                    metrics.increment("http_responses_total", status=response.status)
+                    if response.status != 206:
+                        raise IOError(f"Range request returned {response.status}")
+                    written = await _write_stream(response, part_path, offset=start, quota=quota)
+                    if written != end - start + 1:
+                        raise IOError(f"Segment {start}-{end} is incomplete ({written} bytes)")
+                    return
+            except (aiohttp.ClientError, asyncio.TimeoutError, IOError):
+                if attempt == retries - 1:
+                    raise
+
+    await asyncio.gather(*(fetch(start) for start in range(0, size, segment_size)))
+
+
+def file_sha256(file_path: Path, chunk_size=1 << 20):
+    """
+    Computes the SHA-256 checksum of a file without loading it into memory.
+
+    :param file_path: Path to the file.
+    :return: str The hexadecimal checksum.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def download_post_images(posts, output_folder: Path, journal=None, quota=None):
     """
     Download images for posts asynchronously and updates their image attributes.
 
+    With a quota, the images of the newest posts are granted the budget first and images that do not fit into
+    the budget are moved to the post's 'deferred_media'.
+
     :param posts: A list of post dictionaries with a 'date' and 'images' attribute.
-    :param output_folder:
-    :return: The list of posts with updated 'images' attributes.
+    :param output_folder: Path to the output folder of the specific artist.
+    :param journal: Optional `ScrapeJournal` to record finished downloads in and to skip the ones already done.
+    :param quota: Optional `ArtistQuota` the downloads are charged to.
+    :return: The list of posts with updated 'images' and 'source_images' attributes.
     """
+    # Imported here, so the offline commands that only need the helpers of this module start faster
+    import asyncio
+    import aiohttp
+
     async with aiohttp.ClientSession() as session:
         if Config.DEBUG:
             print(f"Output folder: {output_folder}")
 
-        tasks = []
+        tasks = {}
+        # The URLs that are downloaded, in the order the budget is granted to them
+        ordered_urls = []
 
-        for post in posts:
+        for post_index, post in prioritize(posts):
             post_date = datetime.strptime(post["date"], "%Y-%m-%d")
             year = post_date.year
             month = f"{post_date.month:02d}"
 
             folder_path = output_folder / "images" / str(year) / str(month)
-            for url in post["images"]:
-                tasks.append(download_image(session, url, folder_path))
+            # Images of a previous version of an edited post are reused
+            known = post.get("source_images", {})
+            for image_index, url in enumerate(post["images"]):
+                known_path = known.get(source_image_key(url))
+                if known_path and (output_folder / known_path).exists():
+                    task = _completed(output_folder / known_path)
+                elif journal is not None and url in journal.downloads:
+                    task = _completed(output_folder / journal.downloads[url])
+                elif quota is not None and quota.exhausted():
+                    quota.defer(url)
+                    task = _completed(None)
+                elif journal is None:
+                    task = download_image(session, url, folder_path, quota)
+                    ordered_urls.append(url)
+                else:
+                    task = _download_and_record(session, url, folder_path, output_folder, journal, quota)
+                    ordered_urls.append(url)
+                tasks[post_index, image_index] = task
 
-        # Gather all results
-        downloaded_paths = await asyncio.gather(*tasks)
+        if quota is not None:
+            quota.prioritize(ordered_urls)
+        try:
+            # Gather all results
+            downloaded_paths = dict(zip(tasks, await asyncio.gather(*tasks.values())))
+        finally:
+            if quota is not None:
+                quota.prioritize(None)
 
-        # Update post 'images' attributes
-        index = 0
-        for post in posts:
+        # Update post 'images' attributes, leaving out images that failed to download
+        for post_index, post in enumerate(posts):
             updated_images = []
-            for _ in post["images"]:
-                relative_path = Path(downloaded_paths[index]).relative_to(output_folder)
-                if Config.DEBUG:
-                    print(relative_path)
-                if relative_path:
+            source_images = {}
+            deferred = []
+            for image_index, url in enumerate(post["images"]):
+                downloaded_path = downloaded_paths[post_index, image_index]
+                if downloaded_path is not None:
+                    relative_path = Path(downloaded_path).relative_to(output_folder)
+                    if Config.DEBUG:
+                        print(relative_path)
                     updated_images.append(str(relative_path))
-                index += 1
+                    source_images[source_image_key(url)] = str(relative_path)
+                elif quota is not None and url in quota.deferred:
+                    deferred.append({"url": url, "kind": "image"})
             post["images"] = updated_images
+            post["source_images"] = source_images
+            _set_deferred(post, deferred, images=True)
+            if "image_meta" in post:
+                post["image_meta"] = {
+                    image: meta for image, meta in post["image_meta"].items() if image in updated_images
+                }
+
+    return posts
+
+
+async def _download_and_record(session, url, folder_path: Path, output_folder: Path, journal, quota=None):
+    file_path = await download_image(session, url, folder_path, quota)
+    if file_path is not None:
+        journal.record_download(url, str(file_path.relative_to(output_folder)))
+    return file_path
+
+
+async def _completed(file_path: Path):
+    return file_path
+
+
+def prioritize(posts):
+    """
+    Orders posts for downloading, newest first, so they get the budget and bandwidth when a quota runs out.
+
+    :param posts: A list of post dictionaries with a 'date' attribute.
+    :return: A list of (index in `posts`, post) tuples.
+    """
+    return sorted(enumerate(posts), key=lambda item: item[1]["date"], reverse=True)
+
+
+def _set_deferred(post, deferred, images):
+    # Images and attachments are downloaded separately, each replaces only its own deferred entries
+    kept = [item for item in post.get("deferred_media", []) if (item["kind"] == "image") != images]
+    if kept or deferred:
+        post["deferred_media"] = kept + deferred
+    else:
+        post.pop("deferred_media", None)
+
+
+def create_cookie_jar(cookies=None):
+    """
+    Creates an aiohttp cookie jar with the cookies of the browser session.
+
+    Every cookie keeps its domain, so it is only sent to Patreon and not to the hosts it redirects to.
+
+    :param cookies: Optional list of cookie dictionaries as returned by `driver.get_cookies()`.
+    :return: aiohttp.CookieJar
+    """
+    from http.cookies import SimpleCookie
+
+    import aiohttp
+    from yarl import URL
+
+    # Also accepts cookies of IP addresses, like those of a local server
+    jar = aiohttp.CookieJar(unsafe=True)
+    for cookie in cookies or []:
+        domain = (cookie.get("domain") or "").lstrip(".")
+        if not domain:
+            continue
+        morsel = SimpleCookie()
+        morsel[cookie["name"]] = cookie["value"]
+        morsel[cookie["name"]]["domain"] = cookie["domain"]
+        morsel[cookie["name"]]["path"] = cookie.get("path", "/")
+        jar.update_cookies(morsel, response_url=URL(f"https://{domain}/"))
+    return jar
+
+
+async def download_post_attachments(posts, output_folder: Path, journal=None, quota=None, cookies=None):
+    """
+    Download the attachments, audio and video files of posts and updates their attachment attributes.
+
+    Files are placed in `attachments/{YEAR}/{MONTH}/` and recorded with their kind, size and SHA-256 checksum in
+    the post's 'attachment_meta'. Files larger than `Config.MAX_ATTACHMENT_BYTES` are skipped.
+
+    :param posts: A list of post dictionaries with a 'date' and 'attachments' attribute.
+    :param output_folder: Path to the output folder of the specific artist.
+    :param journal: Optional `ScrapeJournal` to record finished downloads in and to skip the ones already done.
+    :param quota: Optional `ArtistQuota` the downloads are charged to, files that do not fit are deferred.
+    :param cookies: Optional list of browser cookie dictionaries, attachments are only served to patrons.
+    :return: The list of posts with updated 'attachments' attributes.
+    """
+    import asyncio
+    import aiohttp
+
+    jobs = []
+
+    async with aiohttp.ClientSession(cookie_jar=create_cookie_jar(cookies)) as session:
+        async def fetch(attachment, folder_path):
+            if journal is not None and attachment["url"] in journal.downloads:
+                return output_folder / journal.downloads[attachment["url"]]
+            if quota is not None and quota.exhausted():
+                quota.defer(attachment["url"])
+                return None
+            file_path = await download_file(session, attachment["url"], folder_path, Config.MAX_ATTACHMENT_BYTES,
+                                            quota)
+            if file_path is not None and journal is not None:
+                journal.record_download(attachment["url"], str(file_path.relative_to(output_folder)))
+            return file_path
+
+        for _, post in prioritize(posts):
+            post_date = datetime.strptime(post["date"], "%Y-%m-%d")
+            folder_path = output_folder / "attachments" / str(post_date.year) / f"{post_date.month:02d}"
+            for attachment in post.get("attachments", []):
+                jobs.append((post, attachment, fetch(attachment, folder_path)))
+
+        if quota is not None:
+            quota.prioritize([
+                attachment["url"] for _, attachment, _ in jobs
+                if journal is None or attachment["url"] not in journal.downloads
+            ])
+        try:
+            downloaded_paths = await asyncio.gather(*(job for _, _, job in jobs))
+        finally:
+            if quota is not None:
+                quota.prioritize(None)
+
+    deferred = {}
+    for post in posts:
+        if "attachments" in post:
+            post["attachments"] = []
+        deferred[id(post)] = []
+
+    for (post, attachment, _), file_path in zip(jobs, downloaded_paths):
+        if file_path is None:
+            if quota is not None and attachment["url"] in quota.deferred:
+                deferred[id(post)].append(attachment)
+            continue
+        relative_path = str(Path(file_path).relative_to(output_folder))
+        post["attachments"].append(relative_path)
+        post.setdefault("attachment_meta", {})[relative_path] = {
+            "kind": attachment["kind"],
+            "name": attachment.get("name") or Path(file_path).name,
+            "bytes": Path(file_path).stat().st_size,
+            "sha256": await asyncio.to_thread(file_sha256, file_path),
+        }
+
+    for post in posts:
+        _set_deferred(post, deferred[id(post)], images=False)
 
     return posts
 
 
 def save_posts_to_file(posts, output_folder: Path):
     """
-    Save posts to a JSON file for the given artist by appending new data to existing data.
+    Save posts to a JSON file for the given artist by appending new posts and updating edited ones in place.
+
+    A stored post is replaced if its 'content_hash' differs from the scraped one or it has deferred media or is
+    marked 'incomplete'. With `Config.KEEP_REVISIONS` the version replaced by an edit is kept in the 'revisions'
+    list of the post. The file is not written at all if nothing changed.
 
     :param posts: List of post dictionaries.
     :param output_folder: Path to the output folder of the specific artist.
     """
-    posts_file = output_folder / "posts.json"
+    posts_file = output_folder / POSTS_FILE_NAME
 
     existing_posts = []
 
@@ -138,12 +466,58 @@ def save_posts_to_file(posts, output_folder: Path):
             except json.JSONDecodeError:
                 print(f"Warning: Could not decode JSON from {posts_file}, starting fresh.")
 
-    # Append only new posts (based on unique ID)
-    existing_post_ids = {post["id"] for post in existing_posts}
-    new_posts = [post for post in posts if post["id"] not in existing_post_ids]
-    updated_posts = existing_posts + new_posts
+    positions = {post["id"]: index for index, post in enumerate(existing_posts)}
+    new_posts = []
+    changed_posts = []
+    for post in posts:
+        index = positions.get(post["id"])
+        if index is None:
+            positions[post["id"]] = len(existing_posts)
+            existing_posts.append(post)
+            new_posts.append(post)
+        elif ("content_hash" not in existing_posts[index] and post.get("content_hash")
+              and matches_legacy_post(existing_posts[index], post)):
+            # Stored before content hashes existed and not edited since, only the hash is added
+            existing_posts[index]["content_hash"] = post["content_hash"]
+            changed_posts.append(existing_posts[index])
+        elif post.get("content_hash") and post["content_hash"] != existing_posts[index].get("content_hash"):
+            existing_posts[index] = _revise(existing_posts[index], post)
+            changed_posts.append(post)
+        elif ((existing_posts[index].get("deferred_media") or existing_posts[index].get("incomplete"))
+              and post.get("content_hash")):
+            # Same content, but media that was deferred by the download quota or hidden by the card may have arrived
+            existing_posts[index] = _complete(existing_posts[index], post)
+            changed_posts.append(existing_posts[index])
+
+    if not new_posts and not changed_posts:
+        print(f"No new or changed posts for {posts_file}")
+        return
+
+    write_posts(posts_file, existing_posts)
+    print(f"Appended {len(new_posts)} new posts and updated {len(changed_posts)} posts in {posts_file}")
+
+    if metrics.enabled():
+        metrics.increment("store_writes_total", artist=output_folder.name)
+        metrics.increment("store_write_bytes_total", posts_file.stat().st_size, artist=output_folder.name)
+
+    if Config.SEARCH_INDEX:
+        open_search_index(Config.SEARCH_INDEX_PATH, Config.OUTPUT_FOLDER).index_posts(
+            output_folder.name, new_posts + changed_posts
+        )
+
+
+def _complete(stored_post, post):
+    # Keeps what only the stored record has, e.g. its revisions, and drops the markers the new version resolved
+    completed = {**stored_post, **post}
+    for key in ("deferred_media", "incomplete"):
+        if key not in post:
+            completed.pop(key, None)
+    return completed
+
 
-    # Save the updated list of posts
-    with open(posts_file, "w") as file:
-        json.dump(updated_posts, file, indent=4)
-    print(f"Appended {len(new_posts)} new posts to {posts_file}")
+def _revise(old_post, new_post):
+    if Config.KEEP_REVISIONS:
+        revisions = old_post.pop("revisions", [])
+        old_post["replaced_at"] = datetime.now().isoformat(timespec="seconds")
+        new_post["revisions"] = revisions + [old_post]
+    return new_post
@@ -0,0 +1,84 @@
+import asyncio
+import json
+import tempfile
+import unittest
+import urllib.request
+from pathlib import Path
+
+from bench.replay import CassetteServer, replay_storage
+from bench.run_benchmarks import _stage_posts
+from bench.standin import FeedSettings, PatreonStandIn
+from src import cassette
+from src.config import Config
+from src.utils import download_post_images
+
+
+class TestCassette(unittest.TestCase):
+    def setUp(self):
+        """Record the download stage of a stand-in feed into a cassette."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.work_dir = Path(self.tmp_dir.name)
+        self.cassette_path = self.work_dir / "artist.cassette.zip"
+        self.settings = Config.OUTPUT_FOLDER, Config.SEARCH_INDEX_PATH, Config.DEBUG
+
+        settings = FeedSettings(posts=4, page_size=2, images_per_post=2, image_bytes=2000)
+        with PatreonStandIn(settings) as standin:
+            self.standin_url = standin.base_url
+            self.posts = _stage_posts(settings, standin.base_url)
+            cassette.start_recording(self.cassette_path, {"display_name": "Artist", "url_name": "artist"})
+            try:
+                for page in range(2):
+                    cassette.record_page(page, [standin.render_cards(page)])
+                    batch = self.posts[page * 2:page * 2 + 2]
+                    cassette.record_posts(batch)
+                    asyncio.run(download_post_images(batch, self.work_dir / "recorded"))
+            finally:
+                cassette.stop_recording()
+            self.image = standin.image_payload
+
+    def tearDown(self):
+        Config.OUTPUT_FOLDER, Config.SEARCH_INDEX_PATH, Config.DEBUG = self.settings
+        self.tmp_dir.cleanup()
+
+    def test_record(self):
+        """Test that pages, batches and images are stored with an index."""
+        self.assertFalse(cassette.recording())
+        with cassette.Cassette(self.cassette_path) as recorded:
+            self.assertEqual([page["page"] for page in recorded.pages], [0, 1])
+            self.assertEqual([len(batch) for batch in recorded.batches], [2, 2])
+            self.assertEqual(len(recorded.media), 8)
+            entry = recorded.media[recorded.batches[0][0]["images"][0]]
+            self.assertEqual(recorded.read(entry["file"]), self.image)
+
+    def test_replay(self):
+        """Test that the replay serves the pages and images without the original server."""
+        with cassette.Cassette(self.cassette_path) as recorded, CassetteServer(recorded) as server:
+            with urllib.request.urlopen(server.feed_url()) as response:
+                page = response.read().decode()
+            self.assertIn("Load more", page)
+            self.assertNotIn(self.standin_url, page)
+            self.assertIn(f"{server.base_url}/media/", page)
+
+            result = replay_storage(server.batches(), self.work_dir / "replay")
+            self.assertEqual(server.requests["media"], 8)
+
+        self.assertEqual((result["posts"], result["images"]), (4, 8))
+        with open(self.work_dir / "replay" / "benchartist" / "posts.json") as file:
+            self.assertEqual(len(json.load(file)), 4)
+
+    def test_unrecorded_media(self):
+        """Test that URLs without recorded media are answered locally instead of reaching the network."""
+        with cassette.Cassette(self.cassette_path) as recorded:
+            del recorded.media[recorded.batches[0][0]["images"][0]]
+            with CassetteServer(recorded) as server:
+                with urllib.request.urlopen(server.feed_url()) as response:
+                    page = response.read().decode()
+                self.assertNotIn(self.standin_url, page)
+                self.assertIn(f"{server.base_url}/missing/", page)
+
+                replay_storage(server.batches(), self.work_dir / "replay")
+                self.assertEqual((server.requests["media"], server.requests["missing"]), (7, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
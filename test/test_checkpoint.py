@@ -0,0 +1,59 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.checkpoint import ScrapeJournal
+
+
+class TestScrapeJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.artist_folder = Path(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_resume(self):
+        """Test that an interrupted journal restores pages, pending posts and finished downloads."""
+        journal = ScrapeJournal(self.artist_folder)
+        self.assertFalse(journal.resumed)
+
+        journal.record_posts([{"id": 1, "images": ["https://cdn/a.png"]}, {"id": 2, "images": ["https://cdn/b.png"]}])
+        journal.record_download("https://cdn/a.png", "images/2024/01/a.png")
+        journal.record_saved([1])
+        journal.record_seen([5, 6])
+        journal.record_page(3)
+        journal.close()
+
+        # Simulate a crash while writing the next record
+        with open(self.artist_folder / ".journal.jsonl", "a") as file:
+            file.write('{"type": "post", "po')
+
+        journal = ScrapeJournal(self.artist_folder)
+        self.assertTrue(journal.resumed)
+        self.assertEqual(journal.pages, 3)
+        self.assertEqual(journal.seen_post_ids, {1, 2, 5, 6})
+        self.assertEqual(journal.pending_posts(), [{"id": 2, "images": ["https://cdn/b.png"]}])
+        self.assertEqual(journal.downloads, {"https://cdn/a.png": "images/2024/01/a.png"})
+
+        journal.record_saved([2])
+        journal.close()
+
+        journal = ScrapeJournal(self.artist_folder)
+        self.assertEqual(journal.pending_posts(), [])
+        journal.close()
+
+    def test_complete(self):
+        """Test that a completed journal is removed."""
+        journal = ScrapeJournal(self.artist_folder)
+        journal.record_page(1)
+        journal.complete()
+
+        self.assertFalse((self.artist_folder / ".journal.jsonl").exists())
+        journal = ScrapeJournal(self.artist_folder)
+        self.assertFalse(journal.resumed)
+        journal.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
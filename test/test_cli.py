@@ -0,0 +1,37 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from bench.import_time import OFFLINE_COMMANDS, measure_command
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+class TestCli(unittest.TestCase):
+    def test_offline_imports(self):
+        """Test that the offline commands import none of the scraping dependencies."""
+        for command in OFFLINE_COMMANDS:
+            with self.subTest(command=command):
+                self.assertEqual(measure_command(command, runs=1)["heavy_modules"], [])
+
+    def test_stats_command(self):
+        """Test that the arguments after the command are passed on."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            artists_file = Path(tmp_dir) / "artists.json"
+            artists_file.write_text(json.dumps([{"display_name": "Artist", "url_name": "artist"}]))
+            (Path(tmp_dir) / "artist").mkdir()
+            (Path(tmp_dir) / "artist" / "posts.json").write_text(json.dumps([{"id": 1, "date": "2024-01-01"}]))
+
+            env = dict(os.environ, OUTPUT_FOLDER=tmp_dir, ARTIST_FILE_PATH=str(artists_file))
+            output = subprocess.run([sys.executable, "-m", "src", "stats", "--json", "--no-cache"], env=env,
+                                    cwd=PROJECT_ROOT, check=True, capture_output=True, text=True).stdout
+
+        self.assertEqual(json.loads(output)["total"]["posts"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
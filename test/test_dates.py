@@ -1,7 +1,7 @@
 import unittest
 from datetime import datetime, timedelta
 
-from src.date_utils import parse_date
+from src.date_utils import parse_date, parse_date_bound
 
 
 class TestParsePostDate(unittest.TestCase):
@@ -85,6 +85,15 @@ class TestParsePostDate(unittest.TestCase):
         result = parse_date(raw_date)
         self.assertIsNone(result, f"Expected None for invalid leap year date: {raw_date}")
 
+    def test_date_bounds(self):
+        """Test parsing the bounds of a date range."""
+        self.assertEqual(parse_date_bound("2024-03-01"), "2024-03-01")
+        self.assertEqual(parse_date_bound("2023"), "2023-01-01")
+        self.assertEqual(parse_date_bound("2023", end=True), "2023-12-31")
+        self.assertEqual(parse_date_bound("90d", today=datetime(2024, 6, 30)), "2024-04-01")
+        self.assertIsNone(parse_date_bound(None))
+        self.assertRaises(ValueError, parse_date_bound, "last year")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,118 @@
+import hashlib
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.config import Config
+from src.utils import download_file, download_post_attachments
+
+
+class TestDownloads(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        """Serve a large file with Range support and the same file without it."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.output_folder = Path(self.tmp_dir.name)
+        self.data = os.urandom(300_000)
+        self.range_requests = 0
+
+        source = self.output_folder / "source.bin"
+        source.write_bytes(self.data)
+
+        async def ranged(request):
+            if "Range" in request.headers:
+                self.range_requests += 1
+            return web.FileResponse(source)
+
+        async def plain(request):
+            return web.Response(body=self.data, headers={"Content-Disposition": 'attachment; filename="plain.zip"'})
+
+        async def protected(request):
+            if request.cookies.get("session_id") != "secret":
+                return web.Response(text="<html>Log in</html>", content_type="text/html")
+            return web.Response(body=self.data, headers={"Content-Disposition": 'attachment; filename="paid.zip"'})
+
+        async def broken(request):
+            response = web.StreamResponse(headers={"Content-Length": str(len(self.data))})
+            await response.prepare(request)
+            await response.write(self.data[:1000])
+            request.transport.close()
+            return response
+
+        app = web.Application()
+        app.router.add_get("/files/archive.zip", ranged)
+        app.router.add_get("/plain", plain)
+        app.router.add_get("/protected", protected)
+        app.router.add_get("/broken.zip", broken)
+        self.server = TestServer(app)
+        await self.server.start_server()
+
+        self.threshold, self.segments = Config.SEGMENT_THRESHOLD_BYTES, Config.DOWNLOAD_SEGMENTS
+        Config.SEGMENT_THRESHOLD_BYTES, Config.DOWNLOAD_SEGMENTS = 100_000, 4
+
+    async def asyncTearDown(self):
+        Config.SEGMENT_THRESHOLD_BYTES, Config.DOWNLOAD_SEGMENTS = self.threshold, self.segments
+        await self.server.close()
+        self.tmp_dir.cleanup()
+
+    async def test_segmented_download(self):
+        """Test that large files are reassembled correctly from parallel range requests."""
+        async with aiohttp.ClientSession() as session:
+            file_path = await download_file(session, str(self.server.make_url("/files/archive.zip")),
+                                            self.output_folder / "out")
+
+        self.assertEqual(file_path.read_bytes(), self.data)
+        self.assertEqual(self.range_requests, 4)
+        self.assertFalse(file_path.with_name("archive.zip.part").exists())
+
+    async def test_size_limit(self):
+        """Test that files above the size limit are skipped."""
+        async with aiohttp.ClientSession() as session:
+            file_path = await download_file(session, str(self.server.make_url("/plain")), self.output_folder / "out",
+                                            max_bytes=1000)
+        self.assertIsNone(file_path)
+        self.assertEqual(list((self.output_folder / "out").iterdir()), [])
+
+    async def test_post_attachments(self):
+        """Test that attachments are stored with their kind, size and checksum."""
+        posts = [{"id": 1, "date": "2024-02-03", "attachments": [
+            {"url": str(self.server.make_url("/plain")), "kind": "attachment", "name": "Source files"},
+        ]}]
+        await download_post_attachments(posts, self.output_folder)
+
+        self.assertEqual(posts[0]["attachments"], [str(Path("attachments/2024/02/plain.zip"))])
+        meta = posts[0]["attachment_meta"][posts[0]["attachments"][0]]
+        self.assertEqual(meta["kind"], "attachment")
+        self.assertEqual(meta["name"], "Source files")
+        self.assertEqual(meta["bytes"], len(self.data))
+        self.assertEqual(meta["sha256"], hashlib.sha256(self.data).hexdigest())
+
+    async def test_session_cookies(self):
+        """Test that attachments are downloaded with the browser cookies and login pages are rejected."""
+        url = str(self.server.make_url("/protected"))
+        posts = [{"id": 1, "date": "2024-02-03", "attachments": [{"url": url, "kind": "attachment"}]}]
+        await download_post_attachments(posts, self.output_folder)
+        self.assertEqual(posts[0]["attachments"], [])
+        self.assertEqual(list((self.output_folder / "attachments").rglob("*.*")), [])
+
+        posts[0]["attachments"] = [{"url": url, "kind": "attachment"}]
+        cookies = [{"name": "session_id", "value": "secret", "domain": self.server.host, "path": "/"},
+                   {"name": "other", "value": "leaked", "domain": ".example.com", "path": "/"}]
+        await download_post_attachments(posts, self.output_folder, cookies=cookies)
+        self.assertEqual(posts[0]["attachments"], [str(Path("attachments/2024/02/paid.zip"))])
+
+    async def test_interrupted_download(self):
+        """Test that the partial file of a failed download is removed."""
+        async with aiohttp.ClientSession() as session:
+            file_path = await download_file(session, str(self.server.make_url("/broken.zip")),
+                                            self.output_folder / "out")
+        self.assertIsNone(file_path)
+        self.assertEqual(list((self.output_folder / "out").iterdir()), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import date
+from pathlib import Path
+
+try:
+    import pyarrow.compute as pc
+except ImportError:
+    pc = None
+
+from src.export import export_archive, open_dataset
+
+
+@unittest.skipIf(pc is None, "pyarrow is not installed")
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        """Create a temporary output folder with two artists."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.output_folder = Path(self.tmp_dir.name)
+        self.export_folder = self.output_folder / "parquet"
+
+        self.posts = [
+            {"id": 1, "title": "First", "date": "2023-05-01", "content": "", "images": ["images/2023/05/a.png"],
+             "tags": ["sketch"], "url": "https://www.patreon.com/posts/first-1",
+             "image_meta": {"images/2023/05/a.png": {"valid": True, "bytes": 100, "width": 4, "height": 3,
+                                                     "format": "PNG", "dhash": "00ff"}}},
+            {"id": 2, "title": "Second", "date": "2024-01-15", "content": "Text", "images": [],
+             "tags": ["sketch", "color"], "url": "https://www.patreon.com/posts/second-2"},
+        ]
+        self._write_artist("alpha", self.posts)
+        self._write_artist("beta", self.posts[:1])
+        self.artists = [{"url_name": "alpha"}, {"url_name": "beta"}, {"url_name": "gamma"}]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _write_artist(self, url_name, posts):
+        artist_folder = self.output_folder / url_name
+        artist_folder.mkdir(parents=True, exist_ok=True)
+        with open(artist_folder / "posts.json", "w") as file:
+            json.dump(posts, file, indent=4)
+
+    def test_export(self):
+        """Test the partitions and column types of the dataset."""
+        result = export_archive(self.artists, self.output_folder, self.export_folder)
+        self.assertEqual(result, {"exported": ["alpha", "beta"], "unchanged": [], "removed": [], "posts": 3})
+        self.assertTrue((self.export_folder / "artist=alpha" / "year=2024" / "part-0.parquet").exists())
+
+        table = open_dataset(self.export_folder).to_table(
+            columns=["id", "date", "tags", "image_meta", "artist"],
+            filter=(pc.field("artist") == "alpha") & (pc.field("year") == 2023),
+        )
+        self.assertEqual(table.to_pylist(), [{
+            "id": 1, "date": date(2023, 5, 1), "tags": ["sketch"], "artist": "alpha",
+            "image_meta": [{"path": "images/2023/05/a.png", "valid": True, "bytes": 100, "width": 4, "height": 3,
+                            "format": "PNG", "dhash": "00ff"}],
+        }])
+
+    def test_incremental(self):
+        """Test that only artists with a changed posts.json are rewritten."""
+        export_archive(self.artists, self.output_folder, self.export_folder)
+        self.assertEqual(export_archive(self.artists, self.output_folder, self.export_folder)["exported"], [])
+
+        self._write_artist("beta", self.posts[1:])
+        result = export_archive(self.artists, self.output_folder, self.export_folder)
+        self.assertEqual(result["exported"], ["beta"])
+        self.assertEqual(result["unchanged"], ["alpha"])
+
+        # The old year of the artist is gone
+        table = open_dataset(self.export_folder).to_table(filter=pc.field("artist") == "beta")
+        self.assertEqual(table.column("year").to_pylist(), [2024])
+
+    def test_interrupted_swap(self):
+        """Test that an export interrupted between moving the old data aside and the new data in is recovered."""
+        export_archive(self.artists, self.output_folder, self.export_folder)
+        os.replace(self.export_folder / "artist=beta", self.export_folder / "_old_artist=beta")
+
+        # The next export restores the previous data before it fails on a broken posts.json
+        (self.output_folder / "beta" / "posts.json").write_text('[{"id": 1, "da')
+        with self.assertRaises(ValueError):
+            export_archive(self.artists, self.output_folder, self.export_folder)
+        self.assertTrue((self.export_folder / "artist=beta" / "year=2023" / "part-0.parquet").exists())
+
+        self._write_artist("beta", self.posts)
+        export_archive(self.artists, self.output_folder, self.export_folder)
+        self.assertEqual(sorted(path.name for path in self.export_folder.iterdir()),
+                         ["_manifest.json", "artist=alpha", "artist=beta"])
+
+    def test_prune(self):
+        """Test that artists removed from the artist list are only removed from the dataset when pruning."""
+        export_archive(self.artists, self.output_folder, self.export_folder)
+
+        self.assertEqual(export_archive(self.artists[1:], self.output_folder, self.export_folder)["removed"], [])
+        self.assertTrue((self.export_folder / "artist=alpha").exists())
+
+        result = export_archive(self.artists[1:], self.output_folder, self.export_folder, prune=True)
+        self.assertEqual((result["unchanged"], result["removed"]), (["beta"], ["alpha"]))
+        self.assertFalse((self.export_folder / "artist=alpha").exists())
+        self.assertEqual(open_dataset(self.export_folder).to_table().column("artist").unique().to_pylist(), ["beta"])
+        with open(self.export_folder / "_manifest.json") as file:
+            self.assertEqual(list(json.load(file)), ["beta"])
+
+
+if __name__ == "__main__":
+    unittest.main()
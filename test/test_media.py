@@ -0,0 +1,67 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from PIL import Image
+
+from src.media import MediaProcessor, hash_distance, inspect_image, thumbnail_path_for
+
+
+class TestMedia(unittest.TestCase):
+    def setUp(self):
+        """Create an artist folder with a valid, a truncated and a fake image."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.artist_folder = Path(self.tmp_dir.name)
+        images_folder = self.artist_folder / "images" / "2024" / "01"
+        images_folder.mkdir(parents=True)
+
+        image = Image.linear_gradient("L").resize((320, 200)).convert("RGB")
+        image.save(images_folder / "valid.png")
+        image.resize((160, 100)).save(images_folder / "resized.jpg", quality=90)
+
+        data = (images_folder / "valid.png").read_bytes()
+        (images_folder / "truncated.png").write_bytes(data[:len(data) // 2])
+        (images_folder / "error.png").write_text("<html><body>403 Forbidden</body></html>")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_inspect_image(self):
+        """Test the metadata of valid and broken images."""
+        folder = self.artist_folder / "images" / "2024" / "01"
+
+        meta = inspect_image(str(folder / "valid.png"))
+        self.assertTrue(meta["valid"])
+        self.assertEqual((meta["width"], meta["height"], meta["format"]), (320, 200, "PNG"))
+        self.assertEqual(meta["bytes"], (folder / "valid.png").stat().st_size)
+
+        self.assertFalse(inspect_image(str(folder / "truncated.png"))["valid"])
+        self.assertFalse(inspect_image(str(folder / "error.png"))["valid"])
+
+    def test_near_duplicate_hash(self):
+        """Test that a resized copy has a similar perceptual hash."""
+        folder = self.artist_folder / "images" / "2024" / "01"
+        original = inspect_image(str(folder / "valid.png"))["dhash"]
+        resized = inspect_image(str(folder / "resized.jpg"))["dhash"]
+        self.assertLessEqual(hash_distance(original, resized), 4)
+
+    def test_thumbnail_path(self):
+        """Test that thumbnails mirror the images folder."""
+        self.assertEqual(thumbnail_path_for(Path("images/2024/01/a.png")), Path("thumbnails/2024/01/a.png.jpg"))
+        self.assertIsNone(thumbnail_path_for(Path("other/a.png")))
+
+    def test_processor(self):
+        """Test that the processor stores metadata per image and writes thumbnails."""
+        posts = [{"id": 1, "images": ["images/2024/01/valid.png", "images/2024/01/error.png"]}]
+
+        with MediaProcessor(workers=1) as processor:
+            processor.collect(processor.submit(posts, self.artist_folder))
+
+        meta = posts[0]["image_meta"]
+        self.assertTrue(meta["images/2024/01/valid.png"]["valid"])
+        self.assertFalse(meta["images/2024/01/error.png"]["valid"])
+        self.assertTrue((self.artist_folder / meta["images/2024/01/valid.png"]["thumbnail"]).exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from src import metrics
+from src.scraper import report_memory
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.trace_path = Path(self.tmp_dir.name) / "trace.jsonl"
+        self.prometheus_path = Path(self.tmp_dir.name) / "metrics.prom"
+
+    def tearDown(self):
+        metrics.configure()
+        metrics.recorder().counters.clear()
+        metrics.recorder().timings.clear()
+        self.tmp_dir.cleanup()
+
+    def test_disabled(self):
+        """Test that nothing is recorded while metrics are disabled."""
+        metrics.configure()
+        with metrics.span("click_load_more"):
+            metrics.increment("downloaded_bytes_total", 10)
+
+        self.assertFalse(metrics.enabled())
+        self.assertEqual(metrics.recorder().counters, {})
+        self.assertEqual(metrics.recorder().timings, {})
+
+    def test_browser_memory(self):
+        """Test that the memory growth is measured from the first page with a known browser RSS."""
+        class Driver:
+            capabilities = {}
+
+        driver = Driver()
+        metrics.configure(self.trace_path)
+        self.assertIsNone(report_memory(driver, "alpha", 1, dom_nodes=10))
+
+        driver.capabilities = {"moz:processID": os.getpid()}
+        baseline = report_memory(driver, "alpha", 2, 10, None)
+        self.assertIsInstance(baseline, int)
+
+        driver.capabilities = {}
+        self.assertEqual(report_memory(driver, "alpha", 3, 10, baseline), baseline)
+        metrics.close()
+
+        trace = [json.loads(line) for line in self.trace_path.read_text().splitlines()]
+        self.assertEqual([event["rss_kb"] for event in trace], [None, baseline, None])
+
+    def test_outputs(self):
+        """Test the trace and Prometheus outputs."""
+        metrics.configure(self.trace_path, self.prometheus_path)
+        with metrics.span("click_load_more", artist="alpha"):
+            metrics.increment("http_responses_total", status=200)
+            metrics.increment("http_responses_total", status=200)
+            metrics.increment("http_responses_total", status=404)
+        metrics.close()
+
+        trace = [json.loads(line) for line in self.trace_path.read_text().splitlines()]
+        self.assertEqual(len(trace), 1)
+        self.assertEqual(trace[0]["span"], "click_load_more")
+        self.assertEqual(trace[0]["artist"], "alpha")
+
+        prometheus = self.prometheus_path.read_text()
+        self.assertIn('patreon_scraper_http_responses_total{status="200"} 2', prometheus)
+        self.assertIn('patreon_scraper_http_responses_total{status="404"} 1', prometheus)
+        self.assertIn('patreon_scraper_click_load_more_seconds_count{artist="alpha"} 1', prometheus)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from bench.standin import FeedSettings, PatreonStandIn
+from src.post_details import PostDetailFetcher, html_to_text, parse_post_details
+from src.config import Config
+from src.probe import create_http_session
+from src.utils import save_posts_to_file
+
+
+class TestPostDetails(unittest.TestCase):
+    def setUp(self):
+        """Start a stand-in feed whose cards show at most two images."""
+        self.standin = PatreonStandIn(FeedSettings(posts=5, images_per_post=5, grid_limit=2)).start()
+        self.url_template = f"{self.standin.base_url}/api/posts/{{post_id}}"
+
+    def tearDown(self):
+        self.standin.stop()
+
+    def _card(self, post):
+        return {"id": post["id"], "content": post["paragraphs"][0][:80], "attachments": [], "incomplete": True,
+                "images": [self.standin.image_url(post["id"], i) for i in range(2)]}
+
+    def test_html_to_text(self):
+        """Test that paragraphs and line breaks become lines."""
+        self.assertEqual(html_to_text("<p>First &amp; <b>bold</b></p><p>Second<br>line</p><p> </p>"),
+                         "First & bold\nSecond\nline")
+
+    def test_parse_post_details(self):
+        """Test that the images and attachments are read in order from the included media."""
+        payload = {
+            "data": {"id": "1", "type": "post", "attributes": {"content": "<p>Text</p>"},
+                     "relationships": {"images": {"data": [{"id": "b", "type": "media"}, {"id": "a", "type": "media"}]},
+                                       "attachments_media": {"data": [{"id": "c", "type": "media"}]},
+                                       "audio": {"data": None}}},
+            "included": [
+                {"id": "a", "type": "media", "attributes": {"image_urls": {"original": "https://cdn/a.png"}}},
+                {"id": "b", "type": "media", "attributes": {"download_url": "https://cdn/b.png"}},
+                {"id": "c", "type": "media", "attributes": {"download_url": "https://cdn/c.zip", "file_name": "c.zip"}},
+            ],
+        }
+        details = parse_post_details(payload)
+        self.assertEqual(details["content"], "Text")
+        self.assertEqual(details["images"], ["https://cdn/b.png", "https://cdn/a.png"])
+        self.assertEqual(details["attachments"], [{"url": "https://cdn/c.zip", "kind": "attachment", "name": "c.zip"}])
+
+    def test_fetcher(self):
+        """Test that incomplete cards are completed with all images and the full text."""
+        posts = [self._card(post) for post in self.standin.posts[:3]]
+        missing = {"id": 1, "content": "Kept", "images": ["card.png"], "attachments": [], "incomplete": True}
+
+        with PostDetailFetcher(create_http_session(), workers=2, url_template=self.url_template) as fetcher:
+            for post in posts + [missing]:
+                fetcher.submit(post)
+            merged = fetcher.merge(posts + [missing])
+
+        self.assertEqual(self.standin.requests["details"], 4)
+        for post, raw in zip(merged[:3], self.standin.posts):
+            self.assertEqual(post["images"], [self.standin.image_url(raw["id"], i) for i in range(5)])
+            self.assertEqual(post["content"], "\n".join(raw["paragraphs"]))
+            self.assertNotIn("incomplete", post)
+        # The post is unknown to the API, its card data is kept and it stays marked for the next run
+        self.assertEqual(merged[-1], {"id": 1, "content": "Kept", "images": ["card.png"], "attachments": [],
+                                      "incomplete": True})
+
+    def test_malformed_response(self):
+        """Test that a malformed response only fails its own post."""
+        post = {"id": self.standin.posts[0]["id"], "content": "", "images": [], "attachments": [], "incomplete": True}
+        with PostDetailFetcher(create_http_session(), url_template=self.url_template) as fetcher:
+            fetcher._fetch = lambda post_id: parse_post_details({"data": None})
+            fetcher.submit(post)
+            self.assertEqual(fetcher.merge([post]), [post])
+        self.assertTrue(post["incomplete"])
+
+    def test_incomplete_posts_are_replaced(self):
+        """Test that a post stored with only its card data is replaced once its details arrive."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            settings = Config.SEARCH_INDEX
+            Config.SEARCH_INDEX = False
+            try:
+                artist_folder = Path(tmp_dir)
+                save_posts_to_file([{"id": 1, "content_hash": "a", "images": ["a.png"], "incomplete": True}],
+                                   artist_folder)
+                save_posts_to_file([{"id": 1, "content_hash": "a", "images": ["a.png", "b.png"]}], artist_folder)
+            finally:
+                Config.SEARCH_INDEX = settings
+            with open(artist_folder / "posts.json") as file:
+                self.assertEqual(json.load(file), [{"id": 1, "content_hash": "a", "images": ["a.png", "b.png"]}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import asyncio
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.config import Config
+from src.post_store import add_content_hashes, content_hash, load_post_index, matches_legacy_post
+from src.utils import download_post_images, save_posts_to_file
+
+
+def make_post(post_id, title, images=()):
+    post = {"id": post_id, "title": title, "date": "2024-01-05", "content": "", "tags": [],
+            "images": [f"http://127.0.0.1:9/img/{image}?token-time={post_id}" for image in images]}
+    post["content_hash"] = content_hash(post)
+    return post
+
+
+class TestPostUpdates(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.output_folder = Path(self.tmp_dir.name)
+        self.posts_file = self.output_folder / "posts.json"
+        self.settings = Config.SEARCH_INDEX, Config.KEEP_REVISIONS
+        Config.SEARCH_INDEX, Config.KEEP_REVISIONS = False, True
+
+    def tearDown(self):
+        Config.SEARCH_INDEX, Config.KEEP_REVISIONS = self.settings
+        self.tmp_dir.cleanup()
+
+    def _load(self):
+        with open(self.posts_file) as file:
+            return json.load(file)
+
+    def test_content_hash(self):
+        """Test that the hash ignores the signature in image URLs but not edits."""
+        self.assertEqual(make_post(1, "A", ["a.png"])["content_hash"], make_post(2, "A", ["a.png"])["content_hash"])
+        self.assertNotEqual(make_post(1, "A")["content_hash"], make_post(1, "B")["content_hash"])
+        self.assertNotEqual(make_post(1, "A")["content_hash"], make_post(1, "A", ["a.png"])["content_hash"])
+
+    def test_update_in_place(self):
+        """Test that edited posts replace the stored version and unchanged ones cause no write."""
+        save_posts_to_file([make_post(1, "First"), make_post(2, "Second")], self.output_folder)
+        signature = self.posts_file.stat().st_mtime_ns
+
+        save_posts_to_file([make_post(1, "First")], self.output_folder)
+        self.assertEqual(self.posts_file.stat().st_mtime_ns, signature)
+
+        save_posts_to_file([make_post(1, "First (edited)"), make_post(3, "Third")], self.output_folder)
+        posts = self._load()
+        self.assertEqual([post["title"] for post in posts], ["First (edited)", "Second", "Third"])
+        self.assertEqual([revision["title"] for revision in posts[0]["revisions"]], ["First"])
+
+    def test_legacy_posts(self):
+        """Test that posts stored without a content hash only get the hash if they were not edited."""
+        legacy = [dict(make_post(1, "First", ["a.png"]), images=["images/2024/01/a.png_token-time=1"]),
+                  dict(make_post(2, "Second"))]
+        for post in legacy:
+            del post["content_hash"]
+        with open(self.posts_file, "w") as file:
+            json.dump(legacy, file)
+
+        stored = load_post_index(self.posts_file)
+        self.assertTrue(matches_legacy_post(stored[1], make_post(1, "First", ["a.png"])))
+        self.assertFalse(matches_legacy_post(stored[1], make_post(1, "First", ["a.png", "b.png"])))
+
+        add_content_hashes(self.posts_file, {1: make_post(1, "First", ["a.png"])["content_hash"]})
+        save_posts_to_file([make_post(2, "Second"), make_post(3, "Third")], self.output_folder)
+        posts = self._load()
+        self.assertEqual(posts[0]["content_hash"], make_post(1, "First", ["a.png"])["content_hash"])
+        self.assertEqual(posts[0]["images"], ["images/2024/01/a.png_token-time=1"])
+        self.assertEqual(posts[1]["content_hash"], make_post(2, "Second")["content_hash"])
+        self.assertFalse(any("revisions" in post for post in posts))
+
+    def test_reuse_source_images(self):
+        """Test that images of the stored version are not downloaded again."""
+        image = self.output_folder / "images" / "2024" / "01" / "a.png"
+        image.parent.mkdir(parents=True)
+        image.write_bytes(b"png")
+
+        post = make_post(1, "Edited", ["a.png"])
+        post["source_images"] = {"/img/a.png": "images/2024/01/a.png"}
+        post["image_meta"] = {"images/2024/01/a.png": {"valid": True}, "images/2024/01/old.png": {"valid": True}}
+        asyncio.run(download_post_images([post], self.output_folder))
+
+        self.assertEqual(post["images"], [str(Path("images/2024/01/a.png"))])
+        self.assertEqual(post["source_images"], {"/img/a.png": str(Path("images/2024/01/a.png"))})
+        self.assertEqual(list(post["image_meta"]), ["images/2024/01/a.png"])
+
+
+if __name__ == "__main__":
+    unittest.main()
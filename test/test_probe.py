@@ -0,0 +1,92 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from bench.standin import FeedSettings, PatreonStandIn
+from src.probe import FreshnessProbe, create_http_session, save_session_cookies
+
+
+class TestFreshnessProbe(unittest.TestCase):
+    def setUp(self):
+        """Start a stand-in feed and store all but its newest post locally."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.output_folder = Path(self.tmp_dir.name)
+        self.standin = PatreonStandIn(FeedSettings(posts=5)).start()
+
+        self.artist = {"url_name": "artist", "probe_url": f"{self.standin.base_url}/api/posts"}
+        self.rss_artist = {"url_name": "artist", "probe_url": f"{self.standin.base_url}/rss/artist"}
+        self._store(self.standin.posts[1:])
+
+    def tearDown(self):
+        self.standin.stop()
+        self.tmp_dir.cleanup()
+
+    def _store(self, posts):
+        (self.output_folder / "artist").mkdir(exist_ok=True)
+        with open(self.output_folder / "artist" / "posts.json", "w") as file:
+            json.dump([{"id": post["id"], "date": "2024-12-01"} for post in posts], file)
+
+    def test_changes(self):
+        """Test that the probe reports changes until the newest post is stored."""
+        probe = FreshnessProbe(self.output_folder)
+        self.assertTrue(probe.has_changes(self.artist))
+        # The feed did not change since the last probe, but the local store still lacks its newest post
+        self.assertTrue(probe.has_changes(self.artist))
+
+        self._store(self.standin.posts)
+        self.assertFalse(probe.has_changes(self.artist))
+        self.assertFalse(FreshnessProbe(self.output_folder).has_changes(self.rss_artist))
+
+        self.standin.publish(dict(self.standin.posts[0], id=200_000))
+        self.assertTrue(probe.has_changes(self.artist))
+        self.assertTrue(probe.has_changes(self.rss_artist))
+
+    def test_conditional_requests(self):
+        """Test that unchanged feeds are answered with 304 responses."""
+        self._store(self.standin.posts)
+        FreshnessProbe(self.output_folder).has_changes(self.artist)
+
+        probe = FreshnessProbe(self.output_folder)
+        response = probe.session.get(self.artist["probe_url"],
+                                     headers={"If-None-Match": probe.state["artist"]["etag"]})
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(probe.has_changes(self.artist))
+        self.assertEqual(self.standin.requests["probe"], 3)
+
+    def test_unknown(self):
+        """Test that artists which cannot be probed are always scraped."""
+        probe = FreshnessProbe(self.output_folder)
+        self.assertTrue(probe.has_changes({"url_name": "artist"}))
+        self.assertTrue(probe.has_changes({"url_name": "artist", "probe_url": "http://127.0.0.1:9/api/posts"}))
+
+    def test_session_cookies(self):
+        """Test that persisted browser cookies are sent by the HTTP session."""
+        cookies_file = self.output_folder / ".cookies.json"
+        save_session_cookies([{"name": "session_id", "value": "abc", "domain": "127.0.0.1", "path": "/"}],
+                             cookies_file)
+        session = create_http_session(cookies_file)
+        self.assertEqual(session.cookies.get("session_id"), "abc")
+        self.assertEqual(cookies_file.stat().st_mode & 0o777, 0o600)
+
+    def test_unfinished_work(self):
+        """Test that artists with an interrupted scrape or deferred media are scraped."""
+        self._store(self.standin.posts)
+        probe = FreshnessProbe(self.output_folder)
+        self.assertFalse(probe.has_changes(self.artist))
+
+        (self.output_folder / "artist" / ".journal.jsonl").write_text("")
+        self.assertTrue(probe.has_changes(self.artist))
+        (self.output_folder / "artist" / ".journal.jsonl").unlink()
+
+        with open(self.output_folder / "artist" / "posts.json", "w") as file:
+            json.dump([{"id": post["id"], "date": "2024-12-01", "deferred_media": [{"url": "x", "kind": "image"}]}
+                       for post in self.standin.posts], file)
+        self.assertTrue(probe.has_changes(self.artist))
+
+        (self.output_folder / "artist" / "posts.json").write_text('[{"id": 1, "da')
+        self.assertTrue(probe.has_changes(self.artist))
+
+
+if __name__ == "__main__":
+    unittest.main()
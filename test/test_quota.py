@@ -0,0 +1,126 @@
+import asyncio
+import json
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.config import Config
+from src.quota import DownloadQuota, TokenBucket
+from src.scripts.download import download_deferred_media
+from src.size_utils import parse_size
+from src.utils import download_post_images, prioritize, save_posts_to_file
+
+
+class TestQuota(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        """Serve images of 1000 bytes, the ones of older posts faster."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.output_folder = Path(self.tmp_dir.name)
+        self.artist_folder = self.output_folder / "artist"
+
+        async def image(request):
+            await asyncio.sleep(0.05 * int(request.match_info["name"].split(".")[0]))
+            return web.Response(body=b"x" * 1000, content_type="image/png")
+
+        async def chunked(request):
+            response = web.StreamResponse(headers={"Content-Type": "image/png"})
+            response.enable_chunked_encoding()
+            await response.prepare(request)
+            # All downloads of the batch reserve their budget before any of them is finished
+            await asyncio.sleep(0.1)
+            await response.write(b"x" * 1000)
+            return response
+
+        app = web.Application()
+        app.router.add_get("/img/{name}", image)
+        app.router.add_get("/chunked/{name}", chunked)
+        self.server = TestServer(app)
+        await self.server.start_server()
+
+        self.settings = Config.OUTPUT_FOLDER, Config.SEARCH_INDEX
+        Config.OUTPUT_FOLDER, Config.SEARCH_INDEX = self.output_folder, False
+
+    async def asyncTearDown(self):
+        Config.OUTPUT_FOLDER, Config.SEARCH_INDEX = self.settings
+        await self.server.close()
+        self.tmp_dir.cleanup()
+
+    def _posts(self):
+        return [
+            {"id": post_id, "date": f"2024-01-0{post_id}", "images": [str(self.server.make_url(f"/img/{post_id}.png"))]}
+            for post_id in (1, 2, 3)
+        ]
+
+    def test_parse_size(self):
+        """Test size suffixes."""
+        self.assertEqual(parse_size("1048576"), 1 << 20)
+        self.assertEqual(parse_size("1.5K"), 1536)
+        self.assertEqual(parse_size("2GB"), 2 << 30)
+        self.assertIsNone(parse_size("0"))
+        with self.assertRaises(ValueError):
+            parse_size("lots")
+
+    def test_prioritize(self):
+        """Test that the newest posts are downloaded first."""
+        self.assertEqual([post["id"] for _, post in prioritize(self._posts())], [3, 2, 1])
+
+    async def test_token_bucket(self):
+        """Test that the bandwidth cap limits the throughput."""
+        bucket = TokenBucket(1000)
+        started = time.monotonic()
+        for _ in range(3):
+            await bucket.consume(500)
+        self.assertGreaterEqual(time.monotonic() - started, 0.45)
+
+    async def test_defer_and_resume(self):
+        """Test that media beyond the budget is deferred and downloaded by a later run."""
+        quota = DownloadQuota(artist_budget_bytes=2500)
+        posts = await download_post_images(self._posts(), self.artist_folder, quota=quota.for_artist("artist"))
+        save_posts_to_file(posts, self.artist_folder)
+
+        self.assertEqual(quota.used["artist"], 2000)
+        # The image of the oldest post arrives first, but the newer posts get the budget
+        self.assertEqual([post["id"] for post in posts if post["images"]], [2, 3])
+        self.assertEqual([post["id"] for post in posts if post.get("deferred_media")], [1])
+
+        # download_deferred_media starts its own event loops
+        artists = [{"url_name": "artist", "display_name": "Artist"}]
+        updated = await asyncio.to_thread(download_deferred_media, artists, DownloadQuota())
+        self.assertEqual(updated, 1)
+
+        with open(self.artist_folder / "posts.json") as file:
+            stored = json.load(file)
+        self.assertTrue(all(len(post["images"]) == 1 for post in stored))
+        self.assertFalse(any("deferred_media" in post for post in stored))
+
+    async def test_unknown_sizes(self):
+        """Test that concurrent downloads without a Content-Length cannot all pass the budget check."""
+        quota = DownloadQuota(artist_budget_bytes=1500)
+        posts = [dict(post, images=[post["images"][0].replace("/img/", "/chunked/")]) for post in self._posts()]
+        posts = await download_post_images(posts, self.artist_folder, quota=quota.for_artist("artist"))
+
+        self.assertEqual(quota.used["artist"], 1000)
+        self.assertEqual([post["id"] for post in posts if post["images"]], [3])
+
+    async def test_complete_keeps_revisions(self):
+        """Test that completing a post with deferred media keeps the rest of the stored record."""
+        stored = {"id": 1, "date": "2024-01-01", "content_hash": "a", "images": [],
+                  "deferred_media": [{"url": "x", "kind": "image"}], "revisions": [{"title": "Old"}]}
+        self.artist_folder.mkdir()
+        save_posts_to_file([stored], self.artist_folder)
+        save_posts_to_file([{"id": 1, "date": "2024-01-01", "content_hash": "a", "images": ["a.png"]}],
+                           self.artist_folder)
+
+        with open(self.artist_folder / "posts.json") as file:
+            post = json.load(file)[0]
+        self.assertEqual(post["images"], ["a.png"])
+        self.assertEqual(post["revisions"], [{"title": "Old"}])
+        self.assertNotIn("deferred_media", post)
+
+
+if __name__ == "__main__":
+    unittest.main()
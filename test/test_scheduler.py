@@ -0,0 +1,61 @@
+import json
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from src.scheduler import RefreshScheduler, estimate_interval_days
+
+
+class TestRefreshScheduler(unittest.TestCase):
+    def setUp(self):
+        """Create a daily and a yearly posting artist."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.output_folder = Path(self.tmp_dir.name)
+        self.now = datetime(2024, 6, 30, 12)
+
+        self._write_posts("daily", [self.now - timedelta(days=i) for i in range(30)])
+        self._write_posts("yearly", [self.now - timedelta(days=365 * i + 10) for i in range(4)])
+        self.artists = [{"url_name": "yearly"}, {"url_name": "daily"}]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _write_posts(self, url_name, dates):
+        (self.output_folder / url_name).mkdir()
+        posts = [{"id": i, "date": date.strftime("%Y-%m-%d")} for i, date in enumerate(dates)]
+        with open(self.output_folder / url_name / "posts.json", "w") as file:
+            json.dump(posts, file)
+
+    def test_estimate_interval(self):
+        """Test the posting interval estimate."""
+        self.assertEqual(estimate_interval_days(["2024-01-01", "2024-01-11", "2024-01-21"]), 10)
+        self.assertIsNone(estimate_interval_days(["2024-01-01"]))
+
+    def test_plan(self):
+        """Test that only artists likely to have new posts are scheduled after a first run."""
+        scheduler = RefreshScheduler(self.output_folder, freshness_sla_days=30)
+        self.assertEqual(len(scheduler.plan(self.artists, self.now)), 2)
+
+        for artist in self.artists:
+            scheduler.record_run(artist, 10, now=self.now)
+
+        tomorrow = self.now + timedelta(days=1)
+        scheduler = RefreshScheduler(self.output_folder, freshness_sla_days=30)
+        self.assertEqual(scheduler.plan(self.artists, tomorrow), [{"url_name": "daily"}])
+
+        # The freshness SLA forces a check of the yearly artist
+        later = self.now + timedelta(days=31)
+        self.assertEqual(scheduler.plan(self.artists, later)[0], {"url_name": "yearly"})
+
+    def test_budget(self):
+        """Test the artist budget of a run."""
+        scheduler = RefreshScheduler(self.output_folder, max_artists=1)
+        self.assertEqual(len(scheduler.plan(self.artists, self.now)), 1)
+        self.assertFalse(scheduler.budget_exhausted())
+        scheduler.record_run(self.artists[0], 10, now=self.now)
+        self.assertTrue(scheduler.budget_exhausted())
+
+
+if __name__ == "__main__":
+    unittest.main()
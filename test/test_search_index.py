@@ -0,0 +1,74 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.search_index import SearchIndex, build_fts_query
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        """Create an index over a small archive with two artists."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.output_folder = Path(self.tmp_dir.name)
+
+        alpha_posts = [
+            {"id": 1, "title": "Red dragon", "date": "2023-05-01", "content": "A dragon sketch.",
+             "images": ["images/2023/05/dragon.png"], "tags": ["sketch"], "url": "https://www.patreon.com/posts/1"},
+            {"id": 2, "title": "Blue wyvern", "date": "2024-01-15", "content": "Fully colored, C++ and foo-bar.",
+             "images": [], "tags": ["color", "wyvern"], "url": "https://www.patreon.com/posts/2"},
+        ]
+        beta_posts = [
+            {"id": 3, "title": "Dragon again", "date": "2024-03-01", "content": "", "images": [],
+             "tags": ["color"], "url": "https://www.patreon.com/posts/3"},
+        ]
+        for url_name, posts in (("alpha", alpha_posts), ("beta", beta_posts)):
+            (self.output_folder / url_name).mkdir()
+            with open(self.output_folder / url_name / "posts.json", "w") as file:
+                json.dump(posts, file, indent=4)
+
+        self.index = SearchIndex(self.output_folder / "search.db")
+        self.index.rebuild([{"url_name": "alpha"}, {"url_name": "beta"}])
+
+    def tearDown(self):
+        self.index.close()
+        self.tmp_dir.cleanup()
+
+    def test_full_text(self):
+        """Test matching on title and content."""
+        results = self.index.search("dragon")
+        self.assertEqual({result["id"] for result in results}, {1, 3})
+
+    def test_filters(self):
+        """Test tag, date and artist filters."""
+        self.assertEqual([r["id"] for r in self.index.search(tags=["color"])], [3, 2])
+        self.assertEqual([r["id"] for r in self.index.search("dragon", since="2024-01-01")], [3])
+        self.assertEqual([r["id"] for r in self.index.search(artist="alpha", until="2023-12-31")], [1])
+
+    def test_query_syntax(self):
+        """Test that punctuation is searched for literally and operators between terms are kept."""
+        self.assertEqual([r["id"] for r in self.index.search("foo-bar")], [2])
+        self.assertEqual([r["id"] for r in self.index.search("C++")], [2])
+        self.assertEqual({r["id"] for r in self.index.search("wyvern OR again")}, {2, 3})
+        self.assertEqual([r["id"] for r in self.index.search("wyv*")], [2])
+        self.assertEqual([r["id"] for r in self.index.search('"red dragon"')], [1])
+        self.assertEqual(self.index.search("OR"), [])
+        self.assertEqual(self.index.search('" *'), [])
+        self.assertEqual(build_fts_query('tags: "half OR dragon NOT'), '"tags:" "half OR dragon NOT"')
+
+    def test_image_paths(self):
+        """Test that image paths are resolved against the artist folder."""
+        result = self.index.search("sketch")[0]
+        self.assertEqual(result["images"], [str(self.output_folder / "alpha" / "images/2023/05/dragon.png")])
+
+    def test_update(self):
+        """Test that re-indexing a post replaces its previous content."""
+        self.index.index_posts("alpha", [{"id": 1, "title": "Green serpent", "date": "2023-05-01", "content": "",
+                                          "images": [], "tags": [], "url": "https://www.patreon.com/posts/1"}])
+        self.assertEqual([r["id"] for r in self.index.search("dragon")], [3])
+        self.assertEqual([r["id"] for r in self.index.search("serpent")], [1])
+        self.assertEqual([r["id"] for r in self.index.search(tags=["sketch"])], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.post_store import iter_posts
+from src.stats import collect_stats
+
+
+class TestStats(unittest.TestCase):
+    def setUp(self):
+        """Create a temporary output folder with two artists."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.output_folder = Path(self.tmp_dir.name)
+
+        self.posts = [
+            {"id": 1, "title": "First", "date": "2023-05-01", "content": "", "images": ["images/2023/05/a.png"],
+             "tags": ["sketch"], "url": "https://www.patreon.com/posts/first-1"},
+            {"id": 2, "title": "Second", "date": "2024-01-15", "content": "x" * 5000, "images": [],
+             "tags": ["sketch", "color"], "url": "https://www.patreon.com/posts/second-2"},
+        ]
+        self._write_artist("alpha", self.posts)
+        self._write_artist("beta", self.posts[:1])
+
+        self.artists = [{"url_name": "alpha"}, {"url_name": "beta"}, {"url_name": "gamma"}]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _write_artist(self, url_name, posts):
+        artist_folder = self.output_folder / url_name
+        artist_folder.mkdir(parents=True, exist_ok=True)
+        with open(artist_folder / "posts.json", "w") as file:
+            json.dump(posts, file, indent=4)
+
+    def test_iter_posts_small_chunks(self):
+        """Test that posts split across chunks are decoded correctly."""
+        posts = list(iter_posts(self.output_folder / "alpha" / "posts.json", chunk_size=7))
+        self.assertEqual(posts, self.posts)
+
+    def test_collect_stats(self):
+        """Test the per-artist and total aggregates."""
+        report = collect_stats(self.artists, self.output_folder, workers=2)
+
+        alpha = report["artists"]["alpha"]
+        self.assertEqual(alpha["posts"], 2)
+        self.assertEqual(alpha["images"], 1)
+        self.assertEqual(alpha["years"], {"2023": 1, "2024": 1})
+        self.assertEqual(alpha["months"], {"2023-05": 1, "2024-01": 1})
+        self.assertEqual(alpha["tags"], {"sketch": 2, "color": 1})
+        self.assertGreater(alpha["bytes"], 0)
+
+        self.assertEqual(report["total"]["posts"], 3)
+        self.assertEqual(report["total"]["tags"]["sketch"], 3)
+        self.assertEqual(report["missing"], ["gamma"])
+
+    def test_corrupt_posts_file(self):
+        """Test that an artist with a corrupt posts.json is reported without aborting the others."""
+        (self.output_folder / "beta" / "posts.json").write_text('[{"id": 1, "title": "Fir')
+        report = collect_stats(self.artists, self.output_folder, workers=2)
+
+        self.assertEqual(list(report["artists"]), ["alpha"])
+        self.assertEqual(list(report["errors"]), ["beta"])
+        self.assertEqual(report["total"]["posts"], 2)
+
+        self._write_artist("beta", self.posts)
+        self.assertEqual(collect_stats(self.artists, self.output_folder)["artists"]["beta"]["posts"], 2)
+
+    def test_cache_invalidation(self):
+        """Test that cached aggregates are reused until the posts file changes."""
+        collect_stats(self.artists, self.output_folder)
+        self.assertTrue((self.output_folder / ".stats_cache.json").exists())
+
+        self._write_artist("beta", self.posts)
+        report = collect_stats(self.artists, self.output_folder)
+        self.assertEqual(report["artists"]["beta"]["posts"], 2)
+
+        # Downloading media does not necessarily rewrite posts.json
+        image_folder = self.output_folder / "alpha" / "images" / "2023" / "05"
+        image_folder.mkdir(parents=True)
+        (image_folder / "a.png").write_bytes(b"\0" * 1000)
+        bytes_before = report["artists"]["alpha"]["bytes"]
+        report = collect_stats(self.artists, self.output_folder)
+        self.assertEqual(report["artists"]["alpha"]["bytes"], bytes_before + 1000)
+
+        # A file added to an existing month folder only changes the modification time of that folder
+        (image_folder / "b.png").write_bytes(b"\0" * 500)
+        report = collect_stats(self.artists, self.output_folder)
+        self.assertEqual(report["artists"]["alpha"]["bytes"], bytes_before + 1500)
+
+
+if __name__ == "__main__":
+    unittest.main()